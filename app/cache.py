@@ -0,0 +1,280 @@
+"""
+Caché en memoria del catálogo de libros.
+
+Cada worker mantiene una caché LRU acotada con vencimiento por tiempo (TTL)
+delante de las lecturas de libros. Las escrituras (alta, modificación, baja y
+transacciones que cambian el stock) invalidan las entradas afectadas después
+del commit.
+
+Con varios workers de gunicorn cada proceso tiene su propia caché, así que las
+invalidaciones se publican en un backend compartido que los demás workers
+consultan periódicamente:
+
+- `BackendInvalidacion`: solo el proceso actual (por defecto).
+- `BackendInvalidacionSqlite`: un archivo SQLite compartido por los workers de
+  la misma máquina, como sustituto local de un almacén compartido (Redis, etc.).
+
+Se configura con variables de entorno:
+
+- `CACHE_INVALIDACION_URL`: `local` (por defecto) o `sqlite:///ruta/archivo.db`
+- `CACHE_LIBROS_MAX`: número máximo de entradas por caché (por defecto 1024)
+- `CACHE_LIBROS_TTL`: segundos de vida de cada entrada (por defecto 300)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .metricas import registrar_seccion
+
+# Valor devuelto por CacheLRU.get cuando la clave no está en la caché
+FALTA = object()
+
+
+class BackendInvalidacion:
+    """
+    Backend de invalidación de un solo proceso: no hay otros workers a los que avisar.
+    """
+
+    def publicar(self, cache: str, clave: Optional[Hashable]) -> None:
+        """Anuncia una invalidación a los demás workers (clave None: toda la caché)."""
+
+    def recibir(self) -> List[Tuple[str, Optional[str]]]:
+        """Devuelve las invalidaciones publicadas por otros workers desde la última consulta."""
+        return []
+
+
+class BackendInvalidacionSqlite(BackendInvalidacion):
+    """
+    Backend de invalidación compartido a través de un archivo SQLite.
+
+    Cada invalidación se agrega a una tabla de registro; cada worker lee las filas
+    nuevas como máximo una vez por `intervalo` segundos, así que una escritura en
+    otro worker se refleja en esta caché con ese retraso como máximo.
+    """
+
+    def __init__(self, ruta: str, intervalo: float = 0.5, retencion: float = 300.0):
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.retencion = retencion
+        self._origen = f"{os.getpid()}-{id(self)}"
+        self._bloqueo = threading.Lock()
+        self._proxima_consulta = 0.0
+        self._conexion = sqlite3.connect(ruta, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS invalidaciones ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " origen TEXT NOT NULL,"
+            " cache TEXT NOT NULL,"
+            " clave TEXT,"
+            " momento REAL NOT NULL)"
+        )
+        fila = self._conexion.execute("SELECT COALESCE(MAX(id), 0) FROM invalidaciones").fetchone()
+        self._ultimo_id = fila[0]
+
+    def publicar(self, cache: str, clave: Optional[Hashable]) -> None:
+        ahora = time.time()
+        with self._bloqueo:
+            self._conexion.execute(
+                "INSERT INTO invalidaciones (origen, cache, clave, momento) VALUES (?, ?, ?, ?)",
+                (self._origen, cache, None if clave is None else str(clave), ahora)
+            )
+            self._conexion.execute("DELETE FROM invalidaciones WHERE momento < ?", (ahora - self.retencion,))
+
+    def recibir(self) -> List[Tuple[str, Optional[str]]]:
+        ahora = time.monotonic()
+        if ahora < self._proxima_consulta:
+            return []
+        with self._bloqueo:
+            self._proxima_consulta = ahora + self.intervalo
+            filas = self._conexion.execute(
+                "SELECT id, origen, cache, clave FROM invalidaciones WHERE id > ? ORDER BY id",
+                (self._ultimo_id,)
+            ).fetchall()
+            if filas:
+                self._ultimo_id = filas[-1][0]
+        return [(cache, clave) for _, origen, cache, clave in filas if origen != self._origen]
+
+
+def crear_backend(url: Optional[str]) -> BackendInvalidacion:
+    """
+    Crea el backend de invalidación indicado por una URL.
+
+    Args:
+        url (Optional[str]): `local`, vacío, o `sqlite:///ruta/archivo.db`
+
+    Returns:
+        BackendInvalidacion: El backend configurado
+
+    Raises:
+        ValueError: Si la URL no corresponde a ningún backend
+    """
+    if not url or url == "local":
+        return BackendInvalidacion()
+    if url.startswith("sqlite:///"):
+        return BackendInvalidacionSqlite(url[len("sqlite:///"):])
+    raise ValueError(f"Backend de invalidación de caché no soportado: {url}")
+
+
+class CacheLRU:
+    """
+    Caché LRU acotada con vencimiento por tiempo y contadores de uso.
+
+    Las claves individuales se publican en el backend como texto, así que las
+    cachés que se invalidan por clave deben usar claves de texto (como el ISBN);
+    las demás se invalidan completas.
+    """
+
+    def __init__(self, nombre: str, max_entradas: int, ttl: float, backend: BackendInvalidacion):
+        self.nombre = nombre
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.backend = backend
+        self._entradas: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._bloqueo = threading.RLock()
+        self._generacion = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.vencimientos = 0
+        self.invalidaciones = 0
+
+    def get(self, clave: Hashable) -> Any:
+        """
+        Devuelve el valor guardado para la clave, o FALTA si no está o venció.
+        """
+        self._aplicar_remotas()
+        with self._bloqueo:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return FALTA
+            vence, valor = entrada
+            if vence < time.monotonic():
+                del self._entradas[clave]
+                self.vencimientos += 1
+                self.fallos += 1
+                return FALTA
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def set(self, clave: Hashable, valor: Any, generacion: Optional[int] = None) -> None:
+        """
+        Guarda un valor; si se indica la generación en que se leyó y hubo una
+        invalidación desde entonces, el valor se descarta por posiblemente obsoleto.
+        """
+        with self._bloqueo:
+            if generacion is not None and generacion != self._generacion:
+                return
+            self._entradas[clave] = (time.monotonic() + self.ttl, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+
+    def obtener(self, clave: Hashable, cargar: Callable[[], Any]) -> Any:
+        """
+        Devuelve el valor de la clave, cargándolo con `cargar()` si no está en la caché.
+        """
+        valor = self.get(clave)
+        if valor is not FALTA:
+            return valor
+        generacion = self._generacion
+        valor = cargar()
+        self.set(clave, valor, generacion)
+        return valor
+
+    def invalidar(self, *claves: Hashable) -> None:
+        """
+        Elimina las claves indicadas (o toda la caché si no se indica ninguna)
+        y publica la invalidación para los demás workers.
+        """
+        self._invalidar_local(claves)
+        if claves:
+            for clave in claves:
+                self.backend.publicar(self.nombre, clave)
+        else:
+            self.backend.publicar(self.nombre, None)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Contadores de uso de la caché."""
+        with self._bloqueo:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl": self.ttl,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+                "desalojos": self.desalojos,
+                "vencimientos": self.vencimientos,
+                "invalidaciones": self.invalidaciones,
+            }
+
+    def _invalidar_local(self, claves) -> None:
+        with self._bloqueo:
+            self._generacion += 1
+            self.invalidaciones += 1
+            if not claves:
+                self._entradas.clear()
+                return
+            for clave in claves:
+                self._entradas.pop(clave, None)
+
+    def _aplicar_remotas(self) -> None:
+        for cache, clave in self.backend.recibir():
+            objetivo = _CACHES.get(cache)
+            if objetivo is None:
+                continue
+            if clave is None:
+                objetivo._invalidar_local(())
+            else:
+                objetivo._invalidar_local([clave])
+
+
+_CACHES: Dict[str, CacheLRU] = {}
+
+_backend = crear_backend(os.getenv("CACHE_INVALIDACION_URL"))
+
+
+def crear_cache(nombre: str, max_entradas: Optional[int] = None, ttl: Optional[float] = None) -> CacheLRU:
+    """
+    Crea una caché registrada con el backend de invalidación del proceso.
+
+    Args:
+        nombre (str): Nombre único de la caché (se usa al publicar invalidaciones)
+        max_entradas (Optional[int]): Tamaño máximo; por defecto CACHE_LIBROS_MAX
+        ttl (Optional[float]): Vida de cada entrada en segundos; por defecto CACHE_LIBROS_TTL
+
+    Returns:
+        CacheLRU: La caché creada
+    """
+    cache = CacheLRU(
+        nombre,
+        max_entradas if max_entradas is not None else int(os.getenv("CACHE_LIBROS_MAX", "1024")),
+        ttl if ttl is not None else float(os.getenv("CACHE_LIBROS_TTL", "300")),
+        _backend
+    )
+    _CACHES[nombre] = cache
+    return cache
+
+
+def estadisticas_caches() -> Dict[str, Dict[str, Any]]:
+    """Contadores de uso de todas las cachés del proceso."""
+    return {nombre: cache.estadisticas() for nombre, cache in _CACHES.items()}
+
+
+registrar_seccion("cache", estadisticas_caches)
+
+
+# Libros por ISBN
+cache_libros = crear_cache("libros")
+
+# Páginas del listado de libros por (skip, limit, cursor)
+cache_listas_libros = crear_cache("listas_libros", max_entradas=64)
@@ -0,0 +1,226 @@
+"""
+Comandos de administración de la Tienda de Libros.
+
+Uso:
+    python -m app.cli migrar
+    python -m app.cli reconciliar-caja [--solo-verificar]
+    python -m app.cli importar-libros catalogo.csv [--formato csv|jsonl] [--tamano-lote 1000]
+    python -m app.cli verificar-indices
+    python -m app.cli proyecciones [--reconstruir NOMBRE] [--verificar]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from fastapi import HTTPException
+
+from .database import SessionLocal, engine
+from .migraciones import aplicar_migraciones
+from .services import CajaService, ImportacionService, ProyeccionService
+
+
+def migrar(args: argparse.Namespace) -> int:
+    """
+    Crea las tablas y los índices que falten en la base de datos configurada.
+    """
+    creados = aplicar_migraciones(engine)
+    if creados:
+        for nombre in creados:
+            print(f"Índice creado: {nombre}")
+    else:
+        print("El esquema ya está al día")
+    return 0
+
+
+def reconciliar_caja(args: argparse.Namespace) -> int:
+    """
+    Reconstruye el saldo de caja a partir de la tabla de movimientos y muestra
+    las diferencias encontradas.
+
+    Retorna 1 si se detectaron diferencias y no se corrigieron, 0 en otro caso.
+    """
+    with SessionLocal() as db:
+        reporte = CajaService.reconciliar_saldo(db, corregir=not args.solo_verificar)
+
+    print(json.dumps(reporte, indent=2, ensure_ascii=False))
+
+    if not reporte["consistente"] and not reporte["corregido"]:
+        return 1
+    return 0
+
+
+def importar_libros(args: argparse.Namespace) -> int:
+    """
+    Importa un catálogo de libros desde un archivo CSV o JSONL y muestra el
+    resultado con el rendimiento obtenido.
+
+    Retorna 1 si alguna fila tuvo errores, 0 en otro caso.
+    """
+    formato = args.formato or os.path.splitext(args.archivo)[1].lstrip(".").lower()
+    if formato == "ndjson":
+        formato = "jsonl"
+    if formato not in ImportacionService.FORMATOS:
+        print(f"No se pudo determinar el formato de {args.archivo}; use --formato csv o --formato jsonl")
+        return 2
+
+    with open(args.archivo, "rb") as archivo, SessionLocal() as db:
+        try:
+            resultado = ImportacionService.importar_archivo(db, archivo, formato, tamano_lote=args.tamano_lote)
+        except HTTPException as e:
+            print(e.detail)
+            return 2
+
+    for error in resultado.detalle_errores:
+        print(f"Fila {error.fila}{f' (ISBN {error.ISBN})' if error.ISBN else ''}: {error.error}")
+    if resultado.errores > len(resultado.detalle_errores):
+        print(f"... y {resultado.errores - len(resultado.detalle_errores)} errores más")
+
+    print(
+        f"Filas: {resultado.filas}, creados: {resultado.creados}, "
+        f"actualizados: {resultado.actualizados}, con errores: {resultado.errores}"
+    )
+    print(f"Tiempo: {resultado.segundos:.2f}s ({resultado.filas_por_segundo:.0f} filas/s)")
+    return 1 if resultado.errores else 0
+
+
+def verificar_indices(args: argparse.Namespace) -> int:
+    """
+    Analiza con EXPLAIN QUERY PLAN las consultas de los servicios.
+
+    Retorna 1 si alguna consulta recorre una tabla completa sin usar un índice.
+    """
+    from .plan_consultas import verificar_planes
+
+    planes = verificar_planes(args.database_url)
+    fallidas = [plan for plan in planes if not plan.valido]
+
+    for plan in planes:
+        if args.detalle or not plan.valido:
+            print(f"[{'OK' if plan.valido else 'FALLA'}] {plan.operacion}")
+            print(f"    {plan.sentencia}")
+            for detalle in plan.plan:
+                print(f"      {detalle}")
+
+    print(f"{len(planes)} consultas analizadas, {len(fallidas)} con recorridos completos de tabla")
+    return 1 if fallidas else 0
+
+
+def proyecciones(args: argparse.Namespace) -> int:
+    """
+    Pone al día las proyecciones del registro de eventos (o reconstruye una desde
+    el primer evento) y muestra su estado.
+
+    Retorna 1 si con --verificar alguna proyección no coincide con las tablas, 0 en otro caso.
+    """
+    with SessionLocal() as db:
+        if args.reconstruir:
+            ProyeccionService.reconstruir(db, args.reconstruir)
+        else:
+            ProyeccionService.actualizar(db)
+
+        for estado in ProyeccionService.estado(db):
+            print(
+                f"{estado.nombre}: último evento {estado.ultimo_evento}, "
+                f"pendientes {estado.pendientes}, actualizada {estado.fecha_actualizacion}"
+            )
+
+        if not args.verificar:
+            return 0
+        diferencias = ProyeccionService.verificar(db)
+
+    for diferencia in diferencias:
+        print(f"Diferencia: {diferencia}")
+    if diferencias:
+        return 1
+    print("Las proyecciones coinciden con el estado actual")
+    return 0
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.cli",
+        description="Comandos de administración de la Tienda de Libros"
+    )
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    parser_migrar = subparsers.add_parser(
+        "migrar",
+        help="Crea las tablas y los índices que falten en la base de datos"
+    )
+    parser_migrar.set_defaults(funcion=migrar)
+
+    parser_reconciliar = subparsers.add_parser(
+        "reconciliar-caja",
+        help="Reconstruye el saldo de caja desde los movimientos y reporta diferencias"
+    )
+    parser_reconciliar.add_argument(
+        "--solo-verificar",
+        action="store_true",
+        help="Solo reporta las diferencias, sin corregir la cabecera de saldo"
+    )
+    parser_reconciliar.set_defaults(funcion=reconciliar_caja)
+
+    parser_importar = subparsers.add_parser(
+        "importar-libros",
+        help="Importa un catálogo de libros desde un archivo CSV o JSONL"
+    )
+    parser_importar.add_argument("archivo", help="Ruta del archivo CSV o JSONL")
+    parser_importar.add_argument(
+        "--formato",
+        choices=ImportacionService.FORMATOS,
+        help="Formato del archivo (por defecto, según su extensión)"
+    )
+    parser_importar.add_argument(
+        "--tamano-lote",
+        type=int,
+        default=1000,
+        help="Filas guardadas por cada lote"
+    )
+    parser_importar.set_defaults(funcion=importar_libros)
+
+    parser_indices = subparsers.add_parser(
+        "verificar-indices",
+        help="Verifica con EXPLAIN QUERY PLAN que ninguna consulta de los servicios recorra una tabla completa"
+    )
+    parser_indices.add_argument(
+        "--database-url",
+        default="sqlite://",
+        help="Base SQLite sobre la que analizar (por defecto, una base en memoria con el esquema actual)"
+    )
+    parser_indices.add_argument(
+        "--detalle",
+        action="store_true",
+        help="Muestra el plan de todas las consultas, no solo las que fallan"
+    )
+    parser_indices.set_defaults(funcion=verificar_indices)
+
+    parser_proyecciones = subparsers.add_parser(
+        "proyecciones",
+        help="Aplica los eventos pendientes a las proyecciones y muestra su estado"
+    )
+    parser_proyecciones.add_argument(
+        "--reconstruir",
+        choices=list(ProyeccionService.PROYECCIONES),
+        help="Vacía la proyección indicada y vuelve a aplicar todo el registro de eventos"
+    )
+    parser_proyecciones.add_argument(
+        "--verificar",
+        action="store_true",
+        help="Compara las proyecciones con el stock de los libros y el saldo de caja"
+    )
+    parser_proyecciones.set_defaults(funcion=proyecciones)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = crear_parser().parse_args(argv)
+    if args.comando not in ("migrar", "verificar-indices"):
+        aplicar_migraciones(engine)
+    return args.funcion(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""
+Cola de escritura con commit agrupado (opcional).
+
+Con `COLA_ESCRITURA=1`, las ventas, abastecimientos y movimientos de caja
+manuales no se confirman en la sesión de cada petición: se encolan y un único
+hilo escritor los aplica en orden sobre una sola conexión. Cuando llega una
+operación, el hilo espera hasta `COLA_ESCRITURA_ESPERA_MS` milisegundos (2 por
+defecto) a que se junten más, sin pasar de `COLA_ESCRITURA_MAX_LOTE` (64), aplica
+cada una dentro de un SAVEPOINT y confirma el grupo completo con un solo commit,
+de modo que el costo del commit (el fsync del WAL en SQLite) se reparte entre
+todas. Las operaciones se aplican en orden de llegada, así que cada movimiento
+de caja guarda el saldo acumulado hasta él, igual que sin la cola.
+
+Cada operación conserva su propia validación: si una falla, solo se revierte su
+SAVEPOINT y su petición recibe el error; las demás del grupo se confirman. Cada
+petición recibe su respuesta después del commit de su grupo. Las lecturas no
+pasan por la cola y siguen usando el pool de conexiones normal.
+
+Un error fuera de las operaciones (al abrir la sesión, o en la acción posterior
+al commit, como invalidar la caché) se registra en el log y no detiene al hilo
+escritor: toda petición recibe su resultado o un error. Una petición que espera
+más de `COLA_ESCRITURA_TIMEOUT_S` segundos (30 por defecto) sin que su operación
+haya empezado a aplicarse se retira de la cola y recibe un 503.
+
+La cola es por proceso: con varios workers hay un escritor por worker, y en
+SQLite el bloqueo de escritura (BEGIN IMMEDIATE con busy_timeout) los ordena.
+No se usa con `DB_ASYNC=1`, donde esperar la cola bloquearía el event loop.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as TimeoutFuturo
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import database
+from .metricas import registrar_seccion
+
+# Una operación encolada: función a aplicar, sus argumentos, acción posterior al
+# commit y el Future por el que espera la petición
+Operacion = Tuple[Callable[..., Any], tuple, Optional[Callable[[], None]], Future]
+
+# Marca que detiene al hilo escritor
+_FIN = object()
+
+logger = logging.getLogger(__name__)
+
+
+class ColaEscritura:
+    """
+    Cola de operaciones de escritura aplicadas por un único hilo y confirmadas en grupo.
+    """
+
+    def __init__(
+        self,
+        fabrica_sesiones: Callable[[], Session],
+        max_lote: int = 64,
+        espera_maxima: float = 0.002,
+        tiempo_maximo: float = 30.0
+    ):
+        """
+        Args:
+            fabrica_sesiones (Callable[[], Session]): Crea la sesión de cada lote
+            max_lote (int): Máximo de operaciones confirmadas en un commit
+            espera_maxima (float): Segundos que se esperan más operaciones desde que
+                llega la primera de un lote (0: solo se juntan las ya pendientes)
+            tiempo_maximo (float): Segundos que una petición espera a que su operación
+                empiece a aplicarse antes de retirarla de la cola
+        """
+        self.fabrica_sesiones = fabrica_sesiones
+        self.max_lote = max_lote
+        self.espera_maxima = espera_maxima
+        self.tiempo_maximo = tiempo_maximo
+        self._cola: "queue.Queue" = queue.Queue()
+        self._bloqueo = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+        self.lotes = 0
+        self.operaciones = 0
+        self.errores = 0
+        self.commits_fallidos = 0
+        self.lote_maximo = 0
+
+    def iniciar(self) -> None:
+        """Arranca el hilo escritor."""
+        self._hilo = threading.Thread(target=self._trabajar, name="cola-escritura", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        """Aplica las operaciones pendientes y detiene el hilo escritor."""
+        if self._hilo is not None and self._hilo.is_alive():
+            self._cola.put(_FIN)
+            self._hilo.join()
+
+    def enviar(self, operacion: Callable[..., Any], *args, al_confirmar: Optional[Callable[[], None]] = None) -> Any:
+        """
+        Encola una operación y espera a que su grupo se confirme.
+
+        Args:
+            operacion (Callable): Función `operacion(db, *args)` que aplica la escritura
+                sin hacer commit y devuelve el resultado de la petición
+            *args: Argumentos de la operación
+            al_confirmar (Optional[Callable[[], None]]): Se ejecuta después del commit
+                (por ejemplo, para invalidar cachés)
+
+        Returns:
+            Any: El resultado de la operación
+
+        Raises:
+            HTTPException: El error de validación de la operación, 500 si falló el
+                commit o 503 si la operación no empezó a aplicarse a tiempo
+        """
+        futuro: Future = Future()
+        self._cola.put((operacion, args, al_confirmar, futuro))
+        try:
+            return futuro.result(timeout=self.tiempo_maximo)
+        except TimeoutFuturo:
+            # Solo se puede retirar si el hilo escritor aún no la tomó; si ya se está
+            # aplicando, su resultado llega con el commit de su lote
+            if futuro.cancel():
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="La cola de escritura está saturada: la operación no se aplicó"
+                )
+            return futuro.result()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Contadores de la cola."""
+        with self._bloqueo:
+            return {
+                "pendientes": self._cola.qsize(),
+                "max_lote": self.max_lote,
+                "espera_maxima_ms": self.espera_maxima * 1000,
+                "lotes": self.lotes,
+                "operaciones": self.operaciones,
+                "operaciones_por_lote": round(self.operaciones / self.lotes, 2) if self.lotes else 0.0,
+                "lote_maximo": self.lote_maximo,
+                "errores": self.errores,
+                "commits_fallidos": self.commits_fallidos,
+            }
+
+    def _tomar_lote(self) -> Tuple[List[Operacion], bool]:
+        """
+        Espera la primera operación y agrega las que lleguen hasta completar
+        max_lote o hasta que pase espera_maxima desde la primera.
+        """
+        primera = self._cola.get()
+        if primera is _FIN:
+            return [], True
+        lote = [primera]
+        limite = time.monotonic() + self.espera_maxima
+        while len(lote) < self.max_lote:
+            restante = limite - time.monotonic()
+            try:
+                if restante > 0:
+                    siguiente = self._cola.get(timeout=restante)
+                else:
+                    siguiente = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if siguiente is _FIN:
+                return lote, True
+            lote.append(siguiente)
+        return lote, False
+
+    def _trabajar(self) -> None:
+        terminar = False
+        while not terminar:
+            lote, terminar = self._tomar_lote()
+            if not lote:
+                continue
+            try:
+                self._procesar_lote(lote)
+            except Exception as e:
+                # Ningún error puede detener al único hilo escritor: las peticiones del
+                # lote que aún esperan reciben un 500 y la cola sigue con el siguiente
+                logger.exception("Error al procesar un lote de la cola de escritura")
+                with self._bloqueo:
+                    self.commits_fallidos += 1
+                for _, _, _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(HTTPException(
+                            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            detail=f"Error al procesar la operación: {str(e)}"
+                        ))
+
+    def _procesar_lote(self, lote: List[Operacion]) -> None:
+        """Aplica cada operación en su SAVEPOINT y confirma el grupo con un commit."""
+        exitosas = []
+        errores = 0
+        with self.fabrica_sesiones() as db:
+            for operacion, args, al_confirmar, futuro in lote:
+                if not futuro.set_running_or_notify_cancel():
+                    # La petición dejó de esperar (tiempo_maximo)
+                    continue
+                try:
+                    with db.begin_nested():
+                        resultado = operacion(db, *args)
+                except HTTPException as e:
+                    futuro.set_exception(e)
+                    errores += 1
+                    continue
+                except Exception as e:
+                    futuro.set_exception(HTTPException(
+                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                        detail=f"Error al procesar la operación: {str(e)}"
+                    ))
+                    errores += 1
+                    continue
+                exitosas.append((resultado, al_confirmar, futuro))
+
+            try:
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                with self._bloqueo:
+                    self.commits_fallidos += 1
+                for _, _, futuro in exitosas:
+                    futuro.set_exception(HTTPException(
+                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                        detail=f"Error al confirmar la operación: {str(e)}"
+                    ))
+                exitosas = []
+            # Los resultados se entregan desvinculados de la sesión del hilo escritor
+            db.expunge_all()
+
+        for resultado, al_confirmar, futuro in exitosas:
+            # La operación ya está confirmada: si la acción posterior falla, se
+            # registra en el log y la petición igual recibe su resultado
+            if al_confirmar is not None:
+                try:
+                    al_confirmar()
+                except Exception:
+                    logger.exception("Error en la acción posterior al commit de la cola de escritura")
+            futuro.set_result(resultado)
+
+        with self._bloqueo:
+            self.lotes += 1
+            self.operaciones += len(lote)
+            self.errores += errores
+            self.lote_maximo = max(self.lote_maximo, len(lote))
+
+
+def crear_cola() -> Optional[ColaEscritura]:
+    """
+    Crea y arranca la cola de escritura si COLA_ESCRITURA está activada
+    (y la capa asíncrona no), o devuelve None.
+    """
+    if os.getenv("COLA_ESCRITURA", "0").lower() not in ("1", "true", "si", "yes"):
+        return None
+    if database.USAR_ASYNC:
+        return None
+
+    # expire_on_commit=False: las peticiones leen sus resultados desde otros hilos
+    fabrica = sessionmaker(
+        bind=database.crear_engine_escritura(), autoflush=False, expire_on_commit=False
+    )
+    cola = ColaEscritura(
+        fabrica,
+        max_lote=int(os.getenv("COLA_ESCRITURA_MAX_LOTE", "64")),
+        espera_maxima=float(os.getenv("COLA_ESCRITURA_ESPERA_MS", "2")) / 1000,
+        tiempo_maximo=float(os.getenv("COLA_ESCRITURA_TIMEOUT_S", "30"))
+    )
+    cola.iniciar()
+    atexit.register(cola.detener)
+    registrar_seccion("cola_escritura", cola.estadisticas)
+    return cola
+
+
+# None si la cola está desactivada
+cola_escritura = crear_cola()
@@ -0,0 +1,73 @@
+"""
+Peticiones condicionales (ETag / If-None-Match) para las lecturas de la API.
+
+El ETag de una respuesta no se calcula sobre el cuerpo: se deriva de la marca de
+cambios de la tabla (el ID del último registro o un contador de cambios), que se
+obtiene con una consulta por índice, y de la ruta y los parámetros de la petición.
+Si el cliente envía `If-None-Match` con el mismo ETag, el endpoint responde
+`304 Not Modified` sin ejecutar la consulta del listado ni serializar el cuerpo.
+
+La marca se lee antes que los datos: si una escritura se confirma entre ambas
+lecturas, el ETag queda más viejo que el cuerpo y la siguiente petición recibe
+los datos completos, nunca al revés.
+"""
+
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+
+# Cabecera de respuesta con el ETag
+CABECERA_ETAG = "ETag"
+
+
+def calcular_etag(request: Request, *marcas: Any) -> str:
+    """
+    Calcula el ETag de una lectura a partir de las marcas de cambios de sus tablas.
+
+    Args:
+        request (Request): Petición (su ruta y parámetros forman parte del ETag)
+        *marcas: Marcas de cambios de las tablas que lee el endpoint
+
+    Returns:
+        str: ETag débil (W/"...")
+    """
+    clave = "|".join([request.url.path, request.url.query, *(str(marca) for marca in marcas)])
+    resumen = hashlib.blake2b(clave.encode(), digest_size=12).hexdigest()
+    return f'W/"{resumen}"'
+
+
+def _coincide(if_none_match: str, etag: str) -> bool:
+    """Compara If-None-Match con un ETag usando la comparación débil (RFC 9110)."""
+    if if_none_match.strip() == "*":
+        return True
+    opaco = etag[2:] if etag.startswith("W/") else etag
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == opaco:
+            return True
+    return False
+
+
+def no_modificado(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Agrega el ETag a la respuesta y, si el cliente ya tiene esa versión, devuelve
+    la respuesta 304 que debe retornar el endpoint.
+
+    Args:
+        request (Request): Petición
+        response (Response): Respuesta del endpoint (recibe la cabecera ETag)
+        etag (str): ETag calculado con calcular_etag
+
+    Returns:
+        Optional[Response]: Respuesta 304 Not Modified, o None si hay que responder con los datos
+    """
+    cabeceras = {CABECERA_ETAG: etag, "Cache-Control": "no-cache"}
+    response.headers.update(cabeceras)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _coincide(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabeceras)
+    return None
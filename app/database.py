@@ -1,16 +1,213 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
 from dotenv import load_dotenv
 
+from .metricas import MetricasPool, clase_pool_medida, registrar_seccion
+
 load_dotenv()
 
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./tienda_libros.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def normalizar_url(url: str) -> str:
+    """
+    Corrige el esquema `postgres://` (el que entregan Render y Heroku), que
+    SQLAlchemy ya no acepta, a `postgresql://`.
+    """
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+SQLALCHEMY_DATABASE_URL = normalizar_url(os.getenv("DATABASE_URL", "sqlite:///./tienda_libros.db"))
+
+# Valores por defecto del pool según la base de datos. En PostgreSQL cada worker de
+# gunicorn abre hasta pool_size + max_overflow conexiones, así que el total debe
+# quedar por debajo del límite del servidor; pre_ping y recycle descartan las
+# conexiones que el servidor o un proxy cerraron por inactividad. Un archivo SQLite
+# no tiene conexiones remotas que puedan caerse.
+POOL_POR_DEFECTO = {
+    "postgresql": {"pool_size": 5, "max_overflow": 5, "pool_timeout": 10, "pool_recycle": 1800, "pool_pre_ping": True},
+    "sqlite": {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30, "pool_recycle": -1, "pool_pre_ping": False},
+}
+
+# Variables de entorno que reemplazan cada valor por defecto
+VARIABLES_POOL = {
+    "pool_size": ("DB_POOL_SIZE", int),
+    "max_overflow": ("DB_MAX_OVERFLOW", int),
+    "pool_timeout": ("DB_POOL_TIMEOUT", float),
+    "pool_recycle": ("DB_POOL_RECYCLE", int),
+    "pool_pre_ping": ("DB_POOL_PRE_PING", lambda valor: valor.lower() in ("1", "true", "si", "yes")),
+}
+
+
+def opciones_pool(url: str) -> dict:
+    """
+    Opciones del pool de conexiones para una URL: los valores por defecto de su
+    dialecto, reemplazados por las variables de entorno DB_POOL_SIZE,
+    DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE y DB_POOL_PRE_PING.
+
+    Una base SQLite en memoria usa el pool propio de SQLAlchemy y no recibe opciones.
+    """
+    url = make_url(url)
+    dialecto = url.get_backend_name()
+    if dialecto == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    opciones = dict(POOL_POR_DEFECTO.get(dialecto, POOL_POR_DEFECTO["postgresql"]))
+    for opcion, (variable, convertir) in VARIABLES_POOL.items():
+        valor = os.getenv(variable)
+        if valor:
+            opciones[opcion] = convertir(valor)
+    return opciones
+
+
+# Perfil de SQLite para producción, aplicado a cada conexión nueva:
+# - journal_mode=WAL: las lecturas no bloquean a la escritura ni al revés, y un
+#   commit agrega al WAL en lugar de reescribir un journal de rollback.
+# - synchronous=NORMAL: con WAL solo se sincroniza en los checkpoints; un corte de
+#   energía puede perder los últimos commits, pero no corrompe la base.
+# - busy_timeout: milisegundos que una escritura espera el bloqueo de otro proceso
+#   antes de fallar con "database is locked".
+# - cache_size (negativo: KiB) y mmap_size (bytes): caché de páginas por conexión
+#   y lectura de la base mapeada en memoria.
+# - foreign_keys=ON: SQLite no verifica las claves foráneas si no se activa.
+# Cada valor se reemplaza con SQLITE_<PRAGMA> (por ejemplo SQLITE_BUSY_TIMEOUT) y el
+# perfil completo se desactiva con SQLITE_PERFIL=ninguno.
+PRAGMAS_SQLITE = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -20000,
+    "mmap_size": 268435456,
+    "foreign_keys": "ON",
+}
+
+
+def pragmas_sqlite() -> dict:
+    """
+    PRAGMAs del perfil de SQLite con los reemplazos de las variables de entorno,
+    o un diccionario vacío si el perfil está desactivado.
+    """
+    if os.getenv("SQLITE_PERFIL", "produccion").lower() in ("ninguno", "0", "no"):
+        return {}
+    return {
+        pragma: os.getenv(f"SQLITE_{pragma.upper()}", valor)
+        for pragma, valor in PRAGMAS_SQLITE.items()
+    }
+
+
+def aplicar_pragmas_sqlite(motor, pragmas: dict) -> None:
+    """Ejecuta los PRAGMAs en cada conexión nueva del engine (evento `connect`)."""
+    @event.listens_for(motor, "connect")
+    def _configurar_conexion(conexion_dbapi, registro):
+        cursor = conexion_dbapi.cursor()
+        for pragma, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma}={valor}")
+        cursor.close()
+
+
+def transacciones_inmediatas_sqlite(motor) -> None:
+    """
+    Hace que el engine abra cada transacción con BEGIN IMMEDIATE, que toma el
+    bloqueo de escritura al empezar (y espera busy_timeout si otro proceso lo
+    tiene) en lugar de fallar a mitad de la transacción.
+
+    El driver sqlite3 abre las transacciones por su cuenta y no admite SAVEPOINT
+    de forma fiable; aquí se desactiva ese manejo y la transacción la abre
+    SQLAlchemy, como recomienda su documentación.
+    """
+    @event.listens_for(motor, "connect")
+    def _sin_transacciones_del_driver(conexion_dbapi, registro):
+        conexion_dbapi.isolation_level = None
+
+    @event.listens_for(motor, "begin")
+    def _begin_immediate(conexion):
+        conexion.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def crear_engine_medido(crear, url: str, nombre: str, clase_pool, pool: dict = None, **kwargs):
+    """
+    Crea un engine con las opciones de pool de su URL (reemplazadas por `pool`),
+    aplica el perfil de SQLite si corresponde y registra las métricas de su pool
+    en la sección `pool` de /api/metrics.
+    """
+    metricas = MetricasPool(nombre)
+    opciones = opciones_pool(url)
+    if opciones:
+        opciones.update(pool or {})
+        opciones["poolclass"] = clase_pool_medida(clase_pool, metricas)
+    es_sqlite = make_url(url).get_backend_name() == "sqlite"
+    if es_sqlite:
+        kwargs.setdefault("connect_args", {"check_same_thread": False})
+    motor = crear(url, **opciones, **kwargs)
+    motor_sincrono = getattr(motor, "sync_engine", motor)
+    if es_sqlite and pragmas_sqlite():
+        aplicar_pragmas_sqlite(motor_sincrono, pragmas_sqlite())
+    metricas.instrumentar(motor_sincrono)
+    _METRICAS_POOL[nombre] = metricas
+    return motor
+
+
+def crear_engine_escritura():
+    """
+    Engine de una sola conexión para la cola de escritura (app/cola_escritura.py).
+    En SQLite sus transacciones empiezan con BEGIN IMMEDIATE y admiten SAVEPOINT.
+    """
+    motor = crear_engine_medido(
+        create_engine, SQLALCHEMY_DATABASE_URL, "escritura", QueuePool, pool={"pool_size": 1, "max_overflow": 0}
+    )
+    if motor.dialect.name == "sqlite":
+        transacciones_inmediatas_sqlite(motor)
+    return motor
+
+
+_METRICAS_POOL = {}
+registrar_seccion("pool", lambda: {nombre: m.estadisticas() for nombre, m in _METRICAS_POOL.items()})
+
+engine = crear_engine_medido(create_engine, SQLALCHEMY_DATABASE_URL, "principal", QueuePool)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+
+def url_asincrona(url: str) -> str:
+    """
+    Convierte una URL de base de datos a la del driver asíncrono correspondiente
+    (aiosqlite para SQLite, asyncpg para PostgreSQL).
+    """
+    esquema, separador, resto = url.partition("://")
+    dialecto = esquema.split("+")[0]
+    if dialecto == "sqlite":
+        return f"sqlite+aiosqlite{separador}{resto}"
+    if dialecto in ("postgres", "postgresql"):
+        return f"postgresql+asyncpg{separador}{resto}"
+    raise ValueError(f"No hay un driver asíncrono configurado para {esquema}")
+
+
+# Capa asíncrona opcional (DB_ASYNC=1). Los drivers aiosqlite y asyncpg solo se
+# necesitan cuando está activada (requirements-async.txt).
+USAR_ASYNC = os.getenv("DB_ASYNC", "0").lower() in ("1", "true", "si", "yes")
+
+async_engine = None
+AsyncSessionLocal = None
+
+if USAR_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    try:
+        async_engine = crear_engine_medido(
+            create_async_engine,
+            normalizar_url(os.getenv("ASYNC_DATABASE_URL") or url_asincrona(SQLALCHEMY_DATABASE_URL)),
+            "asincrono",
+            AsyncAdaptedQueuePool
+        )
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError(
+            f"DB_ASYNC=1 necesita el driver {e.name}: pip install -r requirements-async.txt",
+            name=e.name
+        ) from e
+    # expire_on_commit=False: la respuesta se serializa fuera de la sesión, donde
+    # no se puede recargar un atributo expirado sin bloquear el event loop
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
\ No newline at end of file
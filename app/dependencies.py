@@ -1,8 +1,65 @@
+import functools
+import inspect
+
+from fastapi import Depends
+from fastapi.routing import APIRoute
+
+from . import database
 from .database import SessionLocal
+from .schemas.schemas import normalizar_isbn
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def isbn_ruta(isbn: str) -> str:
+    """ISBN de la ruta (`/{isbn}`), normalizado como se guardan los libros."""
+    return normalizar_isbn(isbn)
+
+async def get_async_db():
+    async with database.AsyncSessionLocal() as db:
+        yield db
+
+def _endpoint_async(endpoint):
+    """
+    Convierte un endpoint síncrono que recibe `db: Session = Depends(get_db)` en
+    uno asíncrono que recibe una AsyncSession y ejecuta el endpoint original con
+    `AsyncSession.run_sync`.
+
+    El código del endpoint y de los servicios es el mismo en ambos modos; en modo
+    asíncrono las consultas las ejecuta el driver asíncrono y la petición no ocupa
+    un hilo del threadpool mientras espera a la base de datos. run_sync ejecuta el
+    endpoint en el hilo del event loop: solo cede el loop mientras espera E/S, así
+    que el trabajo de Python del endpoint (validación, ORM, serialización) no corre
+    en paralelo con el de otras peticiones del mismo proceso.
+    """
+    firma = inspect.signature(endpoint)
+    parametros = [
+        parametro.replace(default=Depends(get_async_db), annotation=inspect.Parameter.empty)
+        if parametro.name == "db" else parametro
+        for parametro in firma.parameters.values()
+    ]
+
+    @functools.wraps(endpoint)
+    async def envoltura(**kwargs):
+        db = kwargs.pop("db")
+        return await db.run_sync(lambda sesion: endpoint(db=sesion, **kwargs))
+
+    envoltura.__signature__ = firma.replace(parameters=parametros)
+    return envoltura
+
+class RutaBaseDatos(APIRoute):
+    """
+    Ruta que, con DB_ASYNC=1, atiende los endpoints síncronos que usan get_db
+    con la sesión asíncrona. Con la configuración por defecto no cambia nada.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if database.USAR_ASYNC and not inspect.iscoroutinefunction(endpoint):
+            db = inspect.signature(endpoint).parameters.get("db")
+            if db is not None and getattr(db.default, "dependency", None) is get_db:
+                endpoint = _endpoint_async(endpoint)
+        super().__init__(path, endpoint, **kwargs)
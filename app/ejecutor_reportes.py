@@ -0,0 +1,157 @@
+"""
+Ejecutor de reportes pesados en procesos aparte.
+
+Los reportes que recorren el historial completo no se calculan en el hilo de la
+petición: `POST /api/reportes/{tipo}` guarda el pedido en la tabla `reportes` y
+lo envía a un ProcessPoolExecutor de este worker, y el cliente consulta el
+estado con `GET /api/reportes/{id}`. Al correr en otro proceso, el cálculo no
+compite por el GIL ni por el threadpool de FastAPI con las ventas.
+
+La concurrencia está acotada por worker: `REPORTES_PROCESOS` procesos (1 por
+defecto) y como máximo `REPORTES_MAX_PENDIENTES` reportes (8) en ejecución o en
+espera; por encima de eso el pedido recibe 429. Los procesos corren con la
+prioridad reducida en `REPORTES_NICE` (10 por defecto) para que el sistema
+operativo atienda antes a los workers de la API. Se crean la primera vez que
+se pide un reporte.
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from .metricas import registrar_seccion
+
+
+def _inicializar_proceso(prioridad: int) -> None:
+    """Baja la prioridad del proceso de reportes."""
+    if prioridad and hasattr(os, "nice"):
+        os.nice(prioridad)
+
+
+class EjecutorReportes:
+    """
+    Pool de procesos con un límite de trabajos en curso.
+    """
+
+    def __init__(self, max_procesos: int = 1, max_pendientes: int = 8, prioridad: int = 10):
+        """
+        Args:
+            max_procesos (int): Procesos que calculan reportes a la vez
+            max_pendientes (int): Máximo de trabajos en ejecución o en espera
+            prioridad (int): Incremento de nice de los procesos (0: sin cambio)
+        """
+        self.max_procesos = max_procesos
+        self.max_pendientes = max_pendientes
+        self.prioridad = prioridad
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._bloqueo = threading.Lock()
+        self.pendientes = 0
+        self.enviados = 0
+        self.completados = 0
+        self.fallidos = 0
+        self.rechazados = 0
+
+    def enviar(
+        self,
+        funcion: Callable[..., Any],
+        *args,
+        al_fallar: Optional[Callable[[BaseException], None]] = None
+    ) -> None:
+        """
+        Envía un trabajo al pool sin esperar su resultado.
+
+        Args:
+            funcion (Callable): Función de nivel de módulo (se ejecuta en otro proceso)
+            *args: Argumentos de la función
+            al_fallar (Optional[Callable[[BaseException], None]]): Se ejecuta en este
+                proceso si el trabajo se rechaza o si su proceso falla
+
+        Raises:
+            HTTPException: 429 si ya hay max_pendientes trabajos en curso
+        """
+        with self._bloqueo:
+            if self.pendientes >= self.max_pendientes:
+                self.rechazados += 1
+                rechazo = HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail=f"Hay {self.pendientes} reportes en curso; intente nuevamente en unos momentos"
+                )
+            else:
+                rechazo = None
+                self.pendientes += 1
+                self.enviados += 1
+                try:
+                    futuro = self._get_pool().submit(funcion, *args)
+                except BrokenProcessPool:
+                    # Un proceso murió: se descarta el pool y se crea otro
+                    self._pool = None
+                    futuro = self._get_pool().submit(funcion, *args)
+
+        if rechazo is not None:
+            if al_fallar is not None:
+                al_fallar(rechazo)
+            raise rechazo
+        futuro.add_done_callback(lambda futuro: self._terminado(futuro, al_fallar))
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Contadores del ejecutor."""
+        with self._bloqueo:
+            return {
+                "procesos": self.max_procesos,
+                "max_pendientes": self.max_pendientes,
+                "pendientes": self.pendientes,
+                "enviados": self.enviados,
+                "completados": self.completados,
+                "fallidos": self.fallidos,
+                "rechazados": self.rechazados,
+            }
+
+    def detener(self) -> None:
+        """Cancela los trabajos en espera y cierra el pool."""
+        with self._bloqueo:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: los procesos no heredan los hilos ni las conexiones abiertas del worker
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_procesos,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_inicializar_proceso,
+                initargs=(self.prioridad,)
+            )
+        return self._pool
+
+    def _terminado(self, futuro: Future, al_fallar: Optional[Callable[[BaseException], None]]) -> None:
+        error = None if futuro.cancelled() else futuro.exception()
+        with self._bloqueo:
+            self.pendientes -= 1
+            if error is None and not futuro.cancelled():
+                self.completados += 1
+            else:
+                self.fallidos += 1
+        if error is not None and al_fallar is not None:
+            al_fallar(error)
+
+
+def crear_ejecutor() -> EjecutorReportes:
+    """Crea el ejecutor de reportes con la configuración de las variables de entorno."""
+    ejecutor = EjecutorReportes(
+        max_procesos=int(os.getenv("REPORTES_PROCESOS", "1")),
+        max_pendientes=int(os.getenv("REPORTES_MAX_PENDIENTES", "8")),
+        prioridad=int(os.getenv("REPORTES_NICE", "10"))
+    )
+    atexit.register(ejecutor.detener)
+    registrar_seccion("reportes", ejecutor.estadisticas)
+    return ejecutor
+
+
+ejecutor_reportes = crear_ejecutor()
@@ -0,0 +1,113 @@
+"""
+Índice en memoria de los títulos del catálogo, para buscar libros cuando la base
+no tiene FTS5 (PostgreSQL, o SQLite compilado sin FTS5).
+
+Cada palabra normalizada de los títulos (sin acentos y en minúsculas) apunta a
+los libros que la contienen; las palabras se guardan ordenadas, así que las que
+empiezan con un prefijo forman un rango contiguo que se encuentra con búsqueda
+binaria. Una búsqueda exige que cada término del texto sea prefijo de alguna
+palabra del título; los términos de una sola letra ("a", "y") deben ser la
+palabra completa, porque como prefijo coincidirían con buena parte del catálogo.
+
+El índice se construye completo desde la base y no se modifica: cuando el
+catálogo cambia se construye otro y se reemplaza (ver BusquedaService).
+"""
+
+import heapq
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Set, Tuple
+
+_PALABRA = re.compile(r"\w+")
+
+
+def normalizar(texto: str) -> str:
+    """Quita los acentos y pasa a minúsculas ("Canción" -> "cancion")."""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    return "".join(caracter for caracter in descompuesto if not unicodedata.combining(caracter)).casefold()
+
+
+def palabras(texto: str) -> List[str]:
+    """Palabras normalizadas de un texto, en orden."""
+    return _PALABRA.findall(normalizar(texto))
+
+
+class IndicePrefijos:
+    """
+    Índice de prefijos de palabras sobre los títulos de un conjunto de libros.
+    """
+
+    # Largo mínimo de un término para buscarlo como prefijo
+    LARGO_MINIMO_PREFIJO = 2
+
+    def __init__(self, libros: Iterable[Tuple[str, str]]):
+        """
+        Args:
+            libros (Iterable[Tuple[str, str]]): ISBN y título de cada libro
+        """
+        self.isbns: List[str] = []
+        self.titulos: List[str] = []
+        postings: Dict[str, array] = {}
+        for posicion, (isbn, titulo) in enumerate(libros):
+            self.isbns.append(isbn)
+            self.titulos.append(normalizar(titulo))
+            for palabra in set(_PALABRA.findall(self.titulos[-1])):
+                if palabra not in postings:
+                    postings[palabra] = array("i")
+                postings[palabra].append(posicion)
+        self.vocabulario: List[str] = sorted(postings)
+        self.postings: List[array] = [postings[palabra] for palabra in self.vocabulario]
+
+    def __len__(self) -> int:
+        return len(self.isbns)
+
+    def buscar(self, texto: str, limit: int) -> List[str]:
+        """
+        Busca los libros cuyos títulos contienen, para cada término del texto, una
+        palabra que empieza con ese término.
+
+        Se ordenan primero los que tienen más términos como palabra completa,
+        luego los que empiezan con el primer término y luego los de título más corto.
+
+        Args:
+            texto (str): Texto buscado
+            limit (int): Número máximo de libros
+
+        Returns:
+            List[str]: ISBN de los libros encontrados, del más al menos relevante
+        """
+        terminos = palabras(texto)
+        if not terminos:
+            return []
+
+        candidatos = None
+        for termino in sorted(set(terminos), key=len, reverse=True):
+            encontrados = self._con_prefijo(termino)
+            candidatos = encontrados if candidatos is None else candidatos & encontrados
+            if not candidatos:
+                return []
+
+        completas = set(terminos)
+
+        def relevancia(posicion: int):
+            titulo = self.titulos[posicion]
+            exactas = len(completas.intersection(_PALABRA.findall(titulo)))
+            return (-exactas, not titulo.startswith(terminos[0]), len(titulo), titulo)
+
+        return [self.isbns[posicion] for posicion in heapq.nsmallest(limit, candidatos, key=relevancia)]
+
+    def _con_prefijo(self, prefijo: str) -> Set[int]:
+        """Posiciones de los libros con alguna palabra que empieza con el prefijo."""
+        encontrados: Set[int] = set()
+        inicio = bisect_left(self.vocabulario, prefijo)
+        if len(prefijo) < self.LARGO_MINIMO_PREFIJO:
+            if inicio < len(self.vocabulario) and self.vocabulario[inicio] == prefijo:
+                encontrados.update(self.postings[inicio])
+            return encontrados
+        for indice in range(inicio, len(self.vocabulario)):
+            if not self.vocabulario[indice].startswith(prefijo):
+                break
+            encontrados.update(self.postings[indice])
+        return encontrados
@@ -0,0 +1,286 @@
+"""
+Instrumentación de las peticiones HTTP.
+
+`MiddlewareInstrumentacion` mide cada petición: su duración total, el número de
+sentencias SQL que ejecutó y el tiempo que pasó en la base de datos. Las
+sentencias se cuentan con los eventos `before_cursor_execute` y
+`after_cursor_execute` de todos los engines, que suman en la medición de la
+petición en curso (una variable de contexto, que FastAPI copia a los hilos donde
+corren los endpoints y dependencias síncronos).
+
+Cada respuesta lleva la cabecera `Server-Timing` con la duración total (`app`),
+el tiempo en la base (`db`, con el número de consultas) y los tramos medidos con
+`medir` (por ejemplo, `render` en las páginas de app/routers/web.py); las
+herramientas de desarrollo del navegador la muestran junto a la petición.
+
+Si una misma sentencia se ejecuta UMBRAL_N_MAS_UNO veces o más en una petición
+(una consulta por cada fila de otra: el patrón N+1), la petición se marca en la
+cabecera (`n1`), se cuenta en las métricas de su ruta y se avisa en el log una
+vez por ruta y sentencia.
+
+Por ruta (la plantilla, como `/api/libros/{isbn}`) se acumula un histograma de
+duraciones, las peticiones por código de estado, las consultas, el tiempo en la
+base y las peticiones con N+1, que `/api/metrics` publica en la sección
+`peticiones` y en el formato de Prometheus.
+
+Las sentencias que ejecuta el hilo de la cola de escritura (app/cola_escritura.py)
+son de un lote de varias peticiones y no se atribuyen a ninguna: la espera de la
+petición por su lote cuenta solo en `app`.
+
+La variable de entorno INSTRUMENTACION=0 desactiva el middleware.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.metricas import PREFIJO_PROMETHEUS, escapar_etiqueta, registrar_exportador, registrar_seccion
+
+logger = logging.getLogger(__name__)
+
+ACTIVA = os.getenv("INSTRUMENTACION", "1").lower() in ("1", "true", "si", "yes")
+
+# Repeticiones de una misma sentencia en una petición desde las que se considera N+1
+UMBRAL_N_MAS_UNO = int(os.getenv("INSTRUMENTACION_N_MAS_UNO", "10"))
+
+# Límites (en segundos) de los intervalos del histograma de duración de las peticiones
+LIMITES_DURACION_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Etiqueta de las peticiones que no coinciden con ninguna ruta (404)
+SIN_RUTA = "sin_ruta"
+
+
+class MedicionPeticion:
+    """Consultas y tramos medidos de una petición en curso."""
+
+    __slots__ = ("consultas", "tiempo_db", "sentencias", "tramos")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.sentencias: Dict[str, int] = {}
+        self.tramos: List[Tuple[str, float]] = []
+
+    def mas_repetida(self) -> Optional[Tuple[str, int]]:
+        """La sentencia más repetida y sus ejecuciones, si alcanza UMBRAL_N_MAS_UNO."""
+        if not self.sentencias:
+            return None
+        sentencia, veces = max(self.sentencias.items(), key=lambda item: item[1])
+        return (sentencia, veces) if veces >= UMBRAL_N_MAS_UNO else None
+
+
+_medicion: ContextVar[Optional[MedicionPeticion]] = ContextVar("medicion_peticion", default=None)
+
+
+@contextmanager
+def medir(nombre: str) -> Iterator[None]:
+    """
+    Mide un tramo de la petición en curso, que se agrega a su cabecera Server-Timing.
+
+    Args:
+        nombre (str): Nombre del tramo en la cabecera (un token, sin espacios)
+    """
+    medicion = _medicion.get()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        if medicion is not None:
+            medicion.tramos.append((nombre, time.perf_counter() - inicio))
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_de_ejecutar(conexion, cursor, sentencia, parametros, contexto, ejecucion_multiple):
+    if _medicion.get() is not None:
+        conexion.info.setdefault("inicios_instrumentacion", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _despues_de_ejecutar(conexion, cursor, sentencia, parametros, contexto, ejecucion_multiple):
+    medicion = _medicion.get()
+    inicios = conexion.info.get("inicios_instrumentacion")
+    if medicion is None or not inicios:
+        return
+    medicion.tiempo_db += time.perf_counter() - inicios.pop()
+    medicion.consultas += 1
+    medicion.sentencias[sentencia] = medicion.sentencias.get(sentencia, 0) + 1
+
+
+class MetricasRuta:
+    """Contadores acumulados de las peticiones a una ruta con un método."""
+
+    def __init__(self):
+        self.histograma = [0] * (len(LIMITES_DURACION_S) + 1)
+        self.duracion_total = 0.0
+        self.por_estado: Dict[int, int] = {}
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.n_mas_uno = 0
+
+    @property
+    def peticiones(self) -> int:
+        return sum(self.histograma)
+
+    def registrar(self, duracion: float, estado: int, medicion: MedicionPeticion, n_mas_uno: bool) -> None:
+        intervalo = next(
+            (i for i, limite in enumerate(LIMITES_DURACION_S) if duracion <= limite), len(LIMITES_DURACION_S)
+        )
+        self.histograma[intervalo] += 1
+        self.duracion_total += duracion
+        self.por_estado[estado] = self.por_estado.get(estado, 0) + 1
+        self.consultas += medicion.consultas
+        self.tiempo_db += medicion.tiempo_db
+        self.n_mas_uno += n_mas_uno
+
+
+_RUTAS: Dict[Tuple[str, str], MetricasRuta] = {}
+_AVISADOS = set()
+_bloqueo = threading.Lock()
+
+
+def _registrar(metodo: str, ruta: str, duracion: float, estado: int, medicion: MedicionPeticion,
+               repetida: Optional[Tuple[str, int]]) -> None:
+    with _bloqueo:
+        metricas = _RUTAS.get((metodo, ruta))
+        if metricas is None:
+            metricas = _RUTAS[(metodo, ruta)] = MetricasRuta()
+        metricas.registrar(duracion, estado, medicion, repetida is not None)
+        avisar = repetida is not None and (metodo, ruta, repetida[0]) not in _AVISADOS
+        if avisar:
+            _AVISADOS.add((metodo, ruta, repetida[0]))
+    if avisar:
+        logger.warning(
+            "Posible N+1 en %s %s: la sentencia se ejecutó %d veces en una petición: %s",
+            metodo, ruta, repetida[1], " ".join(repetida[0].split())[:300]
+        )
+
+
+def server_timing(duracion: float, medicion: MedicionPeticion, repetida: Optional[Tuple[str, int]]) -> str:
+    """Valor de la cabecera Server-Timing de una petición (duraciones en milisegundos)."""
+    partes = [
+        f"app;dur={duracion * 1000:.2f}",
+        f'db;dur={medicion.tiempo_db * 1000:.2f};desc="{medicion.consultas} consultas"',
+    ]
+    partes.extend(f"{nombre};dur={segundos * 1000:.2f}" for nombre, segundos in medicion.tramos)
+    if repetida is not None:
+        partes.append(f'n1;desc="sentencia repetida {repetida[1]} veces"')
+    return ", ".join(partes)
+
+
+class MiddlewareInstrumentacion:
+    """
+    Middleware ASGI que mide cada petición HTTP (ver el docstring del módulo).
+
+    Es un middleware ASGI puro, y no un BaseHTTPMiddleware, para no agregar una
+    tarea ni copiar el cuerpo de la respuesta en cada petición.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicion = MedicionPeticion()
+        token = _medicion.set(medicion)
+        inicio = time.perf_counter()
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                cabecera = server_timing(time.perf_counter() - inicio, medicion, medicion.mas_repetida())
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [
+                    (b"server-timing", cabecera.encode("latin-1"))
+                ]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicion.reset(token)
+            # El router deja en el scope la ruta que atendió la petición
+            ruta = scope.get("route")
+            _registrar(
+                scope["method"],
+                getattr(ruta, "path", SIN_RUTA),
+                time.perf_counter() - inicio,
+                estado,
+                medicion,
+                medicion.mas_repetida()
+            )
+
+
+def estadisticas() -> Dict[str, Any]:
+    """Resumen por ruta para /api/metrics."""
+    with _bloqueo:
+        return {
+            f"{metodo} {ruta}": {
+                "peticiones": metricas.peticiones,
+                "duracion_media_ms": round(metricas.duracion_total / metricas.peticiones * 1000, 3),
+                "consultas_por_peticion": round(metricas.consultas / metricas.peticiones, 2),
+                "db_media_ms": round(metricas.tiempo_db / metricas.peticiones * 1000, 3),
+                "n_mas_uno": metricas.n_mas_uno,
+                "por_estado": {str(estado): n for estado, n in sorted(metricas.por_estado.items())},
+                "histograma_duracion_ms": {
+                    **{f"<={limite * 1000:g}": n for limite, n in zip(LIMITES_DURACION_S, metricas.histograma)},
+                    f">{LIMITES_DURACION_S[-1] * 1000:g}": metricas.histograma[-1],
+                },
+            }
+            for (metodo, ruta), metricas in sorted(_RUTAS.items(), key=lambda item: (item[0][1], item[0][0]))
+        }
+
+
+def exportar_prometheus() -> List[str]:
+    """Métricas por ruta en el formato de texto de Prometheus."""
+    base = f"{PREFIJO_PROMETHEUS}_http"
+    duracion = [
+        f"# HELP {base}_duracion_segundos Duración de las peticiones HTTP.",
+        f"# TYPE {base}_duracion_segundos histogram",
+    ]
+    peticiones = [
+        f"# HELP {base}_peticiones_total Peticiones HTTP por código de estado.",
+        f"# TYPE {base}_peticiones_total counter",
+    ]
+    consultas = [
+        f"# HELP {base}_consultas_total Sentencias SQL ejecutadas por las peticiones.",
+        f"# TYPE {base}_consultas_total counter",
+    ]
+    tiempo_db = [
+        f"# HELP {base}_db_segundos_total Tiempo de las peticiones en la base de datos.",
+        f"# TYPE {base}_db_segundos_total counter",
+    ]
+    n_mas_uno = [
+        f"# HELP {base}_n_mas_uno_total Peticiones con una sentencia repetida al menos {UMBRAL_N_MAS_UNO} veces.",
+        f"# TYPE {base}_n_mas_uno_total counter",
+    ]
+    with _bloqueo:
+        for (metodo, ruta), metricas in _RUTAS.items():
+            etiquetas = f'metodo="{escapar_etiqueta(metodo)}",ruta="{escapar_etiqueta(ruta)}"'
+            acumulado = 0
+            for limite, n in zip(LIMITES_DURACION_S, metricas.histograma):
+                acumulado += n
+                duracion.append(f'{base}_duracion_segundos_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+            duracion.append(f'{base}_duracion_segundos_bucket{{{etiquetas},le="+Inf"}} {metricas.peticiones}')
+            duracion.append(f"{base}_duracion_segundos_sum{{{etiquetas}}} {metricas.duracion_total!r}")
+            duracion.append(f"{base}_duracion_segundos_count{{{etiquetas}}} {metricas.peticiones}")
+            for estado, n in sorted(metricas.por_estado.items()):
+                peticiones.append(f'{base}_peticiones_total{{{etiquetas},estado="{estado}"}} {n}')
+            consultas.append(f"{base}_consultas_total{{{etiquetas}}} {metricas.consultas}")
+            tiempo_db.append(f"{base}_db_segundos_total{{{etiquetas}}} {metricas.tiempo_db!r}")
+            n_mas_uno.append(f"{base}_n_mas_uno_total{{{etiquetas}}} {metricas.n_mas_uno}")
+    return duracion + peticiones + consultas + tiempo_db + n_mas_uno
+
+
+registrar_seccion("peticiones", estadisticas)
+registrar_exportador("peticiones", exportar_prometheus)
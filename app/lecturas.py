@@ -0,0 +1,82 @@
+"""
+Filas de solo lectura para los listados.
+
+Los listados de libros, transacciones y movimientos de caja solo devuelven
+columnas escalares. Cargarlos como entidades del ORM cuesta bastante más por
+fila: cada entidad se registra en el mapa de identidad de la sesión, lleva su
+estado de instrumentación (para detectar cambios en el flush) y tiene sus
+relaciones (`Libro.transacciones`, `Transaccion.movimientos_caja`) listas para
+cargarse de forma perezosa, con una consulta por fila, al primer acceso.
+
+En cambio, los servicios consultan solo las columnas de cada esquema y
+construyen con cada fila un dataclass con `__slots__` (`FilaLibro`,
+`FilaTransaccion`, `FilaCaja`). Las filas no entran en el mapa de identidad,
+modificarlas no cambia nada en la base y no tienen atributos de relación, así
+que ninguna carga perezosa es posible. Se validan contra los esquemas de
+respuesta igual que las entidades (`orm_mode` lee atributos).
+
+Los campos van en el orden de los esquemas de respuesta: `columnas` deriva de
+ellos las columnas que se consultan.
+"""
+
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class FilaLibro:
+    titulo: str
+    precio_compra: float
+    precio_venta: float
+    ISBN: str
+    cantidad_actual: int
+
+
+@dataclass(slots=True)
+class FilaTransaccion:
+    ISBN: str
+    tipo_transaccion: int
+    cantidad: int
+    id_transaccion: int
+    fecha_transaccion: datetime
+
+
+@dataclass(slots=True)
+class FilaCaja:
+    tipo_movimiento: str
+    monto: float
+    saldo_actual: float
+    id_movimiento: int
+    fecha_movimiento: datetime
+    id_transaccion: Optional[int]
+
+
+def columnas(tipo: type, modelo: type) -> Tuple:
+    """
+    Columnas del modelo que corresponden a los campos del tipo de fila, en su orden.
+
+    Args:
+        tipo (type): Dataclass de la fila (FilaLibro, FilaTransaccion, FilaCaja)
+        modelo (type): Modelo del ORM con columnas del mismo nombre
+
+    Returns:
+        Tuple: Las columnas, para db.query(*columnas)
+    """
+    return tuple(getattr(modelo, campo.name) for campo in fields(tipo))
+
+
+def leer(filas: Iterable[tuple], tipo: Type[T]) -> List[T]:
+    """
+    Construye las filas de un tipo a partir del resultado de una consulta de columnas.
+
+    Args:
+        filas (Iterable[tuple]): Filas de una consulta de `columnas(tipo, modelo)`
+        tipo (Type[T]): Dataclass de la fila
+
+    Returns:
+        List[T]: Las filas
+    """
+    return [tipo(*fila) for fila in filas]
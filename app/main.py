@@ -1,14 +1,27 @@
-from fastapi import FastAPI
+from typing import Optional
+
+from fastapi import FastAPI, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
-from .database import engine
+from .cache import estadisticas_caches
+from .database import engine, SessionLocal
+from .instrumentacion import ACTIVA as INSTRUMENTACION_ACTIVA, MiddlewareInstrumentacion
+from .metricas import exportar_prometheus, recolectar
+from .migraciones import aplicar_migraciones
 from . import models
-from .models import models as models_file
-from .routers import libros, transacciones, caja, web
+from .routers import libros, transacciones, caja, eventos, reportes, analitica, web
+from .services import CajaService, EventoService, ReabastecimientoService
+
+# Crear las tablas y los índices que falten en la base de datos
+aplicar_migraciones(engine)
 
-# Crear las tablas en la base de datos
-models_file.Base.metadata.create_all(bind=engine)
+# Inicializar la cabecera de saldo y el resumen diario de caja si aún no existen,
+# generar los eventos del historial previo al registro de eventos y calcular las
+# velocidades de ventas de las ventas recientes
+with SessionLocal() as db:
+    CajaService.inicializar(db)
+    EventoService.inicializar(db)
+    ReabastecimientoService.inicializar(db)
 
 app = FastAPI(
     title="Tienda de Libros API",
@@ -23,13 +36,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
 
+# Medir cada petición: duración, consultas SQL, cabecera Server-Timing y métricas por ruta
+if INSTRUMENTACION_ACTIVA:
+    app.add_middleware(MiddlewareInstrumentacion)
+
 # Incluir los routers
 app.include_router(web.router)  # Router para páginas web
 app.include_router(libros.router)  # API de libros
 app.include_router(transacciones.router)  # API de transacciones
 app.include_router(caja.router)  # API de caja
+app.include_router(eventos.router)  # API de eventos y proyecciones
+app.include_router(reportes.router)  # API de reportes en segundo plano
+app.include_router(analitica.router)  # API de analítica de ventas
 
 @app.get("/api")
 async def root():
@@ -45,6 +66,44 @@ async def root():
         "endpoints": {
             "libros": "/api/libros",
             "transacciones": "/api/transacciones",
-            "caja": "/api/caja"
+            "caja": "/api/caja",
+            "eventos": "/api/eventos",
+            "reportes": "/api/reportes",
+            "analitica": "/api/analitica"
         }
-    }
\ No newline at end of file
+    }
+
+@app.get("/api/cache")
+def cache():
+    """
+    Estadísticas de las cachés del catálogo de este worker
+    
+    Retorna, por cada caché, el número de entradas, aciertos, fallos,
+    desalojos, vencimientos e invalidaciones.
+    """
+    return estadisticas_caches()
+
+@app.get("/api/metrics")
+def metrics(
+    request: Request,
+    formato: Optional[str] = Query(None, pattern="^(json|prometheus)$")
+):
+    """
+    Métricas de este worker
+
+    Retorna una sección por componente: `pool` (conexiones prestadas, desborde,
+    esperas de checkout y agotamientos de cada pool de conexiones), `cache`
+    (los mismos contadores que /api/cache) y `peticiones` (duración, consultas
+    SQL, tiempo en la base y N+1 por ruta).
+
+    Parámetros:
+    - **formato**: `json` o `prometheus` (texto de exposición de Prometheus). Por
+      defecto es JSON, salvo que la cabecera Accept pida texto, como hace el
+      scraper de Prometheus
+    """
+    aceptados = request.headers.get("accept", "")
+    if formato == "prometheus" or (
+        formato is None and ("text/plain" in aceptados or "openmetrics" in aceptados)
+    ):
+        return Response(exportar_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+    return recolectar()
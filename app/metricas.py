@@ -0,0 +1,217 @@
+"""
+Métricas de la aplicación.
+
+Cada componente registra una sección con una función que devuelve su estado
+actual, y `GET /api/metrics` las reúne en un solo documento JSON:
+
+- `pool`: uso del pool de conexiones de cada engine (conexiones prestadas,
+  desborde, esperas de checkout y agotamientos), medido con los eventos del pool
+  de SQLAlchemy.
+- `cache`: contadores de las cachés del catálogo.
+
+El mismo endpoint las entrega en el formato de texto de Prometheus (ver
+`exportar_prometheus`): las secciones con un exportador propio, como las
+peticiones HTTP de app/instrumentacion.py, se escriben con sus histogramas; las
+demás se aplanan a un gauge por cada valor numérico.
+
+Las métricas son del worker que atiende la petición; con varios workers de
+gunicorn cada uno reporta las suyas.
+"""
+
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Type
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+# Límites (en milisegundos) de los intervalos del histograma de esperas de checkout
+LIMITES_ESPERA_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+# Prefijo de los nombres de las métricas en el formato de Prometheus
+PREFIJO_PROMETHEUS = "tienda"
+
+_SECCIONES: Dict[str, Callable[[], Any]] = {}
+_EXPORTADORES: Dict[str, Callable[[], Iterable[str]]] = {}
+
+
+def registrar_seccion(nombre: str, funcion: Callable[[], Any]) -> None:
+    """
+    Registra una sección de métricas.
+
+    Args:
+        nombre (str): Nombre de la sección en el documento de métricas
+        funcion (Callable[[], Any]): Devuelve el estado actual de la sección
+    """
+    _SECCIONES[nombre] = funcion
+
+
+def registrar_exportador(nombre: str, funcion: Callable[[], Iterable[str]]) -> None:
+    """
+    Registra el exportador al formato de Prometheus de una sección, que reemplaza
+    al aplanado de su documento JSON.
+
+    Args:
+        nombre (str): Nombre de la sección
+        funcion (Callable[[], Iterable[str]]): Devuelve las líneas de texto de sus métricas
+    """
+    _EXPORTADORES[nombre] = funcion
+
+
+def recolectar() -> Dict[str, Any]:
+    """Estado actual de todas las secciones registradas."""
+    return {nombre: funcion() for nombre, funcion in _SECCIONES.items()}
+
+
+def exportar_prometheus() -> str:
+    """
+    Todas las secciones en el formato de texto de Prometheus (versión 0.0.4).
+
+    Las secciones sin exportador propio se aplanan: cada valor numérico o booleano
+    del documento JSON es un gauge cuyo nombre une las claves que llevan a él
+    (`tienda_pool_principal_checkouts`); los textos y valores nulos se omiten.
+    """
+    lineas: List[str] = []
+    for nombre, funcion in _SECCIONES.items():
+        if nombre in _EXPORTADORES:
+            lineas.extend(_EXPORTADORES[nombre]())
+        else:
+            _aplanar(f"{PREFIJO_PROMETHEUS}_{nombre_metrica(nombre)}", funcion(), lineas)
+    return "\n".join(lineas) + "\n"
+
+
+def nombre_metrica(clave: Any) -> str:
+    """Convierte una clave a un nombre válido de métrica (\"<=10\" -> \"le_10\")."""
+    texto = str(clave).replace("<=", "le_").replace(">", "gt_")
+    return re.sub(r"[^a-zA-Z0-9_]", "_", texto)
+
+
+def escapar_etiqueta(valor: Any) -> str:
+    """Escapa el valor de una etiqueta de Prometheus."""
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _aplanar(nombre: str, valor: Any, lineas: List[str]) -> None:
+    if isinstance(valor, dict):
+        for clave, subvalor in valor.items():
+            _aplanar(f"{nombre}_{nombre_metrica(clave)}", subvalor, lineas)
+    elif isinstance(valor, (bool, int, float)):
+        lineas.append(f"# TYPE {nombre} gauge")
+        lineas.append(f"{nombre} {valor!r}" if isinstance(valor, float) else f"{nombre} {int(valor)}")
+
+
+class MetricasPool:
+    """
+    Contadores de uso de un pool de conexiones.
+
+    Los eventos `connect`, `checkout`, `checkin` e `invalidate` del pool cuentan las
+    conexiones; el tiempo de espera de cada checkout lo mide la clase de pool creada
+    con `clase_pool_medida`, porque SQLAlchemy no tiene un evento previo al checkout.
+    """
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.pool: Pool = None
+        self._bloqueo = threading.Lock()
+        self.conexiones_creadas = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidaciones = 0
+        self.agotamientos = 0
+        self.esperas = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.histograma_espera = [0] * (len(LIMITES_ESPERA_MS) + 1)
+
+    def instrumentar(self, engine: Engine) -> None:
+        """Escucha los eventos del pool del engine."""
+        self.pool = engine.pool
+        event.listen(engine, "connect", self._al_conectar)
+        event.listen(engine, "checkout", self._al_prestar)
+        event.listen(engine, "checkin", self._al_devolver)
+        event.listen(engine, "invalidate", self._al_invalidar)
+
+    def registrar_espera(self, segundos: float, agotado: bool = False) -> None:
+        """Registra el tiempo que tardó un checkout (o hasta que venció pool_timeout)."""
+        milisegundos = segundos * 1000
+        intervalo = next(
+            (i for i, limite in enumerate(LIMITES_ESPERA_MS) if milisegundos <= limite), len(LIMITES_ESPERA_MS)
+        )
+        with self._bloqueo:
+            self.esperas += 1
+            self.espera_total += segundos
+            self.espera_maxima = max(self.espera_maxima, segundos)
+            self.histograma_espera[intervalo] += 1
+            if agotado:
+                self.agotamientos += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estado actual del pool y contadores acumulados."""
+        pool = self.pool
+        with self._bloqueo:
+            datos = {
+                "clase": type(pool).__name__ if pool is not None else None,
+                "conexiones_creadas": self.conexiones_creadas,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidaciones": self.invalidaciones,
+                "agotamientos": self.agotamientos,
+                "espera_media_ms": round(self.espera_total / self.esperas * 1000, 3) if self.esperas else 0.0,
+                "espera_maxima_ms": round(self.espera_maxima * 1000, 3),
+                "histograma_espera_ms": {
+                    **{f"<={limite}": n for limite, n in zip(LIMITES_ESPERA_MS, self.histograma_espera)},
+                    f">{LIMITES_ESPERA_MS[-1]}": self.histograma_espera[-1],
+                },
+            }
+        # Estado instantáneo (solo en los pools con tamaño, como QueuePool)
+        if pool is not None and hasattr(pool, "checkedout"):
+            datos.update({
+                "tamano": pool.size(),
+                "prestadas": pool.checkedout(),
+                "disponibles": pool.checkedin(),
+                "desborde": pool.overflow(),
+                "max_desborde": pool._max_overflow,
+                "timeout": pool.timeout(),
+            })
+        return datos
+
+    def _al_conectar(self, conexion_dbapi, registro) -> None:
+        with self._bloqueo:
+            self.conexiones_creadas += 1
+
+    def _al_prestar(self, conexion_dbapi, registro, proxy) -> None:
+        with self._bloqueo:
+            self.checkouts += 1
+
+    def _al_devolver(self, conexion_dbapi, registro) -> None:
+        with self._bloqueo:
+            self.checkins += 1
+
+    def _al_invalidar(self, conexion_dbapi, registro, excepcion) -> None:
+        with self._bloqueo:
+            self.invalidaciones += 1
+
+
+def clase_pool_medida(base: Type[Pool], metricas: MetricasPool) -> Type[Pool]:
+    """
+    Crea una subclase de la clase de pool que mide el tiempo de espera de cada
+    checkout, incluidos los que fallan por pool_timeout (agotamientos).
+
+    La subclase lleva sus métricas consigo, así que se conservan cuando el pool se
+    recrea (por ejemplo, con engine.dispose()).
+    """
+    class PoolMedido(base):
+        def _do_get(self):
+            inicio = time.perf_counter()
+            try:
+                conexion = super()._do_get()
+            except exc.TimeoutError:
+                metricas.registrar_espera(time.perf_counter() - inicio, agotado=True)
+                raise
+            metricas.registrar_espera(time.perf_counter() - inicio)
+            return conexion
+
+    PoolMedido.__name__ = PoolMedido.__qualname__ = f"{base.__name__}Medido"
+    return PoolMedido
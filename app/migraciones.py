@@ -0,0 +1,238 @@
+"""
+Migraciones del esquema para bases de datos ya existentes.
+
+`Base.metadata.create_all` crea las tablas nuevas pero no toca las que ya
+existen, así que los índices agregados después a un modelo nunca llegarían a
+una base creada con una versión anterior. `aplicar_migraciones` recorre los
+índices declarados en los modelos y crea los que falten, agrega los tipos de
+transacción que falten (las claves foráneas de `transacciones` los exigen), en
+SQLite con FTS5 crea el índice de búsqueda de títulos y reescribe sin guiones ni
+espacios los ISBN guardados antes de que la API los normalizara.
+"""
+
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import case, inspect, select, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
+
+from .models import models
+from .schemas.schemas import normalizar_isbn
+
+# Filas fijas de tipos_transaccion
+TIPOS_TRANSACCION = {1: "VENTA", 2: "ABASTECIMIENTO"}
+
+
+def aplicar_migraciones(engine: Engine) -> List[str]:
+    """
+    Crea las tablas y los índices declarados en los modelos que aún no existan.
+
+    Args:
+        engine (Engine): Motor de base de datos
+
+    Returns:
+        List[str]: Nombres de los índices creados
+    """
+    models.Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    creados = []
+    for tabla in models.Base.metadata.sorted_tables:
+        existentes = {indice["name"] for indice in inspector.get_indexes(tabla.name)}
+        for indice in sorted(tabla.indexes, key=lambda indice: indice.name):
+            if indice.name not in existentes:
+                indice.create(bind=engine, checkfirst=True)
+                creados.append(indice.name)
+
+    asegurar_tipos_transaccion(engine)
+    if crear_indice_busqueda(engine):
+        creados.append(TABLA_BUSQUEDA)
+    normalizar_isbns(engine)
+    return creados
+
+
+def asegurar_tipos_transaccion(engine: Engine) -> None:
+    """
+    Inserta los tipos de transacción que falten.
+
+    Args:
+        engine (Engine): Motor de base de datos
+    """
+    tabla = models.TipoTransaccion.__table__
+    try:
+        with engine.begin() as conexion:
+            existentes = set(conexion.execute(select(tabla.c.id_tipo)).scalars())
+            faltantes = [
+                {"id_tipo": id_tipo, "nombre": nombre}
+                for id_tipo, nombre in TIPOS_TRANSACCION.items() if id_tipo not in existentes
+            ]
+            if faltantes:
+                conexion.execute(tabla.insert(), faltantes)
+    except IntegrityError:
+        # Otro worker los insertó al mismo tiempo
+        pass
+
+
+def reclamar_inicializacion(db: Session, nombre: str) -> bool:
+    """
+    Reserva un relleno único de arranque (ver models.Inicializacion) para la
+    transacción de la sesión, con INSERT ... ON CONFLICT DO NOTHING sobre su fila.
+
+    Con varios workers arrancando a la vez, solo uno inserta la fila: el INSERT de
+    los demás espera a que esa transacción termine y no inserta nada. Debe ser la
+    primera escritura de la transacción, y el relleno debe confirmarse en el mismo
+    commit que la fila: si falla y se revierte, el siguiente arranque lo reintenta.
+
+    Args:
+        db (Session): Sesión de base de datos, sin cambios pendientes
+        nombre (str): Nombre del relleno
+
+    Returns:
+        bool: True si esta transacción debe hacer el relleno
+    """
+    tabla = models.Inicializacion.__table__
+    valores = {"nombre": nombre, "fecha": datetime.now()}
+    dialecto = db.get_bind().dialect.name
+    try:
+        if dialecto in ("sqlite", "postgresql"):
+            insert = sqlite_insert if dialecto == "sqlite" else postgresql_insert
+            return db.execute(
+                insert(tabla).values(**valores).on_conflict_do_nothing(index_elements=[tabla.c.nombre])
+            ).rowcount == 1
+        with db.begin_nested():
+            db.execute(tabla.insert().values(**valores))
+        return True
+    except IntegrityError:
+        return False
+    except OperationalError:
+        # La espera superó el busy_timeout de SQLite: otro worker sigue con el relleno
+        db.rollback()
+        return False
+
+
+# Tamaño de los grupos de ISBN que se reescriben con una sola sentencia por tabla
+LOTE_ISBN = 500
+
+
+def normalizar_isbns(engine: Engine) -> int:
+    """
+    Reescribe con su forma normalizada (schemas.normalizar_isbn) los ISBN de libros
+    guardados con guiones o espacios, junto con las filas de las demás tablas que
+    los referencian (transacciones, eventos, velocidades y proyecciones). Sin esto
+    esos libros no se encontrarían por ruta ni al vender, que ya normalizan el ISBN.
+
+    Se hace una sola vez (fila `isbns_normalizados` de inicializaciones) y en una
+    transacción. Un libro cuyo ISBN normalizado ya existe se deja como está, para no
+    mezclar dos libros distintos.
+
+    Args:
+        engine (Engine): Motor de base de datos
+
+    Returns:
+        int: Libros reescritos
+    """
+    libros = models.Libro.__table__
+    with Session(bind=engine) as db:
+        if not reclamar_inicializacion(db, "isbns_normalizados"):
+            return 0
+
+        # LIKE filtra en SQL los candidatos (en SQLite '%x' también toma 'X')
+        candidatos = db.execute(
+            select(libros.c.ISBN).where(
+                libros.c.ISBN.like("%-%") | libros.c.ISBN.like("% %") | libros.c.ISBN.like("%x")
+            )
+        ).scalars().all()
+        cambios = {}
+        for viejo in candidatos:
+            nuevo = normalizar_isbn(viejo)
+            if nuevo != viejo and nuevo not in cambios.values():
+                cambios[viejo] = nuevo
+        if cambios:
+            existentes = set()
+            nuevos = list(cambios.values())
+            for inicio in range(0, len(nuevos), LOTE_ISBN):
+                existentes.update(db.execute(
+                    select(libros.c.ISBN).where(libros.c.ISBN.in_(nuevos[inicio:inicio + LOTE_ISBN]))
+                ).scalars())
+            cambios = {viejo: nuevo for viejo, nuevo in cambios.items() if nuevo not in existentes}
+        if not cambios:
+            db.commit()
+            return 0
+
+        # Primero el libro con el ISBN nuevo, luego las filas que lo referencian
+        # (la clave foránea de transacciones lo exige) y al final el libro viejo
+        tablas = [
+            tabla for tabla in models.Base.metadata.sorted_tables
+            if tabla is not libros and "ISBN" in tabla.c
+        ]
+        viejos = list(cambios)
+        for inicio in range(0, len(viejos), LOTE_ISBN):
+            grupo = {viejo: cambios[viejo] for viejo in viejos[inicio:inicio + LOTE_ISBN]}
+            filas = db.execute(select(libros).where(libros.c.ISBN.in_(grupo))).mappings().all()
+            db.execute(libros.insert(), [{**fila, "ISBN": grupo[fila["ISBN"]]} for fila in filas])
+            for tabla in tablas:
+                db.execute(
+                    tabla.update()
+                    .where(tabla.c.ISBN.in_(grupo))
+                    .values(ISBN=case(grupo, value=tabla.c.ISBN))
+                )
+            db.execute(libros.delete().where(libros.c.ISBN.in_(grupo)))
+
+        if inspect(db.connection()).has_table(TABLA_BUSQUEDA):
+            db.execute(text(f"DELETE FROM {TABLA_BUSQUEDA}"))
+            db.execute(text(f"INSERT INTO {TABLA_BUSQUEDA} (ISBN, titulo) SELECT ISBN, titulo FROM libros"))
+
+        # Cambia la marca de cambios del catálogo (ETag de las lecturas de libros)
+        from .services.libro_service import LibroService
+        LibroService.registrar_cambio(db)
+        db.commit()
+    return len(cambios)
+
+
+# Índice de texto completo de los títulos (SQLite FTS5). unicode61 con
+# remove_diacritics ignora mayúsculas y acentos ("canción" coincide con
+# "CANCION"), y los índices de prefijos de 2 y 3 letras resuelven las búsquedas
+# de palabras incompletas sin recorrer todo el vocabulario. ISBN es una columna
+# indexada para poder borrar las filas de un libro con MATCH.
+TABLA_BUSQUEDA = "libros_fts"
+DDL_BUSQUEDA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_BUSQUEDA} USING fts5("
+    "ISBN, titulo, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+
+def fts5_disponible(engine: Engine) -> bool:
+    """Indica si la base es SQLite compilado con FTS5."""
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect() as conexion:
+        opciones = conexion.exec_driver_sql("PRAGMA compile_options").scalars().all()
+    return "ENABLE_FTS5" in opciones
+
+
+def crear_indice_busqueda(engine: Engine) -> bool:
+    """
+    Crea el índice de búsqueda de títulos si la base lo admite y aún no existe, y
+    lo llena con el catálogo actual.
+
+    Args:
+        engine (Engine): Motor de base de datos
+
+    Returns:
+        bool: True si el índice se creó
+    """
+    if not fts5_disponible(engine) or inspect(engine).has_table(TABLA_BUSQUEDA):
+        return False
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql(DDL_BUSQUEDA)
+        # Una sola sentencia condicionada: si otro worker creó y llenó el índice
+        # al mismo tiempo, no se duplican las filas
+        conexion.execute(text(
+            f"INSERT INTO {TABLA_BUSQUEDA} (ISBN, titulo) SELECT ISBN, titulo FROM libros "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {TABLA_BUSQUEDA})"
+        ))
+    return True
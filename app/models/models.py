@@ -1,4 +1,6 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, CheckConstraint, func
+from sqlalchemy import (
+    Boolean, Column, String, Integer, Float, Date, DateTime, Text, ForeignKey, CheckConstraint, Index, func
+)
 from sqlalchemy.orm import relationship
 from ..database import Base
 
@@ -45,6 +47,12 @@ class Transaccion(Base):
     
     __table_args__ = (
         CheckConstraint('cantidad > 0', name='chk_cantidad_transaccion'),
+        # Listado general, del más reciente al más antiguo
+        Index('ix_transacciones_fecha', 'fecha_transaccion', 'id_transaccion'),
+        # Transacciones de un libro ordenadas por fecha (y verificación de existencia por ISBN)
+        Index('ix_transacciones_isbn_fecha', 'ISBN', 'fecha_transaccion', 'id_transaccion'),
+        # Filtros por tipo de transacción dentro de un rango de fechas
+        Index('ix_transacciones_tipo_fecha', 'tipo_transaccion', 'fecha_transaccion', 'id_transaccion'),
     )
 
 class Caja(Base):
@@ -61,4 +69,147 @@ class Caja(Base):
     
     __table_args__ = (
         CheckConstraint("tipo_movimiento IN ('INGRESO', 'EGRESO')", name='chk_tipo_movimiento'),
-    )
\ No newline at end of file
+        # Listado de movimientos, del más reciente al más antiguo
+        Index('ix_caja_fecha', 'fecha_movimiento', 'id_movimiento'),
+        # Movimientos asociados a una transacción
+        Index('ix_caja_id_transaccion', 'id_transaccion'),
+    )
+
+class SaldoCaja(Base):
+    __tablename__ = "saldo_caja"
+    
+    # Fila única que actúa como cabecera del libro de caja
+    id_saldo = Column(Integer, primary_key=True)
+    saldo_actual = Column(Float, default=0, nullable=False)
+    id_ultimo_movimiento = Column(Integer, ForeignKey("caja.id_movimiento"), nullable=True)
+    fecha_actualizacion = Column(DateTime, default=func.now(), nullable=False)
+
+class ResumenCajaDiario(Base):
+    __tablename__ = "resumen_caja_diario"
+    
+    # Totales de caja por día, acumulados con cada movimiento
+    fecha = Column(Date, primary_key=True)
+    total_ingresos = Column(Float, default=0, nullable=False)
+    total_egresos = Column(Float, default=0, nullable=False)
+    num_ingresos = Column(Integer, default=0, nullable=False)
+    num_egresos = Column(Integer, default=0, nullable=False)
+
+class VersionTabla(Base):
+    __tablename__ = "versiones_tablas"
+    
+    # Contador de cambios por tabla, para las tablas cuyas filas se modifican
+    # en el lugar y no tienen un ID creciente que sirva de marca de cambios
+    tabla = Column(String(50), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+class Evento(Base):
+    __tablename__ = "eventos"
+    
+    # Registro de solo inserción de los cambios de inventario y caja, en orden.
+    # ISBN no es clave foránea: los eventos de un libro se conservan aunque se elimine
+    id_evento = Column(Integer, primary_key=True)
+    tipo = Column(String(30), nullable=False)
+    fecha = Column(DateTime, nullable=False)
+    ISBN = Column(String(13), nullable=True)
+    cantidad = Column(Integer, nullable=True)
+    monto = Column(Float, nullable=True)
+    id_transaccion = Column(Integer, nullable=True)
+    id_movimiento = Column(Integer, nullable=True)
+
+class CheckpointProyeccion(Base):
+    __tablename__ = "proyecciones_checkpoints"
+    
+    # Último evento aplicado por cada proyección
+    nombre = Column(String(50), primary_key=True)
+    ultimo_evento = Column(Integer, default=0, nullable=False)
+    fecha_actualizacion = Column(DateTime, nullable=True)
+
+class ProyeccionStock(Base):
+    __tablename__ = "proyeccion_stock"
+    
+    # Stock de cada libro reconstruido desde los eventos
+    ISBN = Column(String(13), primary_key=True)
+    cantidad = Column(Integer, default=0, nullable=False)
+
+class ProyeccionSaldo(Base):
+    __tablename__ = "proyeccion_saldo"
+    
+    # Fila única con el saldo de caja reconstruido desde los eventos
+    id_saldo = Column(Integer, primary_key=True)
+    saldo = Column(Float, default=0, nullable=False)
+    total_ingresos = Column(Float, default=0, nullable=False)
+    total_egresos = Column(Float, default=0, nullable=False)
+    num_movimientos = Column(Integer, default=0, nullable=False)
+
+class ProyeccionVentas(Base):
+    __tablename__ = "proyeccion_ventas"
+    
+    # Estadísticas de ventas por libro reconstruidas desde los eventos
+    ISBN = Column(String(13), primary_key=True)
+    num_ventas = Column(Integer, default=0, nullable=False)
+    unidades_vendidas = Column(Integer, default=0, nullable=False)
+    ingresos = Column(Float, default=0, nullable=False)
+    ultima_venta = Column(DateTime, nullable=True)
+
+class ProyeccionVentasDiarias(Base):
+    __tablename__ = "proyeccion_ventas_diarias"
+    
+    # Ventas de cada libro por día reconstruidas desde los eventos, para la analítica
+    ISBN = Column(String(13), primary_key=True)
+    fecha = Column(Date, primary_key=True)
+    num_ventas = Column(Integer, default=0, nullable=False)
+    unidades = Column(Integer, default=0, nullable=False)
+    ingresos = Column(Float, default=0, nullable=False)
+    
+    __table_args__ = (
+        # Agregados por rango de fechas
+        Index('ix_proyeccion_ventas_diarias_fecha', 'fecha', 'ISBN'),
+    )
+
+class VelocidadVentas(Base):
+    __tablename__ = "velocidad_ventas"
+    
+    # Velocidad de ventas de cada libro (promedio móvil exponencial de unidades
+    # por día a la fecha_velocidad) y si su stock quedó en o bajo el punto de
+    # reorden; se actualizan con cada venta y cada cambio de stock del libro
+    ISBN = Column(String(13), primary_key=True)
+    velocidad = Column(Float, default=0, nullable=False)
+    fecha_velocidad = Column(DateTime, nullable=False)
+    bajo_stock = Column(Boolean, default=False, nullable=False)
+    
+    __table_args__ = (
+        # Conjunto de libros con stock bajo
+        Index('ix_velocidad_ventas_bajo_stock', 'bajo_stock', 'ISBN'),
+    )
+
+class Inicializacion(Base):
+    __tablename__ = "inicializaciones"
+    
+    # Rellenos únicos que se hacen al iniciar la aplicación sobre una base con
+    # historial (eventos, velocidades de ventas). El worker que inserta la fila
+    # hace el relleno en la misma transacción; los demás lo omiten
+    nombre = Column(String(50), primary_key=True)
+    fecha = Column(DateTime, nullable=False)
+
+class Reporte(Base):
+    __tablename__ = "reportes"
+    
+    # Trabajos de reportes pesados ejecutados fuera de las peticiones. La clave
+    # resume el tipo, los parámetros y la marca de datos del momento del pedido:
+    # los pedidos con la misma clave comparten el resultado
+    id_reporte = Column(Integer, primary_key=True)
+    tipo = Column(String(50), nullable=False)
+    parametros = Column(Text, nullable=False)
+    marca = Column(String(100), nullable=False)
+    clave = Column(String(64), nullable=False)
+    estado = Column(String(20), nullable=False)
+    resultado = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    fecha_creacion = Column(DateTime, nullable=False)
+    fecha_inicio = Column(DateTime, nullable=True)
+    fecha_fin = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        # Búsqueda del último reporte con la misma clave
+        Index('ix_reportes_clave', 'clave', 'id_reporte'),
+    )
@@ -0,0 +1,121 @@
+"""
+Paginación por cursor (keyset) para los listados de la API.
+
+En lugar de OFFSET, cada página continúa desde la clave de la última fila de la
+página anterior: `WHERE (fecha, id) < (:fecha, :id) ORDER BY fecha DESC, id DESC`.
+El costo de una página no depende de su profundidad y las filas insertadas
+mientras se pagina no desplazan los resultados.
+
+El cursor es opaco para el cliente: la clave de la última fila codificada como
+JSON en base64 URL-safe. Se devuelve en la cabecera `X-Next-Cursor`.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, or_
+
+# Cabecera de respuesta con el cursor de la página siguiente
+CABECERA_CURSOR = "X-Next-Cursor"
+
+
+def codificar_cursor(*valores: Any) -> str:
+    """
+    Codifica la clave de una fila como cursor opaco.
+
+    Args:
+        *valores: Valores de las columnas de ordenamiento de la fila
+
+    Returns:
+        str: Cursor en base64 URL-safe
+    """
+    datos = [valor.isoformat() if isinstance(valor, datetime) else valor for valor in valores]
+    crudo = json.dumps(datos, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, *tipos: type) -> tuple:
+    """
+    Decodifica un cursor generado por `codificar_cursor`.
+
+    Args:
+        cursor (str): Cursor recibido del cliente
+        *tipos: Tipo de cada valor de la clave (datetime, int, str...)
+
+    Returns:
+        tuple: Valores de la clave convertidos a sus tipos
+
+    Raises:
+        HTTPException: Si el cursor no es válido
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(datos, list) or len(datos) != len(tipos):
+            raise ValueError("Número de valores incorrecto")
+        return tuple(
+            datetime.fromisoformat(valor) if tipo is datetime else tipo(valor)
+            for valor, tipo in zip(datos, tipos)
+        )
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación no válido"
+        )
+
+
+def despues_de(columnas: Sequence, valores: Sequence, descendente: bool = False):
+    """
+    Condición keyset para continuar después de una fila.
+
+    Equivale a `(a, b) > (x, y)` (o `<` si el orden es descendente), expandida
+    como `a > x OR (a = x AND b > y)` para que funcione en cualquier motor y
+    pueda resolverse con el índice de las columnas.
+
+    Args:
+        columnas (Sequence): Columnas de ordenamiento
+        valores (Sequence): Valores de esas columnas en la última fila vista
+        descendente (bool): Si el listado está en orden descendente
+
+    Returns:
+        Expresión SQL para usar en filter()
+    """
+    condicion = None
+    for columna, valor in reversed(list(zip(columnas, valores))):
+        comparacion = columna < valor if descendente else columna > valor
+        if condicion is None:
+            condicion = comparacion
+        else:
+            condicion = or_(comparacion, and_(columna == valor, condicion))
+    return condicion
+
+
+def siguiente_cursor(items: Sequence, limit: int, *atributos: str) -> Optional[str]:
+    """
+    Calcula el cursor de la página siguiente a partir de la última fila.
+
+    Args:
+        items (Sequence): Filas de la página actual
+        limit (int): Tamaño de página solicitado
+        *atributos: Atributos de la fila que forman la clave
+
+    Returns:
+        Optional[str]: El cursor, o None si no hay más páginas
+    """
+    if not items or len(items) < limit:
+        return None
+    ultimo = items[-1]
+    return codificar_cursor(*(getattr(ultimo, atributo) for atributo in atributos))
+
+
+def agregar_cursor(response: Response, items: Sequence, limit: int, *atributos: str) -> None:
+    """
+    Agrega la cabecera `X-Next-Cursor` a la respuesta si hay una página siguiente.
+    """
+    cursor = siguiente_cursor(items, limit, *atributos)
+    if cursor is not None:
+        response.headers[CABECERA_CURSOR] = cursor
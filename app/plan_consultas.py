@@ -0,0 +1,175 @@
+"""
+Verificación de los planes de ejecución de las consultas de los servicios.
+
+Ejecuta las operaciones de lectura y escritura de los servicios sobre una base
+SQLite con el esquema de los modelos, captura cada sentencia SQL que emiten y
+la analiza con `EXPLAIN QUERY PLAN`. Una consulta que recorre una tabla completa
+(`SCAN tabla` sin índice) indica que falta un índice para su forma.
+
+Pensado para correr en CI con `python -m app.cli verificar-indices`.
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Callable, List, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from .migraciones import aplicar_migraciones
+from .models import models
+from .paginacion import codificar_cursor
+from .schemas import schemas
+from .services import (
+    AnaliticaService, BusquedaService, CajaService, EventoService, LibroService, ProyeccionService,
+    ReabastecimientoService, ReporteService, TransaccionService
+)
+
+# Tablas de tamaño acotado por diseño (una fila, o una por día) que pueden recorrerse completas
+TABLAS_ACOTADAS = {
+    "saldo_caja", "resumen_caja_diario", "tipos_transaccion", "versiones_tablas",
+    "proyeccion_saldo", "proyecciones_checkpoints",
+}
+
+_RECORRIDO_COMPLETO = re.compile(r"^SCAN (\w+)$")
+
+ISBN_PRUEBA = "9780000000001"
+FECHA_PRUEBA = datetime(2024, 1, 1, 12, 0, 0)
+
+
+@dataclass
+class PlanConsulta:
+    operacion: str
+    sentencia: str
+    plan: List[str]
+    recorridos_completos: List[str] = field(default_factory=list)
+
+    @property
+    def valido(self) -> bool:
+        return not self.recorridos_completos
+
+
+def _escenarios() -> List[Tuple[str, Callable[[Session], object]]]:
+    """Operaciones de los servicios cuyas consultas se analizan."""
+    cursor_libro = codificar_cursor(ISBN_PRUEBA)
+    cursor_fecha = codificar_cursor(FECHA_PRUEBA, 1)
+    return [
+        ("LibroService.get_libro", lambda db: LibroService.get_libro(db, ISBN_PRUEBA)),
+        ("LibroService.get_libros", lambda db: LibroService.get_libros(db)),
+        ("LibroService.get_libros (cursor)", lambda db: LibroService.get_libros(db, cursor=cursor_libro)),
+        ("LibroService.delete_libro", lambda db: LibroService.delete_libro(db, ISBN_PRUEBA)),
+        ("LibroService.get_marca_cambios", lambda db: LibroService.get_marca_cambios(db)),
+        ("BusquedaService.buscar", lambda db: BusquedaService.buscar(db, "libro prue")),
+        ("BusquedaService.buscar (ISBN)", lambda db: BusquedaService.buscar(db, ISBN_PRUEBA[:7])),
+        ("TransaccionService.get_marca_cambios", lambda db: TransaccionService.get_marca_cambios(db)),
+        ("CajaService.get_marca_cambios", lambda db: CajaService.get_marca_cambios(db)),
+        ("TransaccionService.get_transaccion", lambda db: TransaccionService.get_transaccion(db, 1)),
+        ("TransaccionService.get_transacciones", lambda db: TransaccionService.get_transacciones(db)),
+        ("TransaccionService.get_transacciones (cursor)",
+         lambda db: TransaccionService.get_transacciones(db, cursor=cursor_fecha)),
+        ("TransaccionService.get_transacciones (tipo y fechas)",
+         lambda db: TransaccionService.get_transacciones(db, filtro=schemas.FiltroTransacciones(
+             tipo_transaccion=1, fecha_desde=date(2024, 1, 1), fecha_hasta=date(2024, 1, 31)))),
+        ("TransaccionService.get_transacciones (ISBN y cantidades)",
+         lambda db: TransaccionService.get_transacciones(db, filtro=schemas.FiltroTransacciones(
+             isbns=[ISBN_PRUEBA], cantidad_min=1, cantidad_max=5))),
+        ("TransaccionService.iterar_transacciones",
+         lambda db: list(TransaccionService.iterar_transacciones(db, schemas.FiltroTransacciones(
+             fecha_desde=date(2024, 1, 1))))),
+        ("TransaccionService.get_transacciones_por_libro",
+         lambda db: TransaccionService.get_transacciones_por_libro(db, ISBN_PRUEBA)),
+        ("TransaccionService.get_transacciones_por_libro (cursor)",
+         lambda db: TransaccionService.get_transacciones_por_libro(db, ISBN_PRUEBA, cursor=cursor_fecha)),
+        ("TransaccionService.create_transaccion", lambda db: TransaccionService.create_transaccion(
+            db, schemas.TransaccionCreate(ISBN=ISBN_PRUEBA, tipo_transaccion=1, cantidad=1))),
+        ("CajaService.get_movimiento", lambda db: CajaService.get_movimiento(db, 1)),
+        ("CajaService.get_movimientos", lambda db: CajaService.get_movimientos(db)),
+        ("CajaService.get_movimientos (cursor)", lambda db: CajaService.get_movimientos(db, cursor=cursor_fecha)),
+        ("CajaService.get_saldo_actual", lambda db: CajaService.get_saldo_actual(db)),
+        ("CajaService.get_resumen", lambda db: CajaService.get_resumen(
+            db, fecha_desde=date(2024, 1, 1), fecha_hasta=date(2024, 12, 31), periodo="mes")),
+        ("CajaService.create_movimiento", lambda db: CajaService.create_movimiento(
+            db, schemas.CajaCreate(tipo_movimiento="EGRESO", monto=1, saldo_actual=0))),
+        ("EventoService.get_eventos", lambda db: EventoService.get_eventos(db, desde_id=1)),
+        ("EventoService.get_marca_cambios", lambda db: EventoService.get_marca_cambios(db)),
+        ("ProyeccionService.actualizar", lambda db: ProyeccionService.actualizar(db)),
+        ("ProyeccionService.consultar", lambda db: ProyeccionService.consultar(db, "ventas")),
+        ("ProyeccionService.estado", lambda db: ProyeccionService.estado(db)),
+        ("ReporteService.crear_reporte",
+         lambda db: ReporteService.crear_reporte(db, "totales", schemas.ParametrosReporte())),
+        ("ReporteService.get_reporte", lambda db: ReporteService.get_reporte(db, 1)),
+        ("AnaliticaService.get_mas_vendidos", lambda db: AnaliticaService.get_mas_vendidos(db)),
+        ("AnaliticaService.get_margen", lambda db: AnaliticaService.get_margen(db)),
+        ("AnaliticaService.get_rotacion", lambda db: AnaliticaService.get_rotacion(db)),
+        ("ReabastecimientoService.get_sugerencias", lambda db: ReabastecimientoService.get_sugerencias(db)),
+    ]
+
+
+def _sembrar(db: Session) -> None:
+    """Inserta los datos mínimos para que cada operación llegue a todas sus consultas."""
+    db.add(
+        models.Libro(ISBN=ISBN_PRUEBA, titulo="Libro de prueba", precio_compra=1, precio_venta=2, cantidad_actual=10)
+    )
+    db.flush()
+    db.add(models.Transaccion(ISBN=ISBN_PRUEBA, tipo_transaccion=1, cantidad=1, fecha_transaccion=FECHA_PRUEBA))
+    db.flush()
+    CajaService.registrar_movimiento(db, "INGRESO", 100, id_transaccion=1, fecha=FECHA_PRUEBA)
+    db.commit()
+
+
+def verificar_planes(url: str = "sqlite://") -> List[PlanConsulta]:
+    """
+    Analiza con EXPLAIN QUERY PLAN cada consulta emitida por los servicios.
+
+    Args:
+        url (str): URL de una base SQLite (por defecto, una base en memoria nueva)
+
+    Returns:
+        List[PlanConsulta]: El plan de cada sentencia y los recorridos completos detectados
+    """
+    engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    if engine.dialect.name != "sqlite":
+        raise ValueError("La verificación de planes solo está disponible para SQLite")
+    aplicar_migraciones(engine)
+
+    planes = []
+    with engine.connect() as conexion:
+        transaccion = conexion.begin()
+        db = Session(bind=conexion, join_transaction_mode="create_savepoint")
+        _sembrar(db)
+
+        capturadas = []
+
+        def capturar(conn, cursor, sentencia, parametros, contexto, executemany):
+            if sentencia.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                capturadas.append((sentencia, parametros[0] if executemany else parametros))
+
+        for operacion, ejecutar in _escenarios():
+            capturadas.clear()
+            event.listen(engine, "before_cursor_execute", capturar)
+            try:
+                ejecutar(db)
+            except HTTPException:
+                pass
+            finally:
+                event.remove(engine, "before_cursor_execute", capturar)
+            db.rollback()
+
+            for sentencia, parametros in list(capturadas):
+                filas = conexion.exec_driver_sql("EXPLAIN QUERY PLAN " + sentencia, parametros).fetchall()
+                plan = [fila[-1] for fila in filas]
+                recorridos = [
+                    detalle for detalle in plan
+                    if (coincidencia := _RECORRIDO_COMPLETO.match(detalle))
+                    and coincidencia.group(1) not in TABLAS_ACOTADAS
+                ]
+                planes.append(PlanConsulta(operacion, " ".join(sentencia.split()), plan, recorridos))
+
+        db.close()
+        transaccion.rollback()
+
+    engine.dispose()
+    return planes
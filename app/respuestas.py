@@ -0,0 +1,67 @@
+"""
+Respuestas JSON rápidas para los listados grandes.
+
+Por defecto FastAPI valida cada elemento devuelto por un endpoint contra su
+`response_model` (construyendo un modelo de Pydantic por fila), lo convierte a
+tipos JSON y lo codifica con el módulo json de la biblioteca estándar. Con
+RESPUESTAS_RAPIDAS=1 los listados de libros, transacciones y movimientos de caja
+leen solo las columnas (filas de SQLAlchemy, no entidades del ORM) y responden
+con `RespuestaJSON`, que codifica esas filas directamente: los datos vienen de
+la base y ya tienen los tipos del esquema, así que no se vuelven a validar.
+
+`RespuestaJSON` usa orjson si está instalado y, si no, el módulo json con el
+mismo formato compacto que JSONResponse de FastAPI. El JSON resultante es el
+mismo que el del camino normal; `benchmarks/serializacion.py` compara ambos.
+"""
+
+import json
+import os
+from datetime import date, datetime
+from typing import Any, Sequence
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+RESPUESTAS_RAPIDAS = os.getenv("RESPUESTAS_RAPIDAS", "0").lower() in ("1", "true", "si", "yes")
+
+
+def _a_json(valor: Any) -> Any:
+    """Convierte a JSON los tipos que el módulo json no conoce (fechas)."""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f"No se puede convertir a JSON un valor de tipo {type(valor).__name__}")
+
+
+class RespuestaJSON(JSONResponse):
+    """Respuesta JSON codificada con orjson, o con json si orjson no está instalado."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_a_json
+        ).encode("utf-8")
+
+
+def respuesta_filas(response: Response, filas: Sequence) -> RespuestaJSON:
+    """
+    Respuesta con las filas de una consulta de columnas, una por objeto JSON.
+
+    Un endpoint que devuelve su propia respuesta no recibe las cabeceras puestas
+    en el parámetro `response` (ETag, X-Next-Cursor): se copian aquí.
+
+    Args:
+        response (Response): Respuesta del endpoint, con sus cabeceras
+        filas (Sequence): Filas de SQLAlchemy (Row) con las columnas del esquema
+
+    Returns:
+        RespuestaJSON: La respuesta con la lista de filas
+    """
+    # dict(zip(...)) con los nombres de la primera fila es varias veces más rápido que Row._asdict()
+    campos = filas[0]._fields if filas else ()
+    return RespuestaJSON([dict(zip(campos, fila)) for fila in filas], headers=dict(response.headers))
@@ -0,0 +1,106 @@
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date
+
+from ..condicional import calcular_etag, no_modificado
+from ..dependencies import RutaBaseDatos, get_db
+from ..schemas import schemas
+from ..services import AnaliticaService, LibroService
+
+router = APIRouter(
+    prefix="/api/analitica",
+    tags=["analitica"],
+    route_class=RutaBaseDatos,
+)
+
+@router.get("/mas-vendidos", response_model=List[schemas.LibroMasVendido])
+def read_mas_vendidos(
+    request: Request,
+    response: Response,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    limit: int = Query(10, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtiene los libros más vendidos de un período
+
+    Parámetros:
+    - fecha_desde: Primer día del período (opcional, predeterminado: 30 días antes de fecha_hasta)
+    - fecha_hasta: Último día del período (opcional, predeterminado: hoy)
+    - limit: Número máximo de libros (opcional, predeterminado: 10)
+
+    Retorna:
+    - Lista de libros con sus ventas, unidades e ingresos, de más a menos unidades vendidas
+    - 304 sin cuerpo si la cabecera If-None-Match coincide con el ETag actual
+
+    Errores:
+    - 400: Si fecha_desde es posterior a fecha_hasta
+    """
+    etag = calcular_etag(request, date.today(), AnaliticaService.actualizar(db), LibroService.get_marca_cambios(db))
+    respuesta = no_modificado(request, response, etag)
+    if respuesta is not None:
+        return respuesta
+    return AnaliticaService.get_mas_vendidos(db, fecha_desde=fecha_desde, fecha_hasta=fecha_hasta, limit=limit)
+
+@router.get("/margen", response_model=schemas.MargenVentas)
+def read_margen(
+    request: Request,
+    response: Response,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    limit: int = Query(10, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtiene el margen bruto de las ventas de un período
+
+    El margen de cada libro son sus ingresos por ventas menos las unidades
+    vendidas por su precio de compra actual.
+
+    Parámetros:
+    - fecha_desde: Primer día del período (opcional, predeterminado: 30 días antes de fecha_hasta)
+    - fecha_hasta: Último día del período (opcional, predeterminado: hoy)
+    - limit: Número máximo de libros en el detalle (opcional, predeterminado: 10)
+
+    Retorna:
+    - Unidades, ingresos, costo y margen del período, y los libros con mayor margen
+    - 304 sin cuerpo si la cabecera If-None-Match coincide con el ETag actual
+
+    Errores:
+    - 400: Si fecha_desde es posterior a fecha_hasta
+    """
+    etag = calcular_etag(request, date.today(), AnaliticaService.actualizar(db), LibroService.get_marca_cambios(db))
+    respuesta = no_modificado(request, response, etag)
+    if respuesta is not None:
+        return respuesta
+    return AnaliticaService.get_margen(db, fecha_desde=fecha_desde, fecha_hasta=fecha_hasta, limit=limit)
+
+@router.get("/rotacion", response_model=List[schemas.RotacionLibro])
+def read_rotacion(
+    request: Request,
+    response: Response,
+    dias: int = Query(30, ge=1, le=365),
+    limit: int = Query(10, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtiene los días de stock de los libros vendidos en los últimos días
+
+    Los días de stock son el stock actual dividido por la venta diaria promedio
+    del período. Los libros sin ventas en el período no se incluyen.
+
+    Parámetros:
+    - dias: Días del período usado para la venta diaria promedio (opcional, predeterminado: 30)
+    - limit: Número máximo de libros (opcional, predeterminado: 10)
+
+    Retorna:
+    - Lista de libros con su stock, ventas del período y días de stock, de menos a más días
+    - 304 sin cuerpo si la cabecera If-None-Match coincide con el ETag actual
+    """
+    etag = calcular_etag(request, date.today(), AnaliticaService.actualizar(db), LibroService.get_marca_cambios(db))
+    respuesta = no_modificado(request, response, etag)
+    if respuesta is not None:
+        return respuesta
+    return AnaliticaService.get_rotacion(db, dias=dias, limit=limit)
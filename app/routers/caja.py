@@ -1,48 +1,149 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from typing import List, Dict, Optional
+from datetime import date
 
-from ..dependencies import get_db
+from ..cola_escritura import cola_escritura
+from ..condicional import calcular_etag, no_modificado
+from ..dependencies import RutaBaseDatos, get_db
+from ..paginacion import agregar_cursor
+from ..respuestas import RESPUESTAS_RAPIDAS, respuesta_filas
 from ..schemas import schemas
-from ..services import CajaService
+from ..services import CajaService, ExportacionService
 
 router = APIRouter(
     prefix="/api/caja",
     tags=["caja"],
     responses={404: {"description": "No encontrado"}},
+    route_class=RutaBaseDatos,
 )
 
 @router.get("/", response_model=List[schemas.Caja])
-def read_movimientos(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_movimientos(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     """
     Obtiene la lista de movimientos de caja
     
-    Esta operación devuelve todos los movimientos registrados con paginación
+    Esta operación devuelve los movimientos registrados, del más reciente al más antiguo,
+    con paginación. Si hay más resultados, la cabecera X-Next-Cursor trae el cursor de la
+    página siguiente.
     
     Parámetros:
     - skip: Número de registros a omitir (opcional, predeterminado: 0)
     - limit: Número máximo de registros a devolver (opcional, predeterminado: 100)
+    - cursor: Cursor de la página siguiente (opcional); si se indica, se ignora skip
     
     Retorna:
     - Lista de movimientos de caja con todos sus datos
+    - 304 sin cuerpo si la cabecera If-None-Match coincide con el ETag actual
+    
+    Errores:
+    - 400: Si el cursor no es válido
     """
-    return CajaService.get_movimientos(db, skip=skip, limit=limit)
+    etag = calcular_etag(request, CajaService.get_marca_cambios(db))
+    respuesta = no_modificado(request, response, etag)
+    if respuesta is not None:
+        return respuesta
+    if RESPUESTAS_RAPIDAS:
+        filas = CajaService.get_filas_movimientos(db, skip=skip, limit=limit, cursor=cursor)
+        agregar_cursor(response, filas, limit, "fecha_movimiento", "id_movimiento")
+        return respuesta_filas(response, filas)
+    movimientos = CajaService.get_movimientos(db, skip=skip, limit=limit, cursor=cursor)
+    agregar_cursor(response, movimientos, limit, "fecha_movimiento", "id_movimiento")
+    return movimientos
 
 @router.get("/saldo", response_model=Dict[str, float])
-def read_saldo_actual(db: Session = Depends(get_db)):
+def read_saldo_actual(request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Obtiene el saldo actual de caja
     
-    Esta operación devuelve el saldo disponible en caja
+    Esta operación devuelve el saldo disponible en caja, leído de la cabecera
+    del libro de caja (no recorre los movimientos)
     
     Retorna:
     - Objeto con el saldo actual
+    - 304 sin cuerpo si la cabecera If-None-Match coincide con el ETag actual
+    """
+    etag = calcular_etag(request, CajaService.get_marca_cambios(db))
+    respuesta = no_modificado(request, response, etag)
+    if respuesta is not None:
+        return respuesta
+    return CajaService.get_saldo_actual(db)
+
+@router.get("/resumen", response_model=schemas.ResumenCaja)
+def read_resumen(
+    request: Request,
+    response: Response,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    periodo: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Obtiene los totales de caja calculados en el servidor
+    
+    Esta operación devuelve el total de ingresos y egresos, el número de
+    movimientos de cada tipo y el saldo actual. Los totales se leen del resumen
+    diario de caja, por lo que no dependen del número de movimientos.
+    
+    Parámetros:
+    - fecha_desde: Primer día incluido (opcional, formato AAAA-MM-DD)
+    - fecha_hasta: Último día incluido (opcional, formato AAAA-MM-DD)
+    - periodo: Agrupar los totales por "dia", "semana" o "mes" (opcional)
+    
+    Retorna:
+    - Totales del rango, saldo actual y, si se indicó periodo, los totales de cada periodo
+    - 304 sin cuerpo si la cabecera If-None-Match coincide con el ETag actual
+    
+    Errores:
+    - 400: Si el periodo no es válido o fecha_desde es posterior a fecha_hasta
+    """
+    etag = calcular_etag(request, CajaService.get_marca_cambios(db))
+    respuesta = no_modificado(request, response, etag)
+    if respuesta is not None:
+        return respuesta
+    return CajaService.get_resumen(db, fecha_desde=fecha_desde, fecha_hasta=fecha_hasta, periodo=periodo)
+
+@router.get("/export")
+def export_movimientos(
+    formato: str = "csv",
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None
+):
+    """
+    Exporta el historial de movimientos de caja en CSV o NDJSON
+    
+    Esta operación transmite todos los movimientos del rango, del más antiguo al más
+    reciente, a medida que se leen de la base de datos. La memoria usada no depende
+    del tamaño del historial.
+    
+    Parámetros:
+    - formato: "csv" (predeterminado) o "ndjson" (un objeto JSON por línea)
+    - fecha_desde: Primer día incluido (opcional, formato AAAA-MM-DD)
+    - fecha_hasta: Último día incluido (opcional, formato AAAA-MM-DD)
+    
+    Retorna:
+    - Archivo caja.csv o caja.ndjson
+    
+    Errores:
+    - 400: Si el formato no es válido o el rango de fechas está invertido
     """
-    saldo = CajaService.get_saldo_actual(db)
-    return {"saldo": saldo}
+    contenido = ExportacionService.exportar_movimientos(fecha_desde, fecha_hasta, formato)
+    return StreamingResponse(
+        contenido,
+        media_type=ExportacionService.TIPOS_CONTENIDO[formato],
+        headers={"Content-Disposition": f'attachment; filename="caja.{formato}"'}
+    )
 
 @router.get("/{id_movimiento}", response_model=schemas.Caja)
-def read_movimiento(id_movimiento: int, db: Session = Depends(get_db)):
+def read_movimiento(id_movimiento: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Obtiene un movimiento de caja específico por su ID
     
@@ -53,10 +154,15 @@ def read_movimiento(id_movimiento: int, db: Session = Depends(get_db)):
     
     Retorna:
     - El movimiento encontrado con todos sus datos
+    - 304 sin cuerpo si la cabecera If-None-Match coincide con el ETag actual
     
     Errores:
     - 404: Si no se encuentra un movimiento con ese ID
     """
+    etag = calcular_etag(request, CajaService.get_marca_cambios(db))
+    respuesta = no_modificado(request, response, etag)
+    if respuesta is not None:
+        return respuesta
     db_movimiento = CajaService.get_movimiento(db, id_movimiento=id_movimiento)
     if db_movimiento is None:
         raise HTTPException(status_code=404, detail="Movimiento no encontrado")
@@ -80,4 +186,6 @@ def create_movimiento(movimiento: schemas.CajaCreate, db: Session = Depends(get_
     Errores:
     - 400: Si el tipo de movimiento no es válido o no hay saldo suficiente para un egreso
     """
-    return CajaService.create_movimiento_manual(db=db, movimiento=movimiento) 
\ No newline at end of file
+    if cola_escritura is not None:
+        return cola_escritura.enviar(CajaService.aplicar_movimiento, movimiento)
+    return CajaService.create_movimiento(db=db, movimiento=movimiento) 
\ No newline at end of file
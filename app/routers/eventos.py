@@ -0,0 +1,109 @@
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.orm import Session
+from typing import List
+
+from ..condicional import calcular_etag, no_modificado
+from ..dependencies import RutaBaseDatos, get_db
+from ..schemas import schemas
+from ..services import EventoService, ProyeccionService
+
+router = APIRouter(
+    prefix="/api/eventos",
+    tags=["eventos"],
+    responses={404: {"description": "No encontrado"}},
+    route_class=RutaBaseDatos,
+)
+
+@router.get("/", response_model=List[schemas.Evento])
+def read_eventos(
+    request: Request,
+    response: Response,
+    desde_id: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtiene el registro de eventos de inventario y caja
+
+    Esta operación devuelve los eventos en el orden en que se registraron. Para
+    recorrer el registro completo se repite la consulta con desde_id igual al
+    id_evento del último evento recibido.
+
+    Parámetros:
+    - desde_id: Devuelve los eventos con ID mayor a este (opcional, predeterminado: 0)
+    - limit: Número máximo de eventos a devolver (opcional, predeterminado: 100, máximo: 1000)
+
+    Retorna:
+    - Lista de eventos, del más antiguo al más reciente
+    - 304 sin cuerpo si la cabecera If-None-Match coincide con el ETag actual
+    """
+    etag = calcular_etag(request, EventoService.get_marca_cambios(db))
+    respuesta = no_modificado(request, response, etag)
+    if respuesta is not None:
+        return respuesta
+    return EventoService.get_eventos(db, desde_id=desde_id, limit=limit)
+
+@router.get("/proyecciones", response_model=List[schemas.EstadoProyeccion])
+def read_estado_proyecciones(db: Session = Depends(get_db)):
+    """
+    Obtiene el estado de las proyecciones
+
+    Retorna:
+    - Por cada proyección, el último evento aplicado, los eventos pendientes y la
+      fecha de su última actualización
+    """
+    return ProyeccionService.estado(db)
+
+@router.get("/proyecciones/{nombre}", response_model=schemas.ResultadoProyeccion)
+def read_proyeccion(
+    nombre: str,
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """
+    Obtiene los datos de una proyección
+
+    Antes de responder, la proyección aplica los eventos registrados desde su
+    última actualización.
+
+    Parámetros:
+    - nombre: Proyección a consultar (stock, saldo, ventas o ventas_diarias)
+    - skip: Número de filas a omitir (opcional, predeterminado: 0)
+    - limit: Número máximo de filas a devolver (opcional, predeterminado: 100)
+
+    Retorna:
+    - Las filas de la proyección y el último evento aplicado
+    - 304 sin cuerpo si la cabecera If-None-Match coincide con el ETag actual
+
+    Errores:
+    - 404: Si la proyección no existe
+    """
+    ProyeccionService.get_proyeccion(nombre)
+    ProyeccionService.actualizar(db, nombre)
+    etag = calcular_etag(request, ProyeccionService.get_marca_cambios(db, nombre))
+    respuesta = no_modificado(request, response, etag)
+    if respuesta is not None:
+        return respuesta
+    return ProyeccionService.consultar(db, nombre, skip=skip, limit=limit)
+
+@router.post("/proyecciones/{nombre}/reconstruir", response_model=schemas.EstadoProyeccion)
+def reconstruir_proyeccion(nombre: str, db: Session = Depends(get_db)):
+    """
+    Reconstruye una proyección desde el primer evento
+
+    Vacía la proyección y vuelve a aplicar todo el registro de eventos.
+
+    Parámetros:
+    - nombre: Proyección a reconstruir (stock, saldo, ventas o ventas_diarias)
+
+    Retorna:
+    - El estado de la proyección reconstruida
+
+    Errores:
+    - 404: Si la proyección no existe
+    """
+    ProyeccionService.reconstruir(db, nombre)
+    return next(estado for estado in ProyeccionService.estado(db) if estado.nombre == nombre)
@@ -1,15 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+import tempfile
 
-from ..dependencies import get_db
+from ..condicional import calcular_etag, no_modificado
+from ..dependencies import RutaBaseDatos, get_db, isbn_ruta
+from ..paginacion import agregar_cursor
+from ..respuestas import RESPUESTAS_RAPIDAS, respuesta_filas
 from ..schemas import schemas
-from ..services import LibroService
+from ..services import BusquedaService, ImportacionService, LibroService, ReabastecimientoService
 
 router = APIRouter(
     prefix="/api/libros",
     tags=["libros"],
     responses={404: {"description": "No encontrado"}},
+    route_class=RutaBaseDatos,
 )
 
 @router.post("/", response_model=schemas.Libro, status_code=status.HTTP_201_CREATED)
@@ -27,45 +33,161 @@ def create_libro(libro: schemas.LibroCreate, db: Session = Depends(get_db)):
     """
     return LibroService.create_libro(db=db, libro=libro)
 
+@router.post("/importar", response_model=schemas.ResultadoImportacion)
+async def importar_libros(
+    request: Request,
+    formato: str = "csv",
+    tamano_lote: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """
+    Importa un catálogo de libros desde un archivo CSV o JSONL
+    
+    El archivo se envía como cuerpo de la petición (por ejemplo,
+    `curl --data-binary @catalogo.csv`). Se recibe en un archivo temporal y se
+    procesa fila por fila, guardando los libros en lotes.
+    
+    Un libro que ya existe actualiza su título y precios; la cantidad inicial solo
+    se usa para libros nuevos (el stock de un libro existente cambia con transacciones).
+    
+    Parámetros:
+    - formato: "csv" (con encabezado ISBN,titulo,precio_compra,precio_venta,cantidad_actual)
+      o "jsonl" (un objeto JSON por línea)
+    - tamano_lote: Filas guardadas por cada lote (opcional, predeterminado: 1000)
+    
+    Retorna:
+    - Filas leídas, libros creados y actualizados, errores por fila y rendimiento
+    
+    Errores:
+    - 400: Si el formato no es válido o el archivo no está codificado en UTF-8
+      (en ese caso no se importa ninguna fila)
+    """
+    if formato not in ImportacionService.FORMATOS:
+        raise HTTPException(status_code=400, detail=f"Formato no válido: {formato}")
+    
+    with tempfile.TemporaryFile() as archivo:
+        async for bloque in request.stream():
+            # La escritura al disco bloquea: se hace fuera del event loop
+            await run_in_threadpool(archivo.write, bloque)
+        return await run_in_threadpool(ImportacionService.importar_archivo, db, archivo, formato, tamano_lote)
+
 @router.get("/", response_model=List[schemas.Libro])
-def read_libros(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_libros(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     """
     Obtiene la lista de libros en el inventario
     
-    Esta operación devuelve todos los libros registrados con paginación
+    Esta operación devuelve los libros registrados ordenados por ISBN, con paginación.
+    Si hay más resultados, la cabecera X-Next-Cursor trae el cursor de la página siguiente.
     
     Parámetros:
     - skip: Número de registros a omitir (opcional, predeterminado: 0)
     - limit: Número máximo de registros a devolver (opcional, predeterminado: 100)
+    - cursor: Cursor de la página siguiente (opcional); si se indica, se ignora skip
     
     Retorna:
     - Lista de libros con todos sus datos
+    - 304 sin cuerpo si la cabecera If-None-Match coincide con el ETag actual
+    
+    Errores:
+    - 400: Si el cursor no es válido
+    """
+    etag = calcular_etag(request, LibroService.get_marca_cambios(db))
+    respuesta = no_modificado(request, response, etag)
+    if respuesta is not None:
+        return respuesta
+    if RESPUESTAS_RAPIDAS:
+        filas = LibroService.consultar_filas_libros(db, skip=skip, limit=limit, cursor=cursor)
+        agregar_cursor(response, filas, limit, "ISBN")
+        return respuesta_filas(response, filas)
+    libros = LibroService.consultar_libros(db, skip=skip, limit=limit, cursor=cursor)
+    agregar_cursor(response, libros, limit, "ISBN")
+    return libros
+
+@router.get("/buscar", response_model=List[schemas.Libro])
+def buscar_libros(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Busca libros por título o por prefijo de ISBN
+    
+    No distingue mayúsculas ni acentos, y cada palabra buscada puede ser el comienzo
+    de una palabra del título ("quij" encuentra "Don Quijote").
+    
+    Parámetros:
+    - q: Texto buscado: palabras del título o el comienzo de un ISBN (con o sin guiones)
+    - limit: Número máximo de libros (1 a 100, por defecto 20)
+    
+    Retorna:
+    - Primero los libros cuyo ISBN empieza con q, luego los que coinciden por
+      título, de más a menos relevantes
+    - 304 sin cuerpo si la cabecera If-None-Match coincide con el ETag actual
+    """
+    etag = calcular_etag(request, LibroService.get_marca_cambios(db))
+    respuesta = no_modificado(request, response, etag)
+    if respuesta is not None:
+        return respuesta
+    return BusquedaService.buscar(db, q, limit=limit)
+
+@router.get("/reabastecer", response_model=schemas.SugerenciasReabastecimiento)
+def read_sugerencias_reabastecimiento(
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """
+    Sugiere qué libros reabastecer y cuántas unidades, dentro del saldo de caja
+    
+    Solo se consideran los libros cuyo stock está en o bajo su punto de reorden
+    (la venta esperada durante la entrega, según su velocidad de ventas reciente).
+    La cantidad necesaria cubre la entrega y los días de cobertura; el saldo de
+    caja se reparte primero entre los libros con menos días de stock.
+    
+    Parámetros:
+    - limit: Número máximo de libros (1 a 500, por defecto 50)
+    
+    Retorna:
+    - Saldo disponible, costo total sugerido y los libros de más a menos urgentes
     """
-    return LibroService.get_libros(db, skip=skip, limit=limit)
+    return ReabastecimientoService.get_sugerencias(db, limit=limit)
 
 @router.get("/{isbn}", response_model=schemas.Libro)
-def read_libro(isbn: str, db: Session = Depends(get_db)):
+def read_libro(request: Request, response: Response, isbn: str = Depends(isbn_ruta), db: Session = Depends(get_db)):
     """
     Obtiene un libro específico por su ISBN
     
     Esta operación busca y devuelve un libro según su identificador único
     
     Parámetros:
-    - isbn: Identificador único del libro (ISBN)
+    - isbn: Identificador único del libro (ISBN; se ignoran guiones y espacios)
     
     Retorna:
     - El libro encontrado con todos sus datos
+    - 304 sin cuerpo si la cabecera If-None-Match coincide con el ETag actual
     
     Errores:
     - 404: Si no se encuentra un libro con ese ISBN
     """
-    db_libro = LibroService.get_libro(db, ISBN=isbn)
+    etag = calcular_etag(request, LibroService.get_marca_cambios(db))
+    respuesta = no_modificado(request, response, etag)
+    if respuesta is not None:
+        return respuesta
+    db_libro = LibroService.consultar_libro(db, isbn)
     if db_libro is None:
         raise HTTPException(status_code=404, detail="Libro no encontrado")
     return db_libro
 
 @router.put("/{isbn}", response_model=schemas.Libro)
-def update_libro(isbn: str, libro: schemas.LibroCreate, db: Session = Depends(get_db)):
+def update_libro(libro: schemas.LibroUpdate, isbn: str = Depends(isbn_ruta), db: Session = Depends(get_db)):
     """
     Actualiza los datos de un libro existente
     
@@ -73,8 +195,8 @@ def update_libro(isbn: str, libro: schemas.LibroCreate, db: Session = Depends(ge
     Nota: No se puede modificar la cantidad directamente, debe hacerse mediante transacciones.
     
     Parámetros:
-    - isbn: Identificador único del libro (ISBN)
-    - libro: Nuevos datos del libro
+    - isbn: Identificador único del libro (ISBN; se ignoran guiones y espacios)
+    - libro: Nuevo título y precios del libro
     
     Retorna:
     - El libro actualizado con todos sus datos
@@ -82,17 +204,17 @@ def update_libro(isbn: str, libro: schemas.LibroCreate, db: Session = Depends(ge
     Errores:
     - 404: Si no se encuentra un libro con ese ISBN
     """
-    return LibroService.update_libro(db=db, ISBN=isbn, libro=libro)
+    return LibroService.update_libro(db=db, isbn=isbn, libro=libro)
 
 @router.delete("/{isbn}", response_model=dict)
-def delete_libro(isbn: str, db: Session = Depends(get_db)):
+def delete_libro(isbn: str = Depends(isbn_ruta), db: Session = Depends(get_db)):
     """
     Elimina un libro del inventario
     
     Esta operación elimina permanentemente un libro y todas sus transacciones asociadas
     
     Parámetros:
-    - isbn: Identificador único del libro (ISBN)
+    - isbn: Identificador único del libro (ISBN; se ignoran guiones y espacios)
     
     Retorna:
     - Mensaje de confirmación
@@ -100,5 +222,5 @@ def delete_libro(isbn: str, db: Session = Depends(get_db)):
     Errores:
     - 404: Si no se encuentra un libro con ese ISBN
     """
-    LibroService.delete_libro(db=db, ISBN=isbn)
+    LibroService.delete_libro(db=db, isbn=isbn)
     return {"mensaje": "Libro eliminado correctamente"}
\ No newline at end of file
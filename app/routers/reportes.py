@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, Response, status
+from sqlalchemy.orm import Session
+from typing import Dict, Optional
+
+from ..dependencies import RutaBaseDatos, get_db
+from ..ejecutor_reportes import ejecutor_reportes
+from ..schemas import schemas
+from ..services import ReporteService
+
+router = APIRouter(
+    prefix="/api/reportes",
+    tags=["reportes"],
+    responses={404: {"description": "No encontrado"}},
+    route_class=RutaBaseDatos,
+)
+
+@router.get("/", response_model=Dict[str, str])
+def read_tipos_reporte():
+    """
+    Obtiene los tipos de reporte disponibles
+
+    Retorna:
+    - Cada tipo de reporte con su descripción
+    """
+    return ReporteService.REPORTES
+
+@router.post("/{tipo}", response_model=schemas.Reporte, status_code=status.HTTP_202_ACCEPTED)
+def create_reporte(
+    tipo: str,
+    response: Response,
+    parametros: Optional[schemas.ParametrosReporte] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Pide un reporte pesado
+
+    El reporte se calcula en segundo plano, en un proceso aparte, y su estado
+    se consulta en la URL de la cabecera Location. Si ya existe un reporte del
+    mismo tipo y con los mismos parámetros, y los datos no cambiaron desde que
+    se pidió, se devuelve ese reporte (terminado o en curso) sin calcularlo de nuevo.
+
+    Parámetros:
+    - tipo: Tipo de reporte (totales, ventas-por-libro o reconciliacion-caja)
+    - fecha_desde, fecha_hasta, limite: Rango de fechas y máximo de filas (opcionales, en el cuerpo)
+
+    Retorna:
+    - 202 con el reporte pendiente o en curso
+    - 200 con el resultado si ya estaba calculado
+
+    Errores:
+    - 400: Si el rango de fechas está invertido
+    - 404: Si el tipo de reporte no existe
+    - 429: Si ya hay demasiados reportes en curso en este worker
+    """
+    reporte, nuevo = ReporteService.crear_reporte(db, tipo, parametros or schemas.ParametrosReporte())
+    if nuevo:
+        id_reporte = reporte.id_reporte
+        ejecutor_reportes.enviar(
+            ReporteService.ejecutar, id_reporte,
+            al_fallar=lambda error: ReporteService.marcar_error(id_reporte, getattr(error, "detail", str(error)))
+        )
+    resultado = ReporteService.a_esquema(reporte)
+    if resultado.estado in (ReporteService.COMPLETADO, ReporteService.ERROR):
+        response.status_code = status.HTTP_200_OK
+    response.headers["Location"] = f"{router.prefix}/{resultado.id_reporte}"
+    return resultado
+
+@router.get("/{id_reporte}", response_model=schemas.Reporte)
+def read_reporte(id_reporte: int, db: Session = Depends(get_db)):
+    """
+    Obtiene el estado de un reporte y, si terminó, su resultado
+
+    Parámetros:
+    - id_reporte: ID del reporte
+
+    Retorna:
+    - El reporte con su estado (PENDIENTE, EN_PROCESO, COMPLETADO o ERROR), y su
+      resultado o su error
+
+    Errores:
+    - 404: Si el reporte no existe
+    """
+    return ReporteService.get_reporte(db, id_reporte)
@@ -1,17 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import date
+from typing import List, Optional
 
-from ..dependencies import get_db
+from ..cola_escritura import cola_escritura
+from ..condicional import calcular_etag, no_modificado
+from ..dependencies import RutaBaseDatos, get_db, isbn_ruta
+from ..paginacion import agregar_cursor
+from ..respuestas import RESPUESTAS_RAPIDAS, respuesta_filas
 from ..schemas import schemas
-from ..services import TransaccionService
+from ..services import ExportacionService, LibroService, TransaccionService
 
 router = APIRouter(
     prefix="/api/transacciones",
     tags=["transacciones"],
     responses={404: {"description": "No encontrado"}},
+    route_class=RutaBaseDatos,
 )
 
+def filtro_transacciones(
+    tipo_transaccion: Optional[int] = None,
+    isbn: Optional[List[str]] = Query(None),
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    cantidad_min: Optional[int] = Query(None, ge=1),
+    cantidad_max: Optional[int] = Query(None, ge=1)
+) -> schemas.FiltroTransacciones:
+    """
+    Reúne los parámetros de filtro de los listados de transacciones
+    """
+    return schemas.FiltroTransacciones(
+        tipo_transaccion=tipo_transaccion,
+        isbns=isbn,
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta,
+        cantidad_min=cantidad_min,
+        cantidad_max=cantidad_max
+    )
+
 @router.post("/", response_model=schemas.Transaccion, status_code=status.HTTP_201_CREATED)
 def create_transaccion(transaccion: schemas.TransaccionCreate, db: Session = Depends(get_db)):
     """
@@ -35,26 +62,117 @@ def create_transaccion(transaccion: schemas.TransaccionCreate, db: Session = Dep
     - 404: Si no se encuentra el libro o el tipo de transacción
     - 400: Si no hay suficiente stock para una venta
     """
+    if cola_escritura is not None:
+        return cola_escritura.enviar(
+            TransaccionService.aplicar_transaccion, transaccion,
+            al_confirmar=lambda: LibroService.invalidar_cache(transaccion.ISBN)
+        )
     return TransaccionService.create_transaccion(db=db, transaccion=transaccion)
 
+@router.post("/lote", response_model=schemas.TransaccionLoteResultado, status_code=status.HTTP_201_CREATED)
+def create_transacciones_lote(lote: schemas.TransaccionLoteCreate, db: Session = Depends(get_db)):
+    """
+    Registra un lote de transacciones (por ejemplo, un carrito completo)
+
+    Esta operación procesa todas las líneas en una sola transacción de base de datos:
+    o se registran todas, o no se registra ninguna.
+
+    Parámetros en el body:
+    - lineas: Lista de transacciones con ISBN, tipo_transaccion y cantidad
+
+    Retorna:
+    - El resultado de cada línea (ID de transacción, movimiento de caja, monto y saldo)
+      junto con el saldo final de caja
+
+    Errores:
+    - 400: Si alguna línea no es válida; el detalle incluye el resultado de cada línea
+      y no se registra ninguna transacción del lote
+    """
+    return TransaccionService.create_transacciones_lote(db=db, lote=lote)
+
 @router.get("/", response_model=List[schemas.Transaccion])
-def read_transacciones(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_transacciones(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    filtro: schemas.FiltroTransacciones = Depends(filtro_transacciones),
+    db: Session = Depends(get_db)
+):
     """
     Obtiene la lista de transacciones
     
-    Esta operación devuelve todas las transacciones registradas con paginación
+    Esta operación devuelve las transacciones registradas, de la más reciente a la más
+    antigua, con paginación. Si hay más resultados, la cabecera X-Next-Cursor trae el
+    cursor de la página siguiente. Los filtros se combinan y se aplican en la consulta.
     
     Parámetros:
     - skip: Número de registros a omitir (opcional, predeterminado: 0)
     - limit: Número máximo de registros a devolver (opcional, predeterminado: 100)
+    - cursor: Cursor de la página siguiente (opcional); si se indica, se ignora skip
+    - tipo_transaccion: Tipo de transacción (opcional, 1: Venta, 2: Abastecimiento)
+    - isbn: ISBN del libro (opcional, puede repetirse para varios libros)
+    - fecha_desde: Primer día incluido (opcional, formato AAAA-MM-DD)
+    - fecha_hasta: Último día incluido (opcional, formato AAAA-MM-DD)
+    - cantidad_min: Cantidad mínima de unidades (opcional)
+    - cantidad_max: Cantidad máxima de unidades (opcional)
     
     Retorna:
     - Lista de transacciones con todos sus datos
+    - 304 sin cuerpo si la cabecera If-None-Match coincide con el ETag actual
+    
+    Errores:
+    - 400: Si el cursor no es válido o algún rango está invertido
     """
-    return TransaccionService.get_transacciones(db, skip=skip, limit=limit)
+    etag = calcular_etag(request, TransaccionService.get_marca_cambios(db))
+    respuesta = no_modificado(request, response, etag)
+    if respuesta is not None:
+        return respuesta
+    if RESPUESTAS_RAPIDAS:
+        filas = TransaccionService.get_filas_transacciones(
+            db, skip=skip, limit=limit, cursor=cursor, filtro=filtro
+        )
+        agregar_cursor(response, filas, limit, "fecha_transaccion", "id_transaccion")
+        return respuesta_filas(response, filas)
+    transacciones = TransaccionService.get_transacciones(
+        db, skip=skip, limit=limit, cursor=cursor, filtro=filtro
+    )
+    agregar_cursor(response, transacciones, limit, "fecha_transaccion", "id_transaccion")
+    return transacciones
+
+@router.get("/export")
+def export_transacciones(
+    formato: str = "csv",
+    filtro: schemas.FiltroTransacciones = Depends(filtro_transacciones)
+):
+    """
+    Exporta el historial de transacciones en CSV o NDJSON
+    
+    Esta operación transmite todas las transacciones que cumplen los filtros, de la más
+    antigua a la más reciente, a medida que se leen de la base de datos. La memoria
+    usada no depende del tamaño del historial.
+    
+    Parámetros:
+    - formato: "csv" (predeterminado) o "ndjson" (un objeto JSON por línea)
+    - tipo_transaccion, isbn, fecha_desde, fecha_hasta, cantidad_min, cantidad_max:
+      Los mismos filtros del listado de transacciones (opcionales)
+    
+    Retorna:
+    - Archivo transacciones.csv o transacciones.ndjson
+    
+    Errores:
+    - 400: Si el formato no es válido o algún rango está invertido
+    """
+    contenido = ExportacionService.exportar_transacciones(filtro, formato)
+    return StreamingResponse(
+        contenido,
+        media_type=ExportacionService.TIPOS_CONTENIDO[formato],
+        headers={"Content-Disposition": f'attachment; filename="transacciones.{formato}"'}
+    )
 
 @router.get("/{id_transaccion}", response_model=schemas.Transaccion)
-def read_transaccion(id_transaccion: int, db: Session = Depends(get_db)):
+def read_transaccion(id_transaccion: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Obtiene una transacción específica por su ID
     
@@ -65,26 +183,74 @@ def read_transaccion(id_transaccion: int, db: Session = Depends(get_db)):
     
     Retorna:
     - La transacción encontrada con todos sus datos
+    - 304 sin cuerpo si la cabecera If-None-Match coincide con el ETag actual
     
     Errores:
     - 404: Si no se encuentra una transacción con ese ID
     """
+    etag = calcular_etag(request, TransaccionService.get_marca_cambios(db))
+    respuesta = no_modificado(request, response, etag)
+    if respuesta is not None:
+        return respuesta
     db_transaccion = TransaccionService.get_transaccion(db, id_transaccion=id_transaccion)
     if db_transaccion is None:
         raise HTTPException(status_code=404, detail="Transacción no encontrada")
     return db_transaccion
 
 @router.get("/libro/{isbn}", response_model=List[schemas.Transaccion])
-def read_transacciones_by_libro(isbn: str, db: Session = Depends(get_db)):
+def read_transacciones_by_libro(
+    request: Request,
+    response: Response,
+    isbn: str = Depends(isbn_ruta),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    tipo_transaccion: Optional[int] = None,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    cantidad_min: Optional[int] = Query(None, ge=1),
+    cantidad_max: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
     """
     Obtiene las transacciones de un libro específico
     
-    Esta operación devuelve todas las transacciones asociadas a un libro determinado
+    Esta operación devuelve las transacciones asociadas a un libro determinado, de la más
+    reciente a la más antigua, con paginación. Si hay más resultados, la cabecera
+    X-Next-Cursor trae el cursor de la página siguiente.
     
     Parámetros:
-    - isbn: Identificador único del libro (ISBN)
+    - isbn: Identificador único del libro (ISBN; se ignoran guiones y espacios)
+    - skip: Número de registros a omitir (opcional, predeterminado: 0)
+    - limit: Número máximo de registros a devolver (opcional, predeterminado: 100)
+    - cursor: Cursor de la página siguiente (opcional); si se indica, se ignora skip
+    - tipo_transaccion: Tipo de transacción (opcional, 1: Venta, 2: Abastecimiento)
+    - fecha_desde: Primer día incluido (opcional, formato AAAA-MM-DD)
+    - fecha_hasta: Último día incluido (opcional, formato AAAA-MM-DD)
+    - cantidad_min: Cantidad mínima de unidades (opcional)
+    - cantidad_max: Cantidad máxima de unidades (opcional)
     
     Retorna:
     - Lista de transacciones del libro
+    - 304 sin cuerpo si la cabecera If-None-Match coincide con el ETag actual
+    
+    Errores:
+    - 400: Si el cursor no es válido o algún rango está invertido
+    - 404: Si no se encuentra un libro con ese ISBN
     """
-    return TransaccionService.get_transacciones_by_libro(db, ISBN=isbn)
\ No newline at end of file
+    etag = calcular_etag(request, LibroService.get_marca_cambios(db))
+    respuesta = no_modificado(request, response, etag)
+    if respuesta is not None:
+        return respuesta
+    filtro = schemas.FiltroTransacciones(
+        tipo_transaccion=tipo_transaccion,
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta,
+        cantidad_min=cantidad_min,
+        cantidad_max=cantidad_max
+    )
+    transacciones = TransaccionService.get_transacciones_por_libro(
+        db, isbn, skip=skip, limit=limit, cursor=cursor, filtro=filtro
+    )
+    agregar_cursor(response, transacciones, limit, "fecha_transaccion", "id_transaccion")
+    return transacciones
\ No newline at end of file
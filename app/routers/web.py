@@ -3,6 +3,8 @@ from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
 
+from ..instrumentacion import medir
+
 # Definir la ubicación de las plantillas
 templates_path = Path(__file__).parent.parent / "templates"
 templates = Jinja2Templates(directory=str(templates_path))
@@ -20,7 +22,8 @@ async def index(request: Request):
     Este endpoint sirve la página principal del sistema con una descripción
     general y acceso a todas las funcionalidades.
     """
-    return templates.TemplateResponse("index.html", {"request": request})
+    with medir("render"):
+        return templates.TemplateResponse(request, "index.html")
 
 @router.get("/libros", response_class=HTMLResponse)
 async def libros_page(request: Request):
@@ -30,7 +33,8 @@ async def libros_page(request: Request):
     Esta interfaz permite realizar operaciones CRUD sobre el inventario de libros.
     Los datos se cargan dinámicamente mediante llamadas a la API REST.
     """
-    return templates.TemplateResponse("libros.html", {"request": request})
+    with medir("render"):
+        return templates.TemplateResponse(request, "libros.html")
 
 @router.get("/transacciones", response_class=HTMLResponse)
 async def transacciones_page(request: Request):
@@ -40,7 +44,8 @@ async def transacciones_page(request: Request):
     Esta interfaz permite registrar ventas y abastecimientos, así como
     ver el historial de transacciones con varios filtros.
     """
-    return templates.TemplateResponse("transacciones.html", {"request": request})
+    with medir("render"):
+        return templates.TemplateResponse(request, "transacciones.html")
 
 @router.get("/caja", response_class=HTMLResponse)
 async def caja_page(request: Request):
@@ -50,4 +55,5 @@ async def caja_page(request: Request):
     Esta interfaz muestra el saldo actual, ingresos, egresos y el historial
     de movimientos. También permite registrar movimientos manuales.
     """
-    return templates.TemplateResponse("caja.html", {"request": request}) 
\ No newline at end of file
+    with medir("render"):
+        return templates.TemplateResponse(request, "caja.html") 
\ No newline at end of file
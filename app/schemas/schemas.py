@@ -1,6 +1,18 @@
 from pydantic import BaseModel, Field, validator
-from datetime import datetime
-from typing import Optional, List
+from datetime import date, datetime
+from typing import Any, Dict, Optional, List
+import re
+
+# Separadores que se ignoran en un ISBN escrito como "978-84-376-0494-7"
+SEPARADORES_ISBN = re.compile(r"[\s-]")
+
+def normalizar_isbn(isbn: str) -> str:
+    """
+    ISBN sin guiones ni espacios y con la X de control en mayúscula. Es la forma en
+    que se guardan los libros: todo ISBN que llega a la API (cuerpos, parámetros de
+    ruta e importaciones) pasa por aquí antes de buscarlo o guardarlo.
+    """
+    return SEPARADORES_ISBN.sub("", isbn).upper()
 
 # Esquemas para Libro
 class LibroBase(BaseModel):
@@ -17,6 +29,14 @@ class LibroBase(BaseModel):
 class LibroCreate(LibroBase):
     ISBN: str
     cantidad_actual: int = 0
+    
+    @validator('ISBN')
+    def isbn_normalizado(cls, v):
+        return normalizar_isbn(v)
+
+class LibroUpdate(LibroBase):
+    # Sin cantidad_actual: el stock solo cambia con transacciones
+    pass
 
 class Libro(LibroBase):
     ISBN: str
@@ -25,6 +45,21 @@ class Libro(LibroBase):
     class Config:
         orm_mode = True
 
+# Esquemas para la importación de catálogos
+class ErrorImportacion(BaseModel):
+    fila: int
+    ISBN: Optional[str] = None
+    error: str
+
+class ResultadoImportacion(BaseModel):
+    filas: int = 0
+    creados: int = 0
+    actualizados: int = 0
+    errores: int = 0
+    segundos: float = 0
+    filas_por_segundo: float = 0
+    detalle_errores: List[ErrorImportacion] = []
+
 # Esquemas para Transacción
 class TransaccionBase(BaseModel):
     ISBN: str
@@ -32,7 +67,9 @@ class TransaccionBase(BaseModel):
     cantidad: int = Field(..., gt=0)
 
 class TransaccionCreate(TransaccionBase):
-    pass
+    @validator('ISBN')
+    def isbn_normalizado(cls, v):
+        return normalizar_isbn(v)
 
 class Transaccion(TransaccionBase):
     id_transaccion: int
@@ -41,6 +78,45 @@ class Transaccion(TransaccionBase):
     class Config:
         orm_mode = True
 
+class FiltroTransacciones(BaseModel):
+    tipo_transaccion: Optional[int] = None
+    isbns: Optional[List[str]] = None
+    fecha_desde: Optional[date] = None
+    fecha_hasta: Optional[date] = None
+    cantidad_min: Optional[int] = None
+    cantidad_max: Optional[int] = None
+    
+    @validator('isbns', each_item=True)
+    def isbns_normalizados(cls, v):
+        return normalizar_isbn(v)
+
+# Esquemas para lotes de transacciones
+class TransaccionLoteCreate(BaseModel):
+    lineas: List[TransaccionCreate]
+    
+    @validator('lineas')
+    def lote_no_vacio(cls, v):
+        if not v:
+            raise ValueError('El lote debe contener al menos una línea')
+        return v
+
+class ResultadoLineaLote(BaseModel):
+    linea: int
+    ISBN: str
+    tipo_transaccion: int
+    cantidad: int
+    exito: bool
+    id_transaccion: Optional[int] = None
+    id_movimiento: Optional[int] = None
+    monto: Optional[float] = None
+    saldo_actual: Optional[float] = None
+    error: Optional[str] = None
+
+class TransaccionLoteResultado(BaseModel):
+    procesadas: int
+    saldo_final: float
+    resultados: List[ResultadoLineaLote]
+
 # Esquemas para Caja
 class CajaBase(BaseModel):
     tipo_movimiento: str
@@ -56,4 +132,122 @@ class Caja(CajaBase):
     id_transaccion: Optional[int] = None
     
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class ResumenCajaPeriodo(BaseModel):
+    inicio: date
+    total_ingresos: float
+    total_egresos: float
+    num_ingresos: int
+    num_egresos: int
+    resultado: float
+
+class ResumenCaja(BaseModel):
+    fecha_desde: Optional[date] = None
+    fecha_hasta: Optional[date] = None
+    total_ingresos: float
+    total_egresos: float
+    num_ingresos: int
+    num_egresos: int
+    resultado: float
+    saldo: float
+    periodo: Optional[str] = None
+    periodos: List[ResumenCajaPeriodo] = []
+
+class Evento(BaseModel):
+    id_evento: int
+    tipo: str
+    fecha: datetime
+    ISBN: Optional[str] = None
+    cantidad: Optional[int] = None
+    monto: Optional[float] = None
+    id_transaccion: Optional[int] = None
+    id_movimiento: Optional[int] = None
+    
+    class Config:
+        orm_mode = True
+
+class EstadoProyeccion(BaseModel):
+    nombre: str
+    ultimo_evento: int
+    pendientes: int
+    fecha_actualizacion: Optional[datetime] = None
+
+class ResultadoProyeccion(BaseModel):
+    nombre: str
+    ultimo_evento: int
+    filas: List[Dict[str, Any]] = []
+
+# Esquemas para la analítica de ventas
+class LibroMasVendido(BaseModel):
+    ISBN: str
+    titulo: Optional[str] = None
+    num_ventas: int
+    unidades: int
+    ingresos: float
+
+class MargenLibro(BaseModel):
+    ISBN: str
+    titulo: Optional[str] = None
+    unidades: int
+    ingresos: float
+    costo: float
+    margen: float
+    margen_porcentaje: Optional[float] = None
+
+class MargenVentas(BaseModel):
+    fecha_desde: date
+    fecha_hasta: date
+    unidades: int
+    ingresos: float
+    costo: float
+    margen: float
+    libros: List[MargenLibro] = []
+
+class RotacionLibro(BaseModel):
+    ISBN: str
+    titulo: str
+    cantidad_actual: int
+    unidades_vendidas: int
+    venta_diaria: float
+    dias_de_stock: float
+
+# Esquemas para sugerencias de reabastecimiento
+class SugerenciaReabastecimiento(BaseModel):
+    ISBN: str
+    titulo: str
+    cantidad_actual: int
+    venta_diaria: float
+    dias_de_stock: float
+    punto_reorden: int
+    cantidad_necesaria: int
+    cantidad_sugerida: int
+    costo: float
+
+class SugerenciasReabastecimiento(BaseModel):
+    saldo_disponible: float
+    costo_total: float
+    libros: List[SugerenciaReabastecimiento] = []
+
+# Esquemas para reportes
+class ParametrosReporte(BaseModel):
+    fecha_desde: Optional[date] = None
+    fecha_hasta: Optional[date] = None
+    limite: int = 20
+    
+    @validator('limite')
+    def limite_valido(cls, v):
+        if v < 1 or v > 1000:
+            raise ValueError('El límite debe estar entre 1 y 1000')
+        return v
+
+class Reporte(BaseModel):
+    id_reporte: int
+    tipo: str
+    parametros: Dict[str, Any]
+    estado: str
+    fecha_creacion: datetime
+    fecha_inicio: Optional[datetime] = None
+    fecha_fin: Optional[datetime] = None
+    resultado: Optional[Any] = None
+    error: Optional[str] = None
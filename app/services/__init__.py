@@ -6,4 +6,12 @@ y reemplazan los triggers de base de datos con lógica en la aplicación.
 
 from app.services.libro_service import LibroService
 from app.services.transaccion_service import TransaccionService
-from app.services.caja_service import CajaService 
\ No newline at end of file
+from app.services.caja_service import CajaService
+from app.services.importacion_service import ImportacionService
+from app.services.exportacion_service import ExportacionService
+from app.services.evento_service import EventoService
+from app.services.proyeccion_service import ProyeccionService
+from app.services.reporte_service import ReporteService
+from app.services.analitica_service import AnaliticaService
+from app.services.reabastecimiento_service import ReabastecimientoService
+from app.services.busqueda_service import BusquedaService
@@ -0,0 +1,206 @@
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+
+from app.models import models
+from app.schemas import schemas
+from app.services.proyeccion_service import ProyeccionService, ProyeccionVentasDiarias
+
+class AnaliticaService:
+    """
+    Servicio de analítica de ventas: libros más vendidos, margen bruto y días de stock.
+    Las consultas no recorren las transacciones: agregan la proyección de ventas
+    diarias (una fila por libro y día con ventas), que se pone al día con los
+    eventos nuevos antes de cada consulta. El rango de fechas se resuelve con el
+    índice (fecha, ISBN) de esa tabla, así que el costo depende del número de
+    libros y días del rango y no del tamaño del historial.
+    """
+
+    # Días del período analizado cuando no se indica fecha_desde
+    DIAS_POR_DEFECTO = 30
+
+    @staticmethod
+    def actualizar(db: Session) -> int:
+        """
+        Aplica a la proyección de ventas diarias los eventos pendientes.
+
+        Args:
+            db (Session): Sesión de base de datos
+
+        Returns:
+            int: Marca de cambios de la proyección (último evento aplicado)
+        """
+        ProyeccionService.actualizar(db, ProyeccionVentasDiarias.nombre)
+        return ProyeccionService.get_marca_cambios(db, ProyeccionVentasDiarias.nombre)
+
+    @staticmethod
+    def periodo(fecha_desde: Optional[date], fecha_hasta: Optional[date]) -> Tuple[date, date]:
+        """
+        Completa el período analizado: hasta hoy y desde DIAS_POR_DEFECTO días antes.
+
+        Raises:
+            HTTPException: Si fecha_desde es posterior a fecha_hasta
+        """
+        fecha_hasta = fecha_hasta or date.today()
+        fecha_desde = fecha_desde or fecha_hasta - timedelta(days=AnaliticaService.DIAS_POR_DEFECTO - 1)
+        if fecha_desde > fecha_hasta:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="fecha_desde no puede ser posterior a fecha_hasta"
+            )
+        return fecha_desde, fecha_hasta
+
+    @staticmethod
+    def get_mas_vendidos(
+        db: Session,
+        fecha_desde: Optional[date] = None,
+        fecha_hasta: Optional[date] = None,
+        limit: int = 10
+    ) -> List[schemas.LibroMasVendido]:
+        """
+        Obtiene los libros con más unidades vendidas en un período.
+
+        Args:
+            db (Session): Sesión de base de datos
+            fecha_desde (Optional[date]): Primer día del período
+            fecha_hasta (Optional[date]): Último día del período (por defecto, hoy)
+            limit (int): Número máximo de libros
+
+        Returns:
+            List[schemas.LibroMasVendido]: Los libros, de más a menos unidades vendidas
+
+        Raises:
+            HTTPException: Si el rango de fechas está invertido
+        """
+        fecha_desde, fecha_hasta = AnaliticaService.periodo(fecha_desde, fecha_hasta)
+        diarias = models.ProyeccionVentasDiarias
+        unidades = func.sum(diarias.unidades)
+        filas = db.query(
+            diarias.ISBN, models.Libro.titulo, func.sum(diarias.num_ventas), unidades, func.sum(diarias.ingresos)
+        ).outerjoin(
+            models.Libro, models.Libro.ISBN == diarias.ISBN
+        ).filter(
+            diarias.fecha >= fecha_desde, diarias.fecha <= fecha_hasta
+        ).group_by(
+            diarias.ISBN, models.Libro.titulo
+        ).order_by(unidades.desc(), diarias.ISBN).limit(limit)
+
+        return [
+            schemas.LibroMasVendido(
+                ISBN=isbn, titulo=titulo, num_ventas=num_ventas, unidades=cantidad, ingresos=ingresos
+            )
+            for isbn, titulo, num_ventas, cantidad, ingresos in filas
+        ]
+
+    @staticmethod
+    def get_margen(
+        db: Session,
+        fecha_desde: Optional[date] = None,
+        fecha_hasta: Optional[date] = None,
+        limit: int = 10
+    ) -> schemas.MargenVentas:
+        """
+        Calcula el margen bruto de las ventas de un período: ingresos menos el costo
+        de las unidades vendidas al precio de compra actual de cada libro.
+
+        Args:
+            db (Session): Sesión de base de datos
+            fecha_desde (Optional[date]): Primer día del período
+            fecha_hasta (Optional[date]): Último día del período (por defecto, hoy)
+            limit (int): Número máximo de libros en el detalle
+
+        Returns:
+            schemas.MargenVentas: Totales del período y los libros con mayor margen
+
+        Raises:
+            HTTPException: Si el rango de fechas está invertido
+        """
+        fecha_desde, fecha_hasta = AnaliticaService.periodo(fecha_desde, fecha_hasta)
+        diarias = models.ProyeccionVentasDiarias
+        unidades = func.sum(diarias.unidades)
+        ingresos = func.sum(diarias.ingresos)
+        # Los libros eliminados no tienen precio de compra: su costo se toma como 0
+        costo = func.sum(diarias.unidades * func.coalesce(models.Libro.precio_compra, 0))
+        margen = ingresos - costo
+        periodo = (diarias.fecha >= fecha_desde, diarias.fecha <= fecha_hasta)
+
+        filas = db.query(
+            diarias.ISBN, models.Libro.titulo, unidades, ingresos, costo
+        ).outerjoin(
+            models.Libro, models.Libro.ISBN == diarias.ISBN
+        ).filter(*periodo).group_by(
+            diarias.ISBN, models.Libro.titulo
+        ).order_by(margen.desc(), diarias.ISBN).limit(limit)
+
+        total_unidades, total_ingresos, total_costo = db.query(
+            func.coalesce(unidades, 0), func.coalesce(ingresos, 0.0), func.coalesce(costo, 0.0)
+        ).select_from(diarias).outerjoin(
+            models.Libro, models.Libro.ISBN == diarias.ISBN
+        ).filter(*periodo).one()
+
+        return schemas.MargenVentas(
+            fecha_desde=fecha_desde,
+            fecha_hasta=fecha_hasta,
+            unidades=total_unidades,
+            ingresos=total_ingresos,
+            costo=total_costo,
+            margen=total_ingresos - total_costo,
+            libros=[
+                schemas.MargenLibro(
+                    ISBN=isbn,
+                    titulo=titulo,
+                    unidades=cantidad,
+                    ingresos=ingreso,
+                    costo=costo_libro,
+                    margen=ingreso - costo_libro,
+                    margen_porcentaje=round((ingreso - costo_libro) * 100 / ingreso, 2) if ingreso else None
+                )
+                for isbn, titulo, cantidad, ingreso, costo_libro in filas
+            ]
+        )
+
+    @staticmethod
+    def get_rotacion(db: Session, dias: int = 30, limit: int = 10) -> List[schemas.RotacionLibro]:
+        """
+        Calcula los días de stock de cada libro vendido en los últimos días: el
+        stock actual dividido por la venta diaria promedio del período. Los libros
+        sin ventas en el período no se incluyen (su stock no se agota al ritmo actual).
+
+        Args:
+            db (Session): Sesión de base de datos
+            dias (int): Días del período usado para la venta diaria promedio
+            limit (int): Número máximo de libros
+
+        Returns:
+            List[schemas.RotacionLibro]: Los libros, de menos a más días de stock
+        """
+        fecha_desde, fecha_hasta = AnaliticaService.periodo(date.today() - timedelta(days=dias - 1), None)
+        diarias = models.ProyeccionVentasDiarias
+        unidades = func.sum(diarias.unidades)
+        dias_de_stock = models.Libro.cantidad_actual * float(dias) / unidades
+
+        filas = db.query(
+            diarias.ISBN, models.Libro.titulo, models.Libro.cantidad_actual, unidades, dias_de_stock
+        ).join(
+            models.Libro, models.Libro.ISBN == diarias.ISBN
+        ).filter(
+            # Rango cerrado: con solo el límite inferior SQLite prefiere recorrer la clave primaria
+            diarias.fecha >= fecha_desde, diarias.fecha <= fecha_hasta
+        ).group_by(
+            diarias.ISBN, models.Libro.titulo, models.Libro.cantidad_actual
+        ).having(unidades > 0).order_by(dias_de_stock, diarias.ISBN).limit(limit)
+
+        return [
+            schemas.RotacionLibro(
+                ISBN=isbn,
+                titulo=titulo,
+                cantidad_actual=cantidad_actual,
+                unidades_vendidas=cantidad,
+                venta_diaria=round(cantidad / dias, 4),
+                dias_de_stock=round(dias_stock, 2)
+            )
+            for isbn, titulo, cantidad_actual, cantidad, dias_stock in filas
+        ]
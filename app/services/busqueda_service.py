@@ -0,0 +1,208 @@
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.indice_busqueda import IndicePrefijos, palabras
+from app.metricas import registrar_seccion
+from app.migraciones import TABLA_BUSQUEDA
+from app.models import models
+from app.schemas.schemas import normalizar_isbn
+
+class BusquedaService:
+    """
+    Servicio de búsqueda de libros por título y por prefijo de ISBN.
+
+    El prefijo de ISBN se resuelve con un rango sobre la clave primaria de libros.
+    Los títulos se buscan en la tabla FTS5 libros_fts cuando la base la tiene (la
+    crea aplicar_migraciones en SQLite), que se actualiza en la misma transacción
+    que cada alta, modificación, baja o importación de libros; si no, en un índice
+    de prefijos en memoria de cada worker (app/indice_busqueda.py), que se
+    reconstruye en segundo plano cuando cambia el catálogo. En ambos casos la
+    búsqueda ignora mayúsculas y acentos, y cada término puede ser el comienzo de
+    una palabra ("quij cerv" encuentra "El ingenioso hidalgo don Quijote", de Cervantes).
+
+    La variable de entorno BUSQUEDA_MOTOR=memoria fuerza el índice en memoria
+    aunque exista libros_fts (que se sigue manteniendo).
+    """
+
+    # Motor de búsqueda de títulos: "auto" (FTS5 si está disponible) o "memoria"
+    MOTOR = os.getenv("BUSQUEDA_MOTOR", "auto").lower()
+
+    _ISBN = re.compile(r"[0-9]+[Xx]?")
+
+    # Si cada base (por URL) tiene libros_fts
+    _tiene_fts: Dict[str, bool] = {}
+
+    # Índice en memoria, versión del catálogo con que se construyó y estado
+    _indice: Optional[IndicePrefijos] = None
+    _version_indice: Optional[int] = None
+    _reconstruyendo = False
+    _reconstrucciones = 0
+    _bloqueo = threading.Lock()
+
+    @staticmethod
+    def usa_fts(db: Session) -> bool:
+        """Indica si la base de la sesión tiene el índice FTS5 de títulos."""
+        bind = db.get_bind()
+        clave = str(bind.engine.url)
+        if clave not in BusquedaService._tiene_fts:
+            BusquedaService._tiene_fts[clave] = (
+                bind.dialect.name == "sqlite" and inspect(bind).has_table(TABLA_BUSQUEDA)
+            )
+        return BusquedaService._tiene_fts[clave]
+
+    @staticmethod
+    def agregar(db: Session, libros: Iterable[Tuple[str, str]]) -> None:
+        """
+        Agrega libros al índice de títulos, sin hacer commit.
+
+        Args:
+            db (Session): Sesión de base de datos
+            libros (Iterable[Tuple[str, str]]): ISBN y título de cada libro
+        """
+        filas = [{"ISBN": isbn, "titulo": titulo} for isbn, titulo in libros]
+        if filas and BusquedaService.usa_fts(db):
+            db.execute(text(f"INSERT INTO {TABLA_BUSQUEDA} (ISBN, titulo) VALUES (:ISBN, :titulo)"), filas)
+
+    @staticmethod
+    def quitar(db: Session, isbns: Iterable[str]) -> None:
+        """
+        Quita libros del índice de títulos, sin hacer commit.
+
+        Args:
+            db (Session): Sesión de base de datos
+            isbns (Iterable[str]): ISBN de los libros
+        """
+        filas = [{"consulta": BusquedaService._frase("ISBN", isbn), "isbn": isbn} for isbn in isbns]
+        if filas and BusquedaService.usa_fts(db):
+            db.execute(text(
+                f"DELETE FROM {TABLA_BUSQUEDA} WHERE rowid IN ("
+                f"SELECT rowid FROM {TABLA_BUSQUEDA} WHERE {TABLA_BUSQUEDA} MATCH :consulta AND ISBN = :isbn)"
+            ), filas)
+
+    @staticmethod
+    def buscar(db: Session, q: str, limit: int = 20) -> List[models.Libro]:
+        """
+        Busca libros por prefijo de ISBN y por palabras del título.
+
+        Los libros cuyo ISBN empieza con el texto (sin guiones ni espacios) van
+        primero, en orden de ISBN; luego los que coinciden por título, de más a
+        menos relevantes.
+
+        El rango de prefijos supone que los ISBN guardados están normalizados
+        (schemas.normalizar_isbn), como los guardan el alta y la importación de
+        libros y como los reescribe aplicar_migraciones en las bases anteriores.
+
+        Args:
+            db (Session): Sesión de base de datos
+            q (str): Texto buscado
+            limit (int): Número máximo de libros
+
+        Returns:
+            List[models.Libro]: Los libros encontrados
+        """
+        encontrados = []
+        isbn = normalizar_isbn(q)
+        if BusquedaService._ISBN.fullmatch(isbn):
+            encontrados = [
+                encontrado for (encontrado,) in db.query(models.Libro.ISBN).filter(
+                    models.Libro.ISBN >= isbn,
+                    models.Libro.ISBN < isbn[:-1] + chr(ord(isbn[-1]) + 1)
+                ).order_by(models.Libro.ISBN).limit(limit)
+            ]
+
+        if len(encontrados) < limit:
+            for isbn in BusquedaService._buscar_titulos(db, q, limit):
+                if isbn not in encontrados:
+                    encontrados.append(isbn)
+        encontrados = encontrados[:limit]
+        if not encontrados:
+            return []
+
+        libros = {
+            libro.ISBN: libro
+            for libro in db.query(models.Libro).filter(models.Libro.ISBN.in_(encontrados))
+        }
+        # Con el índice en memoria, un libro eliminado después de construirlo ya no está en la base
+        return [libros[isbn] for isbn in encontrados if isbn in libros]
+
+    @staticmethod
+    def estadisticas() -> Dict:
+        """Estado del índice en memoria para /api/metrics."""
+        indice = BusquedaService._indice
+        return {
+            "motor": BusquedaService.MOTOR,
+            "indice_memoria_libros": len(indice) if indice is not None else None,
+            "indice_memoria_version": BusquedaService._version_indice,
+            "reconstrucciones": BusquedaService._reconstrucciones,
+        }
+
+    @staticmethod
+    def _buscar_titulos(db: Session, q: str, limit: int) -> List[str]:
+        """ISBN de los libros cuyo título coincide con el texto, del más al menos relevante."""
+        terminos = palabras(q)
+        if not terminos:
+            return []
+        if BusquedaService.MOTOR != "memoria" and BusquedaService.usa_fts(db):
+            # Cada término como prefijo de una palabra del título; rank es bm25, y la
+            # palabra completa suma también como término exacto para quedar primero
+            consulta = "titulo : (" + " AND ".join(
+                f'("{termino}" OR "{termino}"*)' if len(termino) >= IndicePrefijos.LARGO_MINIMO_PREFIJO
+                else f'"{termino}"'
+                for termino in terminos
+            ) + ")"
+            return db.execute(text(
+                f"SELECT ISBN FROM {TABLA_BUSQUEDA} WHERE {TABLA_BUSQUEDA} MATCH :consulta "
+                "ORDER BY rank LIMIT :limit"
+            ), {"consulta": consulta, "limit": limit}).scalars().all()
+        return BusquedaService._indice_memoria(db).buscar(q, limit)
+
+    @staticmethod
+    def _indice_memoria(db: Session) -> IndicePrefijos:
+        """
+        Índice en memoria al día con el catálogo. La primera vez se construye en
+        esta petición; después, si el catálogo cambió, se sigue usando el anterior
+        mientras un hilo construye el nuevo.
+        """
+        version = db.query(models.VersionTabla.version).filter(
+            models.VersionTabla.tabla == models.Libro.__tablename__
+        ).scalar() or 0
+        if BusquedaService._indice is None:
+            with BusquedaService._bloqueo:
+                if BusquedaService._indice is None:
+                    BusquedaService._construir(db, version)
+        elif version != BusquedaService._version_indice:
+            with BusquedaService._bloqueo:
+                if BusquedaService._reconstruyendo:
+                    return BusquedaService._indice
+                BusquedaService._reconstruyendo = True
+            threading.Thread(target=BusquedaService._reconstruir, args=(version,), daemon=True).start()
+        return BusquedaService._indice
+
+    @staticmethod
+    def _reconstruir(version: int) -> None:
+        try:
+            with SessionLocal() as db:
+                BusquedaService._construir(db, version)
+        finally:
+            BusquedaService._reconstruyendo = False
+
+    @staticmethod
+    def _construir(db: Session, version: int) -> None:
+        libros = db.query(models.Libro.ISBN, models.Libro.titulo).yield_per(5000)
+        BusquedaService._indice = IndicePrefijos(libros)
+        BusquedaService._version_indice = version
+        BusquedaService._reconstrucciones += 1
+
+    @staticmethod
+    def _frase(columna: str, valor: str) -> str:
+        """Consulta FTS5 que busca el valor como frase literal en una columna."""
+        return f'{columna} : "' + valor.replace('"', '""') + '"'
+
+
+registrar_seccion("busqueda", BusquedaService.estadisticas)
@@ -1,9 +1,16 @@
+from sqlalchemy import Date, Row, bindparam, case, cast, func, insert, type_coerce, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from ..lecturas import FilaCaja, columnas, leer
 from ..models import models
 from ..schemas import schemas
+from ..paginacion import decodificar_cursor, despues_de
+from .evento_service import EventoService
 from fastapi import HTTPException, status
-from datetime import datetime
-from typing import List, Optional, Dict
+from datetime import date, datetime
+from typing import List, Optional, Dict, Tuple
 
 class CajaService:
     """
@@ -11,6 +18,39 @@ class CajaService:
     Implementa la lógica de negocio relacionada con los movimientos financieros.
     """
     
+    # Clave de la fila única de la cabecera de saldo
+    ID_SALDO = 1
+    
+    # Periodos admitidos para agrupar el resumen de caja
+    PERIODOS_RESUMEN = ("dia", "semana", "mes")
+    
+    # Tipos de movimiento admitidos por la restricción CHECK de la tabla caja
+    TIPOS_MOVIMIENTO = ("INGRESO", "EGRESO")
+    
+    # Columnas del esquema Caja, en su orden, para los listados que leen filas
+    # en lugar de entidades (ver app/lecturas.py y app/respuestas.py)
+    COLUMNAS = columnas(FilaCaja, models.Caja)
+    
+    # Sentencias de cada movimiento, construidas una sola vez sobre las tablas para
+    # que el engine reutilice su SQL compilado (ver TransaccionService._AJUSTAR_STOCK)
+    _SALDO = models.SaldoCaja.__table__
+    _MOVER_SALDO = (
+        update(_SALDO)
+        .where(_SALDO.c.id_saldo == ID_SALDO)
+        .values(saldo_actual=_SALDO.c.saldo_actual + bindparam("delta_saldo"))
+        .returning(_SALDO.c.saldo_actual)
+    )
+    _MOVER_SALDO_CON_MINIMO = _MOVER_SALDO.where(_SALDO.c.saldo_actual >= bindparam("saldo_minimo"))
+    _MARCAR_ULTIMO_MOVIMIENTO = (
+        update(_SALDO)
+        .where(_SALDO.c.id_saldo == ID_SALDO)
+        .values(id_ultimo_movimiento=bindparam("id_movimiento"), fecha_actualizacion=bindparam("fecha"))
+    )
+    _INSERTAR_MOVIMIENTO = insert(models.Caja.__table__).returning(models.Caja.__table__.c.id_movimiento)
+    
+    # UPSERT del resumen diario por dialecto, construido en el primer uso
+    _UPSERT_RESUMEN: Dict[str, object] = {}
+    
     @staticmethod
     def get_movimiento(db: Session, id_movimiento: int) -> Optional[models.Caja]:
         """
@@ -39,103 +79,562 @@ class CajaService:
         return db_movimiento
     
     @staticmethod
-    def get_movimientos(db: Session, skip: int = 0, limit: int = 100) -> List[models.Caja]:
+    def get_movimientos(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[FilaCaja]:
         """
-        Obtiene la lista de movimientos de caja con paginación.
+        Obtiene la lista de movimientos de caja, del más reciente al más antiguo,
+        con paginación.
+        
+        Si se indica un cursor, la página continúa después de la fecha e ID que
+        contiene (paginación keyset) y se ignora skip. Los movimientos se leen
+        como filas de solo lectura, sin cargar entidades del ORM.
         
         Args:
             db (Session): Sesión de base de datos
             skip (int): Número de registros a omitir
             limit (int): Número máximo de registros a retornar
+            cursor (Optional[str]): Cursor de la página anterior
+            
+        Returns:
+            List[FilaCaja]: Lista de movimientos
+        """
+        return leer(CajaService.get_filas_movimientos(db, skip=skip, limit=limit, cursor=cursor), FilaCaja)
+    
+    @staticmethod
+    def get_filas_movimientos(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Row]:
+        """
+        Como get_movimientos, pero devuelve filas con las columnas del esquema
+        Caja, sin cargar entidades del ORM.
+        
+        Returns:
+            List[Row]: Lista de filas de movimientos
+        """
+        return CajaService._paginar(db.query(*CajaService.COLUMNAS), skip, limit, cursor)
+    
+    @staticmethod
+    def _paginar(query, skip: int, limit: int, cursor: Optional[str]):
+        """
+        Ordena una consulta de movimientos por fecha e ID descendentes y aplica la
+        paginación por cursor (keyset) o, si no hay cursor, por OFFSET.
+        """
+        columnas = (models.Caja.fecha_movimiento, models.Caja.id_movimiento)
+        query = query.order_by(*(columna.desc() for columna in columnas))
+        
+        if cursor is not None:
+            valores = decodificar_cursor(cursor, datetime, int)
+            return query.filter(despues_de(columnas, valores, descendente=True)).limit(limit).all()
+        
+        return query.offset(skip).limit(limit).all()
+    
+    @staticmethod
+    def get_saldo_caja(db: Session) -> models.SaldoCaja:
+        """
+        Obtiene la cabecera del libro de caja (registro único con el saldo vigente).
+        
+        Si la cabecera aún no existe se crea a partir del último movimiento de caja.
+        
+        Args:
+            db (Session): Sesión de base de datos
             
         Returns:
-            List[models.Caja]: Lista de movimientos
+            models.SaldoCaja: Registro con el saldo actual y el último movimiento aplicado
+        """
+        saldo_caja = db.get(models.SaldoCaja, CajaService.ID_SALDO)
+        if saldo_caja is None:
+            ultimo_movimiento = db.query(
+                models.Caja.id_movimiento, models.Caja.saldo_actual
+            ).order_by(models.Caja.id_movimiento.desc()).first()
+            
+            saldo_caja = models.SaldoCaja(
+                id_saldo=CajaService.ID_SALDO,
+                saldo_actual=ultimo_movimiento.saldo_actual if ultimo_movimiento else 0,
+                id_ultimo_movimiento=ultimo_movimiento.id_movimiento if ultimo_movimiento else None,
+                fecha_actualizacion=datetime.now()
+            )
+            db.add(saldo_caja)
+        
+        return saldo_caja
+    
+    @staticmethod
+    def inicializar(db: Session) -> None:
+        """
+        Prepara las tablas derivadas del libro de caja al iniciar la aplicación:
+        crea la cabecera de saldo y, en bases con historial previo, construye el
+        resumen diario. Hace commit.
+        
+        Args:
+            db (Session): Sesión de base de datos
         """
-        return db.query(models.Caja).order_by(
-            models.Caja.fecha_movimiento.desc()
-        ).offset(skip).limit(limit).all()
+        CajaService.get_saldo_caja(db)
+        try:
+            db.flush()
+        except IntegrityError:
+            # Otro worker creó la cabecera al mismo tiempo
+            db.rollback()
+        
+        resumen_vacio = db.query(models.ResumenCajaDiario.fecha).first() is None
+        if resumen_vacio and db.query(models.Caja.id_movimiento).first() is not None:
+            CajaService.reconstruir_resumen_diario(db)
+        
+        db.commit()
+    
+    @staticmethod
+    def get_marca_cambios(db: Session) -> str:
+        """
+        Obtiene una marca que cambia con cada movimiento de caja.
+        
+        Se lee de la cabecera del libro de caja: el ID del último movimiento y el
+        saldo (que también cambia si una reconciliación corrige la cabecera).
+        
+        Args:
+            db (Session): Sesión de base de datos
+            
+        Returns:
+            str: Marca de cambios de caja
+        """
+        cabecera = db.query(
+            models.SaldoCaja.id_ultimo_movimiento, models.SaldoCaja.saldo_actual
+        ).filter(models.SaldoCaja.id_saldo == CajaService.ID_SALDO).first()
+        
+        if cabecera is None:
+            return "0"
+        id_ultimo_movimiento, saldo_actual = cabecera
+        return f"{id_ultimo_movimiento or 0}.{saldo_actual!r}"
     
     @staticmethod
     def get_saldo_actual(db: Session) -> Dict[str, float]:
         """
         Obtiene el saldo actual de caja.
         
+        El saldo se lee de la cabecera del libro de caja con una búsqueda por
+        clave primaria, sin recorrer la tabla de movimientos.
+        
         Args:
             db (Session): Sesión de base de datos
             
         Returns:
             Dict[str, float]: Saldo actual formateado como diccionario
         """
-        # Obtener el último movimiento para conocer el saldo actual
-        ultimo_movimiento = db.query(models.Caja).order_by(
-            models.Caja.id_movimiento.desc()
-        ).first()
+        saldo = db.query(models.SaldoCaja.saldo_actual).filter(
+            models.SaldoCaja.id_saldo == CajaService.ID_SALDO
+        ).scalar()
         
-        saldo = 0
-        if ultimo_movimiento:
-            saldo = ultimo_movimiento.saldo_actual
+        if saldo is None:
+            saldo = CajaService.get_saldo_caja(db).saldo_actual
         
         return {"saldo": saldo}
     
     @staticmethod
-    def create_movimiento(db: Session, movimiento: schemas.CajaCreate) -> models.Caja:
+    def mover_saldo(db: Session, delta: float, saldo_minimo: Optional[float] = None) -> Optional[float]:
         """
-        Crea un nuevo movimiento de caja manual.
+        Mueve el saldo de la cabecera de caja de forma atómica
+        (UPDATE ... SET saldo_actual = saldo_actual + :delta).
+        
+        El UPDATE bloquea la cabecera hasta el commit, por lo que los movimientos
+        concurrentes se encadenan en orden y ninguno parte de un saldo desactualizado.
         
         Args:
             db (Session): Sesión de base de datos
-            movimiento (schemas.CajaCreate): Datos del movimiento a crear
+            delta (float): Variación del saldo (positiva para ingresos, negativa para egresos)
+            saldo_minimo (Optional[float]): Si se indica, el movimiento solo se aplica
+                cuando el saldo previo es mayor o igual a este valor
+            
+        Returns:
+            Optional[float]: El saldo resultante, o None si no se cumplió el saldo mínimo
+        """
+        if saldo_minimo is None:
+            nuevo_saldo = db.execute(CajaService._MOVER_SALDO, {"delta_saldo": delta}).scalar()
+        else:
+            nuevo_saldo = db.execute(
+                CajaService._MOVER_SALDO_CON_MINIMO, {"delta_saldo": delta, "saldo_minimo": saldo_minimo}
+            ).scalar()
+        
+        if nuevo_saldo is None and db.get(models.SaldoCaja, CajaService.ID_SALDO) is None:
+            # La cabecera aún no existe: crearla y reintentar
+            CajaService.get_saldo_caja(db)
+            db.flush()
+            return CajaService.mover_saldo(db, delta, saldo_minimo)
+        
+        return nuevo_saldo
+    
+    @staticmethod
+    def registrar_movimiento(
+        db: Session,
+        tipo_movimiento: str,
+        monto: float,
+        id_transaccion: Optional[int] = None,
+        fecha: Optional[datetime] = None
+    ) -> FilaCaja:
+        """
+        Agrega un movimiento al libro de caja y actualiza la cabecera de saldo
+        dentro de la misma transacción de base de datos. No hace commit: el
+        llamador decide cuándo confirmar.
+        
+        Args:
+            db (Session): Sesión de base de datos
+            tipo_movimiento (str): "INGRESO" o "EGRESO"
+            monto (float): Monto del movimiento
+            id_transaccion (Optional[int]): Transacción que origina el movimiento
+            fecha (Optional[datetime]): Fecha del movimiento (por defecto, ahora)
             
         Returns:
-            models.Caja: El movimiento creado
+            FilaCaja: El movimiento registrado
             
         Raises:
-            HTTPException: Si hay errores de validación o falla la operación
+            HTTPException: Si es un egreso y el saldo de caja no es suficiente
         """
-        # Validaciones básicas
-        if movimiento.monto <= 0:
+        if tipo_movimiento == "INGRESO":
+            nuevo_saldo = CajaService.mover_saldo(db, monto)
+        else:
+            nuevo_saldo = CajaService.mover_saldo(db, -monto, saldo_minimo=monto)
+            if nuevo_saldo is None:
+                saldo_actual = CajaService.get_saldo_actual(db)["saldo"]
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Saldo insuficiente en caja. Disponible: {saldo_actual}, Requerido: {monto}"
+                )
+        
+        fecha = fecha or datetime.now()
+        id_movimiento = db.execute(CajaService._INSERTAR_MOVIMIENTO, {
+            "tipo_movimiento": tipo_movimiento,
+            "monto": monto,
+            "saldo_actual": nuevo_saldo,
+            "id_transaccion": id_transaccion,
+            "fecha_movimiento": fecha,
+        }).scalar_one()
+        
+        CajaService.marcar_ultimo_movimiento(db, id_movimiento, fecha)
+        CajaService.acumular_resumen_diario(db, fecha.date(), [(tipo_movimiento, monto)])
+        
+        return FilaCaja(
+            tipo_movimiento=tipo_movimiento,
+            monto=monto,
+            saldo_actual=nuevo_saldo,
+            id_movimiento=id_movimiento,
+            fecha_movimiento=fecha,
+            id_transaccion=id_transaccion
+        )
+    
+    @staticmethod
+    def marcar_ultimo_movimiento(db: Session, id_movimiento: int, fecha: datetime) -> None:
+        """
+        Registra en la cabecera de caja el último movimiento aplicado.
+        
+        Args:
+            db (Session): Sesión de base de datos
+            id_movimiento (int): ID del último movimiento de caja
+            fecha (datetime): Fecha del movimiento
+        """
+        db.execute(CajaService._MARCAR_ULTIMO_MOVIMIENTO, {"id_movimiento": id_movimiento, "fecha": fecha})
+    
+    @staticmethod
+    def acumular_resumen_diario(db: Session, fecha: date, movimientos: List[Tuple[str, float]]) -> None:
+        """
+        Suma movimientos al resumen diario de caja con un único UPSERT
+        (INSERT ... ON CONFLICT DO UPDATE), de modo que el costo no depende del
+        tamaño del libro de caja.
+        
+        Args:
+            db (Session): Sesión de base de datos
+            fecha (date): Día al que pertenecen los movimientos
+            movimientos (List[Tuple[str, float]]): Pares (tipo_movimiento, monto)
+        """
+        valores = {
+            "fecha": fecha,
+            "total_ingresos": sum(monto for tipo, monto in movimientos if tipo == "INGRESO"),
+            "total_egresos": sum(monto for tipo, monto in movimientos if tipo != "INGRESO"),
+            "num_ingresos": sum(1 for tipo, _ in movimientos if tipo == "INGRESO"),
+            "num_egresos": sum(1 for tipo, _ in movimientos if tipo != "INGRESO"),
+        }
+        
+        dialecto = db.get_bind().dialect.name
+        if dialecto in ("sqlite", "postgresql"):
+            stmt = CajaService._UPSERT_RESUMEN.get(dialecto)
+            if stmt is None:
+                # Sin valores fijos: las columnas y sus valores llegan como parámetros
+                tabla = models.ResumenCajaDiario.__table__
+                stmt = (sqlite_insert if dialecto == "sqlite" else postgresql_insert)(tabla)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[tabla.c.fecha],
+                    set_={
+                        columna: tabla.c[columna] + stmt.excluded[columna]
+                        for columna in valores if columna != "fecha"
+                    }
+                )
+                CajaService._UPSERT_RESUMEN[dialecto] = stmt
+            db.execute(stmt, valores)
+            return
+        
+        # Otros motores: leer y actualizar la fila del día
+        resumen = db.get(models.ResumenCajaDiario, fecha)
+        if resumen is None:
+            db.add(models.ResumenCajaDiario(**valores))
+        else:
+            for columna, valor in valores.items():
+                if columna != "fecha":
+                    setattr(resumen, columna, getattr(resumen, columna) + valor)
+    
+    @staticmethod
+    def reconstruir_resumen_diario(db: Session) -> int:
+        """
+        Reconstruye el resumen diario de caja a partir de todos los movimientos
+        con una consulta SUM/COUNT ... GROUP BY. No hace commit.
+        
+        Args:
+            db (Session): Sesión de base de datos
+            
+        Returns:
+            int: Número de días del resumen
+        """
+        es_ingreso = models.Caja.tipo_movimiento == "INGRESO"
+        dia = func.date(models.Caja.fecha_movimiento)
+        filas = db.query(
+            dia,
+            func.coalesce(func.sum(case((es_ingreso, models.Caja.monto), else_=0)), 0),
+            func.coalesce(func.sum(case((es_ingreso, 0), else_=models.Caja.monto)), 0),
+            func.sum(case((es_ingreso, 1), else_=0)),
+            func.sum(case((es_ingreso, 0), else_=1))
+        ).group_by(dia).all()
+        
+        db.query(models.ResumenCajaDiario).delete(synchronize_session=False)
+        db.add_all([
+            models.ResumenCajaDiario(
+                fecha=fecha if isinstance(fecha, date) else date.fromisoformat(fecha),
+                total_ingresos=total_ingresos,
+                total_egresos=total_egresos,
+                num_ingresos=num_ingresos,
+                num_egresos=num_egresos
+            )
+            for fecha, total_ingresos, total_egresos, num_ingresos, num_egresos in filas
+        ])
+        return len(filas)
+    
+    @staticmethod
+    def get_resumen(
+        db: Session,
+        fecha_desde: Optional[date] = None,
+        fecha_hasta: Optional[date] = None,
+        periodo: Optional[str] = None
+    ) -> schemas.ResumenCaja:
+        """
+        Obtiene los totales de ingresos y egresos de caja, opcionalmente agrupados
+        por día, semana o mes, a partir del resumen diario.
+        
+        Args:
+            db (Session): Sesión de base de datos
+            fecha_desde (Optional[date]): Primer día incluido
+            fecha_hasta (Optional[date]): Último día incluido
+            periodo (Optional[str]): "dia", "semana" o "mes" para agrupar los totales
+            
+        Returns:
+            schemas.ResumenCaja: Totales del rango, saldo actual y totales por periodo
+            
+        Raises:
+            HTTPException: Si el periodo no es válido o el rango de fechas está invertido
+        """
+        if periodo is not None and periodo not in CajaService.PERIODOS_RESUMEN:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="El monto debe ser mayor que cero"
+                detail=f"Periodo no válido: {periodo}. Use uno de: {', '.join(CajaService.PERIODOS_RESUMEN)}"
+            )
+        if fecha_desde is not None and fecha_hasta is not None and fecha_desde > fecha_hasta:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="fecha_desde no puede ser posterior a fecha_hasta"
             )
         
-        # Obtener el saldo actual
-        ultimo_movimiento = db.query(models.Caja).order_by(
-            models.Caja.id_movimiento.desc()
-        ).first()
+        resumen = models.ResumenCajaDiario
+        totales = (
+            func.coalesce(func.sum(resumen.total_ingresos), 0),
+            func.coalesce(func.sum(resumen.total_egresos), 0),
+            func.coalesce(func.sum(resumen.num_ingresos), 0),
+            func.coalesce(func.sum(resumen.num_egresos), 0),
+        )
+        
+        filtros = []
+        if fecha_desde is not None:
+            filtros.append(resumen.fecha >= fecha_desde)
+        if fecha_hasta is not None:
+            filtros.append(resumen.fecha <= fecha_hasta)
+        
+        total_ingresos, total_egresos, num_ingresos, num_egresos = db.query(*totales).filter(*filtros).one()
+        
+        periodos = []
+        if periodo is not None:
+            inicio = CajaService._inicio_periodo(db, periodo)
+            for fila in db.query(inicio, *totales).filter(*filtros).group_by(inicio).order_by(inicio):
+                periodos.append(schemas.ResumenCajaPeriodo(
+                    inicio=fila[0],
+                    total_ingresos=fila[1],
+                    total_egresos=fila[2],
+                    num_ingresos=fila[3],
+                    num_egresos=fila[4],
+                    resultado=fila[1] - fila[2]
+                ))
+        
+        return schemas.ResumenCaja(
+            fecha_desde=fecha_desde,
+            fecha_hasta=fecha_hasta,
+            total_ingresos=total_ingresos,
+            total_egresos=total_egresos,
+            num_ingresos=num_ingresos,
+            num_egresos=num_egresos,
+            resultado=total_ingresos - total_egresos,
+            saldo=CajaService.get_saldo_actual(db)["saldo"],
+            periodo=periodo,
+            periodos=periodos
+        )
+    
+    @staticmethod
+    def _inicio_periodo(db: Session, periodo: str):
+        """
+        Expresión SQL con el primer día del periodo (día, semana que empieza el
+        lunes o mes) al que pertenece cada fila del resumen diario.
+        """
+        fecha = models.ResumenCajaDiario.fecha
+        if periodo == "dia":
+            return fecha
+        
+        if db.get_bind().dialect.name == "sqlite":
+            if periodo == "semana":
+                expresion = func.date(fecha, "weekday 0", "-6 days")
+            else:
+                expresion = func.date(fecha, "start of month")
+        else:
+            expresion = cast(func.date_trunc("week" if periodo == "semana" else "month", fecha), Date)
         
-        saldo_actual = 0
-        if ultimo_movimiento:
-            saldo_actual = ultimo_movimiento.saldo_actual
+        return type_coerce(expresion, Date)
+    
+    @staticmethod
+    def reconciliar_saldo(db: Session, corregir: bool = True) -> Dict[str, object]:
+        """
+        Reconstruye el saldo a partir de la tabla de caja y reporta cualquier
+        diferencia con la cabecera de saldo o con el último movimiento.
         
-        # Validar saldo suficiente en caso de egreso
-        if movimiento.tipo_movimiento == "EGRESO" and movimiento.monto > saldo_actual:
+        Args:
+            db (Session): Sesión de base de datos
+            corregir (bool): Si es True, reescribe la cabecera con el saldo reconstruido
+            
+        Returns:
+            Dict[str, object]: Saldos comparados, diferencias y si se aplicó la corrección
+        """
+        totales = db.query(
+            func.count(models.Caja.id_movimiento),
+            func.max(models.Caja.id_movimiento),
+            func.coalesce(func.sum(
+                case(
+                    (models.Caja.tipo_movimiento == "INGRESO", models.Caja.monto),
+                    else_=-models.Caja.monto
+                )
+            ), 0)
+        ).one()
+        movimientos, id_ultimo_movimiento, saldo_calculado = totales
+        
+        saldo_ultimo_movimiento = 0
+        if id_ultimo_movimiento is not None:
+            saldo_ultimo_movimiento = db.query(models.Caja.saldo_actual).filter(
+                models.Caja.id_movimiento == id_ultimo_movimiento
+            ).scalar()
+        
+        saldo_caja = CajaService.get_saldo_caja(db)
+        
+        reporte = {
+            "movimientos": movimientos,
+            "id_ultimo_movimiento": id_ultimo_movimiento,
+            "saldo_calculado": saldo_calculado,
+            "saldo_cabecera": saldo_caja.saldo_actual,
+            "saldo_ultimo_movimiento": saldo_ultimo_movimiento,
+            "diferencia_cabecera": round(saldo_caja.saldo_actual - saldo_calculado, 6),
+            "diferencia_ultimo_movimiento": round(saldo_ultimo_movimiento - saldo_calculado, 6),
+            "corregido": False
+        }
+        reporte["consistente"] = (
+            reporte["diferencia_cabecera"] == 0
+            and reporte["diferencia_ultimo_movimiento"] == 0
+            and saldo_caja.id_ultimo_movimiento == id_ultimo_movimiento
+        )
+        
+        if corregir and not reporte["consistente"]:
+            saldo_caja.saldo_actual = saldo_calculado
+            saldo_caja.id_ultimo_movimiento = id_ultimo_movimiento
+            saldo_caja.fecha_actualizacion = datetime.now()
+            reporte["corregido"] = True
+        
+        if corregir:
+            reporte["dias_resumen"] = CajaService.reconstruir_resumen_diario(db)
+            db.commit()
+        else:
+            db.rollback()
+        
+        return reporte
+    
+    @staticmethod
+    def aplicar_movimiento(db: Session, movimiento: schemas.CajaCreate) -> FilaCaja:
+        """
+        Valida y registra un movimiento de caja manual sin hacer commit. La usan
+        create_movimiento y la cola de escritura, que confirma varios juntos.
+        
+        Args:
+            db (Session): Sesión de base de datos
+            movimiento (schemas.CajaCreate): Datos del movimiento a crear
+            
+        Returns:
+            FilaCaja: El movimiento registrado
+            
+        Raises:
+            HTTPException: Si el tipo o el monto no son válidos o el saldo no alcanza para un egreso
+        """
+        # Validaciones básicas, antes de tocar la cabecera de saldo
+        if movimiento.tipo_movimiento not in CajaService.TIPOS_MOVIMIENTO:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Saldo insuficiente. Disponible: {saldo_actual}, Solicitado: {movimiento.monto}"
+                detail=f"Tipo de movimiento no válido: {movimiento.tipo_movimiento}. Use uno de: {', '.join(CajaService.TIPOS_MOVIMIENTO)}"
+            )
+        if movimiento.monto <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El monto debe ser mayor que cero"
             )
         
-        # Calcular nuevo saldo
-        nuevo_saldo = saldo_actual
-        if movimiento.tipo_movimiento == "INGRESO":
-            nuevo_saldo += movimiento.monto
-        else:
-            nuevo_saldo -= movimiento.monto
-        
-        # Crear el movimiento
-        db_movimiento = models.Caja(
+        # Crear el movimiento y actualizar la cabecera de saldo; en un egreso
+        # la validación de saldo suficiente se hace de forma atómica
+        db_movimiento = CajaService.registrar_movimiento(
+            db,
             tipo_movimiento=movimiento.tipo_movimiento,
             monto=movimiento.monto,
-            saldo_actual=nuevo_saldo,
-            descripcion=movimiento.descripcion,
-            fecha_movimiento=datetime.now()
+            id_transaccion=movimiento.id_transaccion
         )
+        EventoService.registrar(
+            db,
+            EventoService.INGRESO_CAJA if movimiento.tipo_movimiento == "INGRESO" else EventoService.EGRESO_CAJA,
+            fecha=db_movimiento.fecha_movimiento,
+            monto=movimiento.monto,
+            id_transaccion=movimiento.id_transaccion,
+            id_movimiento=db_movimiento.id_movimiento
+        )
+        return db_movimiento
+    
+    @staticmethod
+    def create_movimiento(db: Session, movimiento: schemas.CajaCreate) -> FilaCaja:
+        """
+        Crea un nuevo movimiento de caja manual.
         
+        Args:
+            db (Session): Sesión de base de datos
+            movimiento (schemas.CajaCreate): Datos del movimiento a crear
+            
+        Returns:
+            FilaCaja: El movimiento creado
+            
+        Raises:
+            HTTPException: Si hay errores de validación o falla la operación
+        """
         try:
-            db.add(db_movimiento)
+            db_movimiento = CajaService.aplicar_movimiento(db, movimiento)
             db.commit()
-            db.refresh(db_movimiento)
             return db_movimiento
+        except HTTPException:
+            db.rollback()
+            raise
         except Exception as e:
             db.rollback()
             raise HTTPException(
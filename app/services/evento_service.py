@@ -0,0 +1,215 @@
+import heapq
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.migraciones import reclamar_inicializacion
+from app.models import models
+
+class EventoService:
+    """
+    Servicio para el registro de eventos de inventario y caja.
+    Cada venta, abastecimiento, movimiento manual de caja y cambio de stock del
+    catálogo agrega un evento en la misma transacción de base de datos que lo
+    aplica. Los eventos nunca se modifican ni se eliminan: las proyecciones
+    (ProyeccionService) se reconstruyen leyéndolos en orden.
+    """
+
+    # Tipos de evento
+    LIBRO_CREADO = "LIBRO_CREADO"          # cantidad: stock inicial
+    LIBRO_AJUSTADO = "LIBRO_AJUSTADO"      # cantidad: nuevo stock (modificación manual, solo en registros anteriores)
+    LIBRO_ELIMINADO = "LIBRO_ELIMINADO"
+    VENTA = "VENTA"                        # cantidad vendida, monto ingresado en caja
+    ABASTECIMIENTO = "ABASTECIMIENTO"      # cantidad abastecida, monto egresado de caja
+    INGRESO_CAJA = "INGRESO_CAJA"          # movimiento manual de caja
+    EGRESO_CAJA = "EGRESO_CAJA"
+
+    # Tipo de evento de cada tipo de transacción
+    TIPOS_TRANSACCION = {1: VENTA, 2: ABASTECIMIENTO}
+
+    # INSERT de Core sobre la tabla, construido una sola vez: evita el camino de
+    # inserción masiva del ORM, que no aporta nada para filas sin entidad
+    _INSERTAR = insert(models.Evento.__table__)
+
+    @staticmethod
+    def registrar(db: Session, tipo: str, fecha: Optional[datetime] = None, **campos) -> None:
+        """
+        Agrega un evento sin hacer commit: se confirma junto con el cambio que describe.
+
+        Args:
+            db (Session): Sesión de base de datos
+            tipo (str): Tipo de evento
+            fecha (Optional[datetime]): Fecha del evento (por defecto, ahora)
+            **campos: ISBN, cantidad, monto, id_transaccion y/o id_movimiento
+        """
+        db.execute(EventoService._INSERTAR, {"tipo": tipo, "fecha": fecha or datetime.now(), **campos})
+
+    @staticmethod
+    def registrar_varios(db: Session, eventos: List[Dict]) -> None:
+        """
+        Agrega varios eventos con un solo INSERT ejecutado como executemany, sin hacer commit.
+
+        Args:
+            db (Session): Sesión de base de datos
+            eventos (List[Dict]): Eventos con tipo, fecha y sus campos; todos con las mismas claves
+        """
+        if eventos:
+            db.execute(EventoService._INSERTAR, eventos)
+
+    @staticmethod
+    def get_eventos(db: Session, desde_id: int = 0, limit: int = 100) -> List[models.Evento]:
+        """
+        Obtiene los eventos posteriores a un ID, en orden de registro.
+
+        Args:
+            db (Session): Sesión de base de datos
+            desde_id (int): Se devuelven los eventos con ID mayor a este
+            limit (int): Número máximo de eventos a retornar
+
+        Returns:
+            List[models.Evento]: Los eventos, del más antiguo al más reciente
+        """
+        return db.query(models.Evento).filter(
+            models.Evento.id_evento > desde_id
+        ).order_by(models.Evento.id_evento).limit(limit).all()
+
+    @staticmethod
+    def get_marca_cambios(db: Session) -> int:
+        """
+        Marca de cambios del registro de eventos para el ETag: el ID del último evento.
+
+        Args:
+            db (Session): Sesión de base de datos
+
+        Returns:
+            int: ID del último evento, o 0 si no hay ninguno
+        """
+        return db.query(func.max(models.Evento.id_evento)).scalar() or 0
+
+    @staticmethod
+    def inicializar(db: Session, tamano_lote: int = 1000) -> int:
+        """
+        En una base con historial previo al registro de eventos, genera los eventos
+        equivalentes a ese historial para que las proyecciones partan del estado
+        real. No hace nada si ya hay eventos, ni si otro worker hizo o está haciendo
+        el relleno (reclamar_inicializacion). Hace commit.
+
+        Cada libro recibe un LIBRO_CREADO con el stock que tenía antes de sus
+        transacciones (el actual menos el efecto neto de ellas); luego se agregan
+        las transacciones (con el monto de su movimiento de caja) y los movimientos
+        manuales de caja, en orden de fecha.
+
+        Args:
+            db (Session): Sesión de base de datos
+            tamano_lote (int): Eventos insertados por cada INSERT
+
+        Returns:
+            int: Número de eventos generados
+        """
+        if not reclamar_inicializacion(db, "eventos"):
+            return 0
+        if db.query(models.Evento.id_evento).first() is not None or (
+            db.query(models.Libro.ISBN).first() is None and db.query(models.Caja.id_movimiento).first() is None
+        ):
+            db.commit()
+            return 0
+
+        generados = 0
+        lote = []
+
+        def agregar(evento: Dict) -> None:
+            nonlocal generados, lote
+            lote.append(evento)
+            generados += 1
+            if len(lote) >= tamano_lote:
+                EventoService.registrar_varios(db, lote)
+                lote = []
+
+        # 1. Stock inicial de cada libro: el actual menos el efecto neto de sus transacciones
+        neto = EventoService._neto_por_libro(db)
+        inicio = db.query(func.min(models.Transaccion.fecha_transaccion)).scalar() or datetime.now()
+        for isbn, cantidad in db.query(models.Libro.ISBN, models.Libro.cantidad_actual).order_by(models.Libro.ISBN):
+            agregar(EventoService._evento(
+                EventoService.LIBRO_CREADO, inicio, ISBN=isbn, cantidad=cantidad - (neto.get(isbn) or 0)
+            ))
+
+        # 2. Transacciones y movimientos manuales de caja, mezclados por fecha. El
+        # movimiento de una transacción es el primero que la referencia; los demás
+        # (movimientos manuales asociados a ella) son movimientos manuales
+        primeros = db.query(
+            models.Caja.id_transaccion, func.min(models.Caja.id_movimiento).label("id_movimiento")
+        ).filter(
+            models.Caja.id_transaccion.isnot(None)
+        ).group_by(models.Caja.id_transaccion).subquery()
+        for evento in heapq.merge(
+            EventoService._eventos_transacciones(db, primeros, tamano_lote),
+            EventoService._eventos_caja_manual(db, primeros, tamano_lote),
+            key=lambda evento: evento["fecha"]
+        ):
+            agregar(evento)
+
+        EventoService.registrar_varios(db, lote)
+        db.commit()
+        return generados
+
+    @staticmethod
+    def _neto_por_libro(db: Session) -> Dict[str, int]:
+        """Efecto neto de las transacciones sobre el stock de cada libro."""
+        neto: Dict[str, int] = {}
+        for isbn, tipo, cantidad in db.query(
+            models.Transaccion.ISBN, models.Transaccion.tipo_transaccion, func.sum(models.Transaccion.cantidad)
+        ).group_by(models.Transaccion.ISBN, models.Transaccion.tipo_transaccion):
+            neto[isbn] = neto.get(isbn, 0) + (cantidad if tipo == 2 else -cantidad)
+        return neto
+
+    @staticmethod
+    def _evento(tipo: str, fecha: datetime, **campos) -> Dict:
+        """Evento con todas las columnas, para insertarlo en un executemany."""
+        evento = {
+            "tipo": tipo, "fecha": fecha, "ISBN": None, "cantidad": None,
+            "monto": None, "id_transaccion": None, "id_movimiento": None,
+        }
+        evento.update(campos)
+        return evento
+
+    @staticmethod
+    def _eventos_transacciones(db: Session, primeros, tamano_lote: int) -> Iterator[Dict]:
+        filas = db.query(
+            models.Transaccion.id_transaccion,
+            models.Transaccion.fecha_transaccion,
+            models.Transaccion.ISBN,
+            models.Transaccion.tipo_transaccion,
+            models.Transaccion.cantidad,
+            models.Caja.id_movimiento,
+            models.Caja.monto
+        ).outerjoin(
+            primeros, primeros.c.id_transaccion == models.Transaccion.id_transaccion
+        ).outerjoin(
+            models.Caja, models.Caja.id_movimiento == primeros.c.id_movimiento
+        ).order_by(
+            models.Transaccion.fecha_transaccion, models.Transaccion.id_transaccion
+        ).yield_per(tamano_lote)
+        for id_transaccion, fecha, isbn, tipo, cantidad, id_movimiento, monto in filas:
+            yield EventoService._evento(
+                EventoService.TIPOS_TRANSACCION.get(tipo, EventoService.VENTA), fecha,
+                ISBN=isbn, cantidad=cantidad, monto=monto or 0.0,
+                id_transaccion=id_transaccion, id_movimiento=id_movimiento
+            )
+
+    @staticmethod
+    def _eventos_caja_manual(db: Session, primeros, tamano_lote: int) -> Iterator[Dict]:
+        filas = db.query(
+            models.Caja.id_movimiento, models.Caja.fecha_movimiento, models.Caja.tipo_movimiento,
+            models.Caja.monto, models.Caja.id_transaccion
+        ).filter(
+            models.Caja.id_movimiento.notin_(db.query(primeros.c.id_movimiento))
+        ).order_by(
+            models.Caja.fecha_movimiento, models.Caja.id_movimiento
+        ).yield_per(tamano_lote)
+        for id_movimiento, fecha, tipo, monto, id_transaccion in filas:
+            yield EventoService._evento(
+                EventoService.INGRESO_CAJA if tipo == "INGRESO" else EventoService.EGRESO_CAJA, fecha,
+                monto=monto, id_transaccion=id_transaccion, id_movimiento=id_movimiento
+            )
@@ -0,0 +1,178 @@
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional, Sequence
+
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+
+from app.database import SessionLocal
+from app.models import models
+from app.schemas import schemas
+from app.services.transaccion_service import TransaccionService
+
+class ExportacionService:
+    """
+    Servicio para exportar el historial completo de transacciones y de caja.
+    Las filas se leen de la base de datos en lotes con un cursor del lado del
+    servidor y se escriben como CSV o NDJSON a medida que llegan, así que la
+    memoria usada no depende del tamaño del historial.
+    """
+
+    FORMATOS = ("csv", "ndjson")
+
+    TIPOS_CONTENIDO = {
+        "csv": "text/csv; charset=utf-8",
+        "ndjson": "application/x-ndjson",
+    }
+
+    COLUMNAS_TRANSACCIONES = (
+        models.Transaccion.id_transaccion,
+        models.Transaccion.fecha_transaccion,
+        models.Transaccion.ISBN,
+        models.Transaccion.tipo_transaccion,
+        models.Transaccion.cantidad,
+    )
+
+    COLUMNAS_CAJA = (
+        models.Caja.id_movimiento,
+        models.Caja.fecha_movimiento,
+        models.Caja.tipo_movimiento,
+        models.Caja.monto,
+        models.Caja.saldo_actual,
+        models.Caja.id_transaccion,
+    )
+
+    @staticmethod
+    def validar_formato(formato: str) -> None:
+        """
+        Verifica que el formato de exportación sea válido.
+
+        Raises:
+            HTTPException: Si el formato no es válido
+        """
+        if formato not in ExportacionService.FORMATOS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Formato no válido: {formato}. Use uno de: {', '.join(ExportacionService.FORMATOS)}"
+            )
+
+    @staticmethod
+    def exportar_transacciones(
+        filtro: schemas.FiltroTransacciones, formato: str, tamano_lote: int = 1000
+    ) -> Iterator[str]:
+        """
+        Genera la exportación de las transacciones que cumplen el filtro, de la más
+        antigua a la más reciente.
+
+        La validación se hace antes de devolver el generador, para que los errores
+        lleguen como una respuesta 400 y no a mitad de la descarga. El generador abre
+        su propia sesión, porque se consume después de que el endpoint retorna.
+
+        Args:
+            filtro (schemas.FiltroTransacciones): Filtros por tipo, ISBN, fechas y cantidades
+            formato (str): "csv" o "ndjson"
+            tamano_lote (int): Filas leídas y escritas por cada bloque
+
+        Returns:
+            Iterator[str]: Bloques de texto de la exportación
+
+        Raises:
+            HTTPException: Si el formato o algún rango del filtro no es válido
+        """
+        ExportacionService.validar_formato(formato)
+        TransaccionService.validar_filtro(filtro)
+        columnas = ExportacionService.COLUMNAS_TRANSACCIONES
+
+        def consulta(db: Session):
+            query = TransaccionService._filtrar(db.query(*columnas), filtro)
+            return query.order_by(models.Transaccion.fecha_transaccion, models.Transaccion.id_transaccion)
+
+        return ExportacionService._generar(consulta, columnas, formato, tamano_lote)
+
+    @staticmethod
+    def exportar_movimientos(
+        fecha_desde: Optional[date], fecha_hasta: Optional[date], formato: str, tamano_lote: int = 1000
+    ) -> Iterator[str]:
+        """
+        Genera la exportación de los movimientos de caja del rango de fechas, del
+        más antiguo al más reciente.
+
+        Args:
+            fecha_desde (Optional[date]): Primer día incluido
+            fecha_hasta (Optional[date]): Último día incluido
+            formato (str): "csv" o "ndjson"
+            tamano_lote (int): Filas leídas y escritas por cada bloque
+
+        Returns:
+            Iterator[str]: Bloques de texto de la exportación
+
+        Raises:
+            HTTPException: Si el formato o el rango de fechas no es válido
+        """
+        ExportacionService.validar_formato(formato)
+        if fecha_desde and fecha_hasta and fecha_desde > fecha_hasta:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="fecha_desde no puede ser posterior a fecha_hasta"
+            )
+        columnas = ExportacionService.COLUMNAS_CAJA
+
+        def consulta(db: Session):
+            query = db.query(*columnas)
+            # Los días del rango son inclusivos: [desde 00:00, hasta + 1 día 00:00)
+            if fecha_desde is not None:
+                query = query.filter(
+                    models.Caja.fecha_movimiento >= datetime.combine(fecha_desde, datetime.min.time())
+                )
+            if fecha_hasta is not None:
+                query = query.filter(
+                    models.Caja.fecha_movimiento
+                    < datetime.combine(fecha_hasta + timedelta(days=1), datetime.min.time())
+                )
+            return query.order_by(models.Caja.fecha_movimiento, models.Caja.id_movimiento)
+
+        return ExportacionService._generar(consulta, columnas, formato, tamano_lote)
+
+    @staticmethod
+    def _generar(consulta, columnas: Sequence, formato: str, tamano_lote: int) -> Iterator[str]:
+        """
+        Ejecuta la consulta con yield_per en una sesión propia y serializa las filas
+        en bloques de tamano_lote.
+        """
+        nombres = [columna.key for columna in columnas]
+        with SessionLocal() as db:
+            filas = consulta(db).yield_per(tamano_lote)
+
+            if formato == "csv":
+                buffer = io.StringIO()
+                escritor = csv.writer(buffer, lineterminator="\n")
+                escritor.writerow(nombres)
+                for numero, fila in enumerate(filas, start=1):
+                    escritor.writerow(
+                        valor.isoformat() if isinstance(valor, datetime) else valor for valor in fila
+                    )
+                    if numero % tamano_lote == 0:
+                        yield buffer.getvalue()
+                        buffer.seek(0)
+                        buffer.truncate()
+                yield buffer.getvalue()
+            else:
+                bloque = []
+                for fila in filas:
+                    bloque.append(json.dumps(
+                        dict(zip(nombres, fila)), default=ExportacionService._serializar_valor, ensure_ascii=False
+                    ))
+                    if len(bloque) == tamano_lote:
+                        yield "\n".join(bloque) + "\n"
+                        bloque = []
+                if bloque:
+                    yield "\n".join(bloque) + "\n"
+
+    @staticmethod
+    def _serializar_valor(valor):
+        """Convierte a JSON los valores que json no serializa por sí mismo (fechas)."""
+        if isinstance(valor, (datetime, date)):
+            return valor.isoformat()
+        raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
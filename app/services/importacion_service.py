@@ -0,0 +1,337 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+
+from app.models import models
+from app.schemas import schemas
+from app.services.busqueda_service import BusquedaService
+from app.services.evento_service import EventoService
+from app.services.libro_service import LibroService
+
+class ImportacionService:
+    """
+    Servicio para importar catálogos de libros de proveedores.
+    Lee archivos CSV o JSONL fila por fila y los guarda en lotes, de modo que la
+    memoria usada no depende del tamaño del archivo.
+    """
+
+    FORMATOS = ("csv", "jsonl")
+
+    # Máximo de errores por fila que se devuelven en el resultado (se cuentan todos)
+    MAX_ERRORES_DETALLE = 1000
+
+    @staticmethod
+    def verificar_utf8(archivo: BinaryIO) -> None:
+        """
+        Verifica que un archivo esté completo en UTF-8 antes de importar nada, para
+        que un byte inválido no corte la importación con lotes ya confirmados.
+
+        Se decodifica línea por línea: en UTF-8 el byte de salto de línea nunca forma
+        parte de un carácter de varios bytes, así que el número de línea es exacto.
+
+        Args:
+            archivo (BinaryIO): Archivo abierto en modo binario, desde el principio
+
+        Raises:
+            HTTPException: Si alguna línea no es UTF-8 válido
+        """
+        for numero, linea in enumerate(archivo, start=1):
+            try:
+                linea.decode("utf-8")
+            except UnicodeDecodeError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"El archivo no está codificado en UTF-8: byte no válido en la línea {numero}, posición {e.start + 1}"
+                )
+
+    @staticmethod
+    def importar_archivo(
+        db: Session, archivo: BinaryIO, formato: str, tamano_lote: int = 1000
+    ) -> schemas.ResultadoImportacion:
+        """
+        Importa un catálogo desde un archivo binario en UTF-8 (con o sin BOM),
+        después de verificar su codificación completa.
+
+        Args:
+            db (Session): Sesión de base de datos
+            archivo (BinaryIO): Archivo abierto en modo binario, con posibilidad de seek
+            formato (str): "csv" o "jsonl"
+            tamano_lote (int): Filas por lote
+
+        Returns:
+            schemas.ResultadoImportacion: Conteos, errores por fila y rendimiento
+
+        Raises:
+            HTTPException: Si el formato no es válido o el archivo no es UTF-8
+        """
+        archivo.seek(0)
+        ImportacionService.verificar_utf8(archivo)
+        archivo.seek(0)
+        flujo = io.TextIOWrapper(archivo, encoding="utf-8-sig", errors="strict", newline="")
+        try:
+            return ImportacionService.importar_libros(db, flujo, formato, tamano_lote)
+        finally:
+            # El archivo lo cierra quien lo abrió
+            flujo.detach()
+
+    @staticmethod
+    def leer_filas(flujo: TextIO, formato: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+        """
+        Recorre las filas de un archivo CSV (con encabezado) o JSONL.
+
+        Args:
+            flujo (TextIO): Archivo de texto abierto
+            formato (str): "csv" o "jsonl"
+
+        Returns:
+            Iterator[Tuple[int, Optional[dict], Optional[str]]]: Por cada fila, su número
+                (contando el encabezado en CSV), sus datos y un error de lectura si lo hubo
+
+        Raises:
+            HTTPException: Si el formato no es válido
+        """
+        if formato == "csv":
+            lector = csv.DictReader(flujo)
+            for fila in lector:
+                if None in fila:
+                    yield lector.line_num, None, "La fila tiene más columnas que el encabezado"
+                    continue
+                yield lector.line_num, fila, None
+        elif formato == "jsonl":
+            for numero, linea in enumerate(flujo, start=1):
+                if not linea.strip():
+                    continue
+                try:
+                    fila = json.loads(linea)
+                except ValueError as e:
+                    yield numero, None, f"JSON no válido: {e}"
+                    continue
+                if not isinstance(fila, dict):
+                    yield numero, None, "Cada línea debe ser un objeto JSON"
+                    continue
+                yield numero, fila, None
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Formato no válido: {formato}. Use uno de: {', '.join(ImportacionService.FORMATOS)}"
+            )
+
+    @staticmethod
+    def validar_fila(fila: dict) -> schemas.LibroCreate:
+        """
+        Valida una fila con las reglas de LibroCreate y las de LibroService.create_libro.
+        LibroCreate normaliza el ISBN (sin guiones ni espacios) antes de validar su largo.
+
+        Args:
+            fila (dict): Datos de la fila; los campos vacíos toman su valor por defecto
+
+        Returns:
+            schemas.LibroCreate: Los datos validados
+
+        Raises:
+            ValueError: Si la fila no es válida
+        """
+        datos = {
+            campo: valor.strip() if isinstance(valor, str) else valor
+            for campo, valor in fila.items()
+            if valor is not None and valor != ""
+        }
+        try:
+            libro = schemas.LibroCreate(**datos)
+        except ValidationError as e:
+            raise ValueError("; ".join(
+                f"{'.'.join(str(parte) for parte in error['loc'])}: {error['msg']}" for error in e.errors()
+            ))
+
+        if not libro.ISBN or len(libro.ISBN) > 13:
+            raise ValueError("ISBN: debe tener entre 1 y 13 caracteres")
+        if len(libro.titulo) > 255:
+            raise ValueError("titulo: no puede superar los 255 caracteres")
+        if libro.cantidad_actual < 0:
+            raise ValueError("cantidad_actual: la cantidad inicial no puede ser negativa")
+        return libro
+
+    @staticmethod
+    def importar_libros(
+        db: Session, flujo: TextIO, formato: str, tamano_lote: int = 1000
+    ) -> schemas.ResultadoImportacion:
+        """
+        Importa un catálogo de libros desde un archivo CSV o JSONL.
+
+        Las filas válidas se guardan en lotes de tamano_lote con un solo INSERT ...
+        ON CONFLICT DO UPDATE ejecutado como executemany y un commit por lote. Un
+        libro existente actualiza su título y precios; su stock solo cambia con
+        transacciones, así que cantidad_actual se usa únicamente para libros nuevos.
+
+        Las filas con errores se reportan y no detienen la importación. Si la base de
+        datos rechaza un lote, ese lote se reintenta fila por fila para aislar las
+        filas que fallan.
+
+        Args:
+            db (Session): Sesión de base de datos
+            flujo (TextIO): Archivo de texto abierto
+            formato (str): "csv" o "jsonl"
+            tamano_lote (int): Filas por lote
+
+        Returns:
+            schemas.ResultadoImportacion: Conteos, errores por fila y rendimiento
+
+        Raises:
+            HTTPException: Si el formato no es válido
+        """
+        inicio = time.perf_counter()
+        resultado = schemas.ResultadoImportacion()
+        lote: Dict[str, Tuple[int, schemas.LibroCreate]] = {}
+
+        for numero, fila, error in ImportacionService.leer_filas(flujo, formato):
+            resultado.filas += 1
+            if error is None:
+                try:
+                    libro = ImportacionService.validar_fila(fila)
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                ImportacionService._agregar_error(resultado, numero, fila, error)
+                continue
+
+            # Si un ISBN se repite dentro del lote gana la última fila
+            lote.pop(libro.ISBN, None)
+            lote[libro.ISBN] = (numero, libro)
+            if len(lote) >= tamano_lote:
+                ImportacionService._guardar_lote(db, lote, resultado)
+                lote = {}
+
+        if lote:
+            ImportacionService._guardar_lote(db, lote, resultado)
+
+        resultado.segundos = round(time.perf_counter() - inicio, 3)
+        if resultado.segundos > 0:
+            resultado.filas_por_segundo = round(resultado.filas / resultado.segundos, 1)
+        return resultado
+
+    @staticmethod
+    def _guardar_lote(
+        db: Session, lote: Dict[str, Tuple[int, schemas.LibroCreate]], resultado: schemas.ResultadoImportacion
+    ) -> None:
+        """
+        Guarda un lote de libros validados y confirma la transacción.
+        """
+        filas = list(lote.values())
+        try:
+            creados, actualizados = ImportacionService._upsert(db, [libro for _, libro in filas])
+            LibroService.registrar_cambio(db)
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+            creados = actualizados = 0
+            for numero, libro in filas:
+                try:
+                    nuevos, existentes = ImportacionService._upsert(db, [libro])
+                    LibroService.registrar_cambio(db)
+                    db.commit()
+                except SQLAlchemyError as e:
+                    db.rollback()
+                    ImportacionService._agregar_error(
+                        resultado, numero, {"ISBN": libro.ISBN}, f"Error de base de datos: {getattr(e, 'orig', e)}"
+                    )
+                    continue
+                creados += nuevos
+                actualizados += existentes
+
+        resultado.creados += creados
+        resultado.actualizados += actualizados
+        LibroService.invalidar_cache(todos=True)
+
+    @staticmethod
+    def _upsert(db: Session, libros: List[schemas.LibroCreate]) -> Tuple[int, int]:
+        """
+        Inserta o actualiza un grupo de libros sin confirmar la transacción.
+
+        Returns:
+            Tuple[int, int]: Libros creados y libros actualizados
+        """
+        isbns = [libro.ISBN for libro in libros]
+        existentes = {
+            isbn for (isbn,) in db.query(models.Libro.ISBN).filter(models.Libro.ISBN.in_(isbns))
+        }
+        valores = [
+            {
+                "ISBN": libro.ISBN,
+                "titulo": libro.titulo,
+                "precio_compra": libro.precio_compra,
+                "precio_venta": libro.precio_venta,
+                "cantidad_actual": libro.cantidad_actual,
+            }
+            for libro in libros
+        ]
+
+        tabla = models.Libro.__table__
+        dialecto = db.get_bind().dialect.name
+        if dialecto in ("sqlite", "postgresql"):
+            insert = sqlite_insert if dialecto == "sqlite" else postgresql_insert
+            stmt = insert(tabla)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[tabla.c.ISBN],
+                set_={
+                    "titulo": stmt.excluded.titulo,
+                    "precio_compra": stmt.excluded.precio_compra,
+                    "precio_venta": stmt.excluded.precio_venta,
+                }
+            )
+            db.execute(stmt, valores)
+        else:
+            # Sin ON CONFLICT: INSERT de los nuevos y UPDATE de los existentes, ambos como executemany
+            nuevos = [fila for fila in valores if fila["ISBN"] not in existentes]
+            if nuevos:
+                db.execute(tabla.insert(), nuevos)
+            cambios = [
+                {"b_isbn": fila["ISBN"], "b_titulo": fila["titulo"],
+                 "b_precio_compra": fila["precio_compra"], "b_precio_venta": fila["precio_venta"]}
+                for fila in valores if fila["ISBN"] in existentes
+            ]
+            if cambios:
+                db.execute(
+                    update(tabla)
+                    .where(tabla.c.ISBN == bindparam("b_isbn"))
+                    .values(
+                        titulo=bindparam("b_titulo"),
+                        precio_compra=bindparam("b_precio_compra"),
+                        precio_venta=bindparam("b_precio_venta")
+                    ),
+                    cambios
+                )
+
+        # Los títulos nuevos o modificados reemplazan a los anteriores en el índice de búsqueda
+        BusquedaService.quitar(db, existentes)
+        BusquedaService.agregar(db, {fila["ISBN"]: fila["titulo"] for fila in valores}.items())
+
+        # Los libros nuevos entran al registro de eventos con su stock inicial
+        ahora = datetime.now()
+        EventoService.registrar_varios(db, [
+            {"tipo": EventoService.LIBRO_CREADO, "fecha": ahora, "ISBN": fila["ISBN"], "cantidad": fila["cantidad_actual"]}
+            for fila in valores if fila["ISBN"] not in existentes
+        ])
+
+        return len(libros) - len(existentes), len(existentes)
+
+    @staticmethod
+    def _agregar_error(
+        resultado: schemas.ResultadoImportacion, numero: int, fila: Optional[dict], error: str
+    ) -> None:
+        resultado.errores += 1
+        if len(resultado.detalle_errores) < ImportacionService.MAX_ERRORES_DETALLE:
+            isbn = fila.get("ISBN") if isinstance(fila, dict) else None
+            resultado.detalle_errores.append(schemas.ErrorImportacion(
+                fila=numero, ISBN=str(isbn) if isbn is not None else None, error=error
+            ))
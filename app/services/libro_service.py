@@ -1,10 +1,17 @@
+from sqlalchemy import Row, func, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-from datetime import datetime
 from typing import List, Optional
 
+from app.cache import cache_libros, cache_listas_libros
+from app.lecturas import FilaLibro, columnas, leer
 from app.models import models
 from app.schemas import schemas
+from app.paginacion import decodificar_cursor
+from app.services.busqueda_service import BusquedaService
+from app.services.evento_service import EventoService
 
 class LibroService:
     """
@@ -12,10 +19,15 @@ class LibroService:
     Implementa la lógica de negocio relacionada con el inventario.
     """
     
+    # Columnas del esquema Libro, en su orden, para los listados que leen filas
+    # en lugar de entidades (ver app/lecturas.py y app/respuestas.py)
+    COLUMNAS = columnas(FilaLibro, models.Libro)
+    
     @staticmethod
     def create_libro(db: Session, libro: schemas.LibroCreate) -> models.Libro:
         """
-        Crea un nuevo libro en el inventario.
+        Crea un nuevo libro en el inventario. El ISBN llega normalizado, sin
+        guiones ni espacios (schemas.normalizar_isbn).
         
         Args:
             db (Session): Sesión de base de datos
@@ -28,11 +40,11 @@ class LibroService:
             HTTPException: Si el ISBN ya existe o si hay un error de validación
         """
         # Verificar si ya existe un libro con ese ISBN
-        db_libro = db.query(models.Libro).filter(models.Libro.isbn == libro.isbn).first()
+        db_libro = db.query(models.Libro).filter(models.Libro.ISBN == libro.ISBN).first()
         if db_libro:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Ya existe un libro con el ISBN {libro.isbn}"
+                detail=f"Ya existe un libro con el ISBN {libro.ISBN}"
             )
         
         # Validaciones de negocio
@@ -50,34 +62,73 @@ class LibroService:
         
         # Crear el libro
         db_libro = models.Libro(
-            isbn=libro.isbn,
+            ISBN=libro.ISBN,
             titulo=libro.titulo,
             precio_compra=libro.precio_compra,
             precio_venta=libro.precio_venta,
-            cantidad_actual=libro.cantidad_actual,
-            fecha_creacion=datetime.now()
+            cantidad_actual=libro.cantidad_actual
         )
         
         db.add(db_libro)
+        LibroService.registrar_cambio(db)
+        EventoService.registrar(db, EventoService.LIBRO_CREADO, ISBN=libro.ISBN, cantidad=libro.cantidad_actual)
+        BusquedaService.agregar(db, [(libro.ISBN, libro.titulo)])
         db.commit()
         db.refresh(db_libro)
+        LibroService.invalidar_cache(libro.ISBN)
         
         return db_libro
     
     @staticmethod
-    def get_libros(db: Session, skip: int = 0, limit: int = 100) -> List[models.Libro]:
+    def get_libros(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[FilaLibro]:
         """
-        Obtiene la lista de libros con paginación.
+        Obtiene la lista de libros ordenada por ISBN, con paginación.
+        
+        Si se indica un cursor, la página continúa después del ISBN que contiene
+        (paginación keyset) y se ignora skip. Los libros se leen como filas de
+        solo lectura, sin cargar entidades del ORM.
         
         Args:
             db (Session): Sesión de base de datos
             skip (int): Número de registros a omitir
             limit (int): Número máximo de registros a retornar
+            cursor (Optional[str]): Cursor de la página anterior
             
         Returns:
-            List[models.Libro]: Lista de libros
+            List[FilaLibro]: Lista de libros
         """
-        return db.query(models.Libro).offset(skip).limit(limit).all()
+        return leer(LibroService.get_filas_libros(db, skip=skip, limit=limit, cursor=cursor), FilaLibro)
+    
+    @staticmethod
+    def get_filas_libros(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Row]:
+        """
+        Obtiene una página del listado de libros como filas con las columnas del
+        esquema Libro, sin cargar entidades del ORM.
+        
+        Args:
+            db (Session): Sesión de base de datos
+            skip (int): Número de registros a omitir
+            limit (int): Número máximo de registros a retornar
+            cursor (Optional[str]): Cursor de la página anterior
+            
+        Returns:
+            List[Row]: Las filas de la página
+        """
+        return LibroService._paginar(db.query(*LibroService.COLUMNAS), skip, limit, cursor)
+    
+    @staticmethod
+    def _paginar(query, skip: int, limit: int, cursor: Optional[str]):
+        """
+        Ordena una consulta de libros por ISBN y aplica la paginación por cursor
+        (keyset) o, si no hay cursor, por OFFSET.
+        """
+        query = query.order_by(models.Libro.ISBN)
+        
+        if cursor is not None:
+            (isbn,) = decodificar_cursor(cursor, str)
+            return query.filter(models.Libro.ISBN > isbn).limit(limit).all()
+        
+        return query.offset(skip).limit(limit).all()
     
     @staticmethod
     def get_libro(db: Session, isbn: str) -> Optional[models.Libro]:
@@ -94,7 +145,7 @@ class LibroService:
         Raises:
             HTTPException: Si el libro no existe
         """
-        db_libro = db.query(models.Libro).filter(models.Libro.isbn == isbn).first()
+        db_libro = db.query(models.Libro).filter(models.Libro.ISBN == isbn).first()
         if not db_libro:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -102,10 +153,158 @@ class LibroService:
             )
         return db_libro
     
+    @staticmethod
+    def consultar_libro(db: Session, isbn: str) -> schemas.Libro:
+        """
+        Obtiene un libro por su ISBN a través de la caché del catálogo.
+        
+        Devuelve una copia de solo lectura (schemas.Libro) en lugar del objeto ORM,
+        así que no sirve para modificar el libro; para eso está get_libro.
+        
+        Args:
+            db (Session): Sesión de base de datos
+            isbn (str): ISBN del libro a buscar
+            
+        Returns:
+            schemas.Libro: Los datos del libro
+            
+        Raises:
+            HTTPException: Si el libro no existe
+        """
+        return cache_libros.obtener(
+            isbn, lambda: schemas.Libro.model_validate(LibroService.get_libro(db, isbn), from_attributes=True)
+        )
+    
+    @staticmethod
+    def consultar_libros(
+        db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+    ) -> List[schemas.Libro]:
+        """
+        Obtiene una página del listado de libros a través de la caché del catálogo.
+        
+        Args:
+            db (Session): Sesión de base de datos
+            skip (int): Número de registros a omitir
+            limit (int): Número máximo de registros a retornar
+            cursor (Optional[str]): Cursor de la página anterior
+            
+        Returns:
+            List[schemas.Libro]: Los datos de los libros de la página
+            
+        Raises:
+            HTTPException: Si el cursor no es válido
+        """
+        pagina = cache_listas_libros.obtener(
+            (skip, limit, cursor),
+            lambda: tuple(
+                schemas.Libro.model_validate(libro, from_attributes=True)
+                for libro in LibroService.get_libros(db, skip=skip, limit=limit, cursor=cursor)
+            )
+        )
+        return list(pagina)
+    
+    @staticmethod
+    def consultar_filas_libros(
+        db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+    ) -> List[Row]:
+        """
+        Como consultar_libros, pero con las filas de get_filas_libros: la página
+        se guarda en la caché del catálogo tal como se leyó de la base.
+        
+        Raises:
+            HTTPException: Si el cursor no es válido
+        """
+        pagina = cache_listas_libros.obtener(
+            ("filas", skip, limit, cursor),
+            lambda: tuple(LibroService.get_filas_libros(db, skip=skip, limit=limit, cursor=cursor))
+        )
+        return list(pagina)
+    
+    @staticmethod
+    def invalidar_cache(*isbns: str, todos: bool = False) -> None:
+        """
+        Quita de la caché del catálogo los libros indicados y las páginas del listado.
+        
+        Debe llamarse después del commit de cualquier operación que cambie un libro,
+        incluido su stock, para que la siguiente lectura vea los datos confirmados.
+        
+        Args:
+            *isbns (str): ISBN de los libros modificados
+            todos (bool): Vaciar la caché de libros completa (para cambios masivos)
+        """
+        if todos:
+            cache_libros.invalidar()
+        elif isbns:
+            cache_libros.invalidar(*isbns)
+        cache_listas_libros.invalidar()
+    
+    @staticmethod
+    def registrar_cambio(db: Session) -> None:
+        """
+        Incrementa el contador de cambios de la tabla de libros.
+        
+        Debe llamarse dentro de la misma transacción que modifica libros fuera de
+        una transacción de inventario (alta, modificación, baja); los cambios de
+        stock por ventas y abastecimientos ya se reflejan en la marca de cambios
+        a través del ID de la última transacción.
+        
+        En SQLite y PostgreSQL es un único UPSERT (INSERT ... ON CONFLICT DO UPDATE),
+        así que dos primeros cambios concurrentes no chocan al crear el contador.
+        
+        Args:
+            db (Session): Sesión de base de datos
+        """
+        dialecto = db.get_bind().dialect.name
+        if dialecto in ("sqlite", "postgresql"):
+            insert = sqlite_insert if dialecto == "sqlite" else postgresql_insert
+            tabla = models.VersionTabla.__table__
+            db.execute(
+                insert(tabla)
+                .values(tabla=models.Libro.__tablename__, version=1)
+                .on_conflict_do_update(index_elements=[tabla.c.tabla], set_={"version": tabla.c.version + 1})
+            )
+            return
+        
+        # Otros motores: actualizar el contador y crearlo si aún no existe
+        resultado = db.execute(
+            update(models.VersionTabla)
+            .where(models.VersionTabla.tabla == models.Libro.__tablename__)
+            .values(version=models.VersionTabla.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if resultado.rowcount == 0:
+            db.add(models.VersionTabla(tabla=models.Libro.__tablename__, version=1))
+            db.flush()
+    
+    @staticmethod
+    def get_marca_cambios(db: Session) -> str:
+        """
+        Obtiene una marca que cambia cada vez que cambia algún libro.
+        
+        Combina el contador de cambios del catálogo con el ID de la última
+        transacción (que mueve el stock), en una sola consulta por índices.
+        
+        Args:
+            db (Session): Sesión de base de datos
+            
+        Returns:
+            str: Marca de cambios del catálogo
+        """
+        version, ultima_transaccion = db.execute(
+            select(
+                select(models.VersionTabla.version)
+                .where(models.VersionTabla.tabla == models.Libro.__tablename__)
+                .scalar_subquery(),
+                select(func.max(models.Transaccion.id_transaccion)).scalar_subquery()
+            )
+        ).one()
+        return f"{version or 0}.{ultima_transaccion or 0}"
+    
     @staticmethod
     def update_libro(db: Session, isbn: str, libro: schemas.LibroUpdate) -> models.Libro:
         """
-        Actualiza los datos de un libro.
+        Actualiza el título y los precios de un libro. El stock no se modifica:
+        solo cambia con transacciones de venta y abastecimiento.
         
         Args:
             db (Session): Sesión de base de datos
@@ -127,21 +326,18 @@ class LibroService:
                 detail="El precio de venta no puede ser menor al precio de compra"
             )
         
-        if libro.cantidad_actual < 0:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="La cantidad no puede ser negativa"
-            )
-        
         # Actualizar datos
+        if db_libro.titulo != libro.titulo:
+            BusquedaService.quitar(db, [isbn])
+            BusquedaService.agregar(db, [(isbn, libro.titulo)])
         db_libro.titulo = libro.titulo
         db_libro.precio_compra = libro.precio_compra
         db_libro.precio_venta = libro.precio_venta
-        db_libro.cantidad_actual = libro.cantidad_actual
-        db_libro.fecha_actualizacion = datetime.now()
+        LibroService.registrar_cambio(db)
         
         db.commit()
         db.refresh(db_libro)
+        LibroService.invalidar_cache(isbn)
         
         return db_libro
     
@@ -163,7 +359,7 @@ class LibroService:
         db_libro = LibroService.get_libro(db, isbn)
         
         # Verificar si el libro tiene transacciones asociadas
-        transacciones = db.query(models.Transaccion).filter(models.Transaccion.isbn == isbn).first()
+        transacciones = db.query(models.Transaccion).filter(models.Transaccion.ISBN == isbn).first()
         if transacciones:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -171,6 +367,10 @@ class LibroService:
             )
         
         db.delete(db_libro)
+        LibroService.registrar_cambio(db)
+        EventoService.registrar(db, EventoService.LIBRO_ELIMINADO, ISBN=isbn)
+        BusquedaService.quitar(db, [isbn])
         db.commit()
+        LibroService.invalidar_cache(isbn)
         
         return {"message": f"Libro con ISBN {isbn} eliminado correctamente"} 
\ No newline at end of file
@@ -0,0 +1,455 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+
+from app.models import models
+from app.schemas import schemas
+from app.services.evento_service import EventoService
+
+class ProyeccionStock:
+    """Stock de cada libro según los eventos."""
+
+    nombre = "stock"
+
+    @staticmethod
+    def reiniciar(db: Session) -> None:
+        db.query(models.ProyeccionStock).delete(synchronize_session=False)
+
+    @staticmethod
+    def aplicar(db: Session, eventos: List[models.Evento]) -> None:
+        isbns = {evento.ISBN for evento in eventos if evento.ISBN}
+        filas = {
+            fila.ISBN: fila
+            for fila in db.query(models.ProyeccionStock).filter(models.ProyeccionStock.ISBN.in_(isbns))
+        }
+        for evento in eventos:
+            if not evento.ISBN:
+                continue
+            if evento.tipo == EventoService.LIBRO_ELIMINADO:
+                fila = filas.pop(evento.ISBN, None)
+                if fila in db.new:
+                    # Creada en este mismo lote: basta con no insertarla
+                    db.expunge(fila)
+                elif fila is not None:
+                    db.delete(fila)
+                continue
+            fila = filas.get(evento.ISBN)
+            if fila is None:
+                fila = filas[evento.ISBN] = models.ProyeccionStock(ISBN=evento.ISBN, cantidad=0)
+                db.add(fila)
+            if evento.tipo in (EventoService.LIBRO_CREADO, EventoService.LIBRO_AJUSTADO):
+                fila.cantidad = evento.cantidad
+            elif evento.tipo == EventoService.VENTA:
+                fila.cantidad -= evento.cantidad
+            elif evento.tipo == EventoService.ABASTECIMIENTO:
+                fila.cantidad += evento.cantidad
+
+    @staticmethod
+    def consultar(db: Session, skip: int, limit: int) -> List[Dict[str, Any]]:
+        return [
+            {"ISBN": isbn, "cantidad": cantidad}
+            for isbn, cantidad in db.query(models.ProyeccionStock.ISBN, models.ProyeccionStock.cantidad)
+            .order_by(models.ProyeccionStock.ISBN).offset(skip).limit(limit)
+        ]
+
+
+class ProyeccionSaldo:
+    """Saldo de caja y totales de ingresos y egresos según los eventos."""
+
+    nombre = "saldo"
+
+    # Signo de cada tipo de evento sobre el saldo
+    SIGNOS = {
+        EventoService.VENTA: 1,
+        EventoService.INGRESO_CAJA: 1,
+        EventoService.ABASTECIMIENTO: -1,
+        EventoService.EGRESO_CAJA: -1,
+    }
+
+    @staticmethod
+    def reiniciar(db: Session) -> None:
+        db.query(models.ProyeccionSaldo).delete(synchronize_session=False)
+
+    @staticmethod
+    def aplicar(db: Session, eventos: List[models.Evento]) -> None:
+        fila = db.get(models.ProyeccionSaldo, 1)
+        if fila is None:
+            fila = models.ProyeccionSaldo(
+                id_saldo=1, saldo=0.0, total_ingresos=0.0, total_egresos=0.0, num_movimientos=0
+            )
+            db.add(fila)
+        for evento in eventos:
+            signo = ProyeccionSaldo.SIGNOS.get(evento.tipo)
+            if signo is None or evento.monto is None:
+                continue
+            fila.saldo += signo * evento.monto
+            if signo > 0:
+                fila.total_ingresos += evento.monto
+            else:
+                fila.total_egresos += evento.monto
+            fila.num_movimientos += 1
+
+    @staticmethod
+    def consultar(db: Session, skip: int, limit: int) -> List[Dict[str, Any]]:
+        fila = db.get(models.ProyeccionSaldo, 1)
+        if fila is None:
+            return [{"saldo": 0.0, "total_ingresos": 0.0, "total_egresos": 0.0, "num_movimientos": 0}]
+        return [{
+            "saldo": fila.saldo,
+            "total_ingresos": fila.total_ingresos,
+            "total_egresos": fila.total_egresos,
+            "num_movimientos": fila.num_movimientos,
+        }]
+
+
+class ProyeccionVentas:
+    """Ventas acumuladas de cada libro según los eventos."""
+
+    nombre = "ventas"
+
+    @staticmethod
+    def reiniciar(db: Session) -> None:
+        db.query(models.ProyeccionVentas).delete(synchronize_session=False)
+
+    @staticmethod
+    def aplicar(db: Session, eventos: List[models.Evento]) -> None:
+        ventas = [evento for evento in eventos if evento.tipo == EventoService.VENTA]
+        filas = {
+            fila.ISBN: fila
+            for fila in db.query(models.ProyeccionVentas).filter(
+                models.ProyeccionVentas.ISBN.in_({evento.ISBN for evento in ventas})
+            )
+        }
+        for evento in ventas:
+            fila = filas.get(evento.ISBN)
+            if fila is None:
+                fila = filas[evento.ISBN] = models.ProyeccionVentas(
+                    ISBN=evento.ISBN, num_ventas=0, unidades_vendidas=0, ingresos=0.0
+                )
+                db.add(fila)
+            fila.num_ventas += 1
+            fila.unidades_vendidas += evento.cantidad
+            fila.ingresos += evento.monto or 0.0
+            if fila.ultima_venta is None or evento.fecha > fila.ultima_venta:
+                fila.ultima_venta = evento.fecha
+
+    @staticmethod
+    def consultar(db: Session, skip: int, limit: int) -> List[Dict[str, Any]]:
+        return [
+            {
+                "ISBN": fila.ISBN,
+                "num_ventas": fila.num_ventas,
+                "unidades_vendidas": fila.unidades_vendidas,
+                "ingresos": fila.ingresos,
+                "ultima_venta": fila.ultima_venta,
+            }
+            for fila in db.query(models.ProyeccionVentas)
+            .order_by(models.ProyeccionVentas.ISBN).offset(skip).limit(limit)
+        ]
+
+
+class ProyeccionVentasDiarias:
+    """Ventas de cada libro por día según los eventos."""
+
+    nombre = "ventas_diarias"
+
+    @staticmethod
+    def reiniciar(db: Session) -> None:
+        db.query(models.ProyeccionVentasDiarias).delete(synchronize_session=False)
+
+    @staticmethod
+    def aplicar(db: Session, eventos: List[models.Evento]) -> None:
+        ventas = [evento for evento in eventos if evento.tipo == EventoService.VENTA]
+        if not ventas:
+            return
+        filas = {
+            (fila.ISBN, fila.fecha): fila
+            for fila in db.query(models.ProyeccionVentasDiarias).filter(
+                models.ProyeccionVentasDiarias.ISBN.in_({evento.ISBN for evento in ventas}),
+                models.ProyeccionVentasDiarias.fecha.in_({evento.fecha.date() for evento in ventas})
+            )
+        }
+        for evento in ventas:
+            clave = (evento.ISBN, evento.fecha.date())
+            fila = filas.get(clave)
+            if fila is None:
+                fila = filas[clave] = models.ProyeccionVentasDiarias(
+                    ISBN=evento.ISBN, fecha=clave[1], num_ventas=0, unidades=0, ingresos=0.0
+                )
+                db.add(fila)
+            fila.num_ventas += 1
+            fila.unidades += evento.cantidad
+            fila.ingresos += evento.monto or 0.0
+
+    @staticmethod
+    def consultar(db: Session, skip: int, limit: int) -> List[Dict[str, Any]]:
+        return [
+            {
+                "ISBN": fila.ISBN,
+                "fecha": fila.fecha,
+                "num_ventas": fila.num_ventas,
+                "unidades": fila.unidades,
+                "ingresos": fila.ingresos,
+            }
+            for fila in db.query(models.ProyeccionVentasDiarias).order_by(
+                models.ProyeccionVentasDiarias.fecha.desc(), models.ProyeccionVentasDiarias.ISBN
+            ).offset(skip).limit(limit)
+        ]
+
+
+class ProyeccionService:
+    """
+    Servicio que mantiene las proyecciones (modelos de lectura) derivadas del
+    registro de eventos.
+
+    Cada proyección guarda en proyecciones_checkpoints el último evento que
+    aplicó y se pone al día leyendo solo los eventos posteriores, en lotes con un
+    commit cada uno (el checkpoint avanza en la misma transacción que los datos).
+    Las escrituras de ventas y caja solo agregan el evento; las proyecciones se
+    actualizan al consultarlas o con `python -m app.cli proyecciones`.
+
+    Para agregar un modelo de lectura basta una clase con `nombre`, `reiniciar`,
+    `aplicar` y `consultar` registrada en PROYECCIONES: en su primera consulta
+    parte del checkpoint 0 y procesa todo el historial.
+    """
+
+    PROYECCIONES = {
+        proyeccion.nombre: proyeccion
+        for proyeccion in (ProyeccionStock, ProyeccionSaldo, ProyeccionVentas, ProyeccionVentasDiarias)
+    }
+
+    # Segundos tras los cuales un hueco en la numeración de eventos se da por
+    # definitivo (en PostgreSQL, un ID de secuencia de una transacción revertida);
+    # antes de eso el hueco puede ser un evento aún sin confirmar y la proyección
+    # se detiene ahí para no saltárselo
+    ESPERA_HUECOS = 5.0
+
+    @staticmethod
+    def get_proyeccion(nombre: str):
+        """
+        Obtiene la definición de una proyección por su nombre.
+
+        Raises:
+            HTTPException: Si la proyección no existe
+        """
+        proyeccion = ProyeccionService.PROYECCIONES.get(nombre)
+        if proyeccion is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No existe la proyección {nombre}. Use una de: {', '.join(ProyeccionService.PROYECCIONES)}"
+            )
+        return proyeccion
+
+    @staticmethod
+    def actualizar(db: Session, nombre: Optional[str] = None, tamano_lote: int = 1000) -> Dict[str, int]:
+        """
+        Aplica a una proyección (o a todas) los eventos posteriores a su checkpoint.
+
+        Args:
+            db (Session): Sesión de base de datos
+            nombre (Optional[str]): Proyección a actualizar; todas si no se indica
+            tamano_lote (int): Eventos aplicados por cada commit
+
+        Returns:
+            Dict[str, int]: Eventos aplicados por cada proyección
+
+        Raises:
+            HTTPException: Si la proyección no existe
+        """
+        nombres = [nombre] if nombre else list(ProyeccionService.PROYECCIONES)
+        aplicados = {}
+        for actual in nombres:
+            proyeccion = ProyeccionService.get_proyeccion(actual)
+            aplicados[actual] = 0
+            while True:
+                cantidad = ProyeccionService._aplicar_lote(db, proyeccion, tamano_lote)
+                aplicados[actual] += cantidad
+                if cantidad < tamano_lote:
+                    break
+        return aplicados
+
+    @staticmethod
+    def reconstruir(db: Session, nombre: str, tamano_lote: int = 1000) -> int:
+        """
+        Vacía una proyección y la reconstruye desde el primer evento.
+
+        Args:
+            db (Session): Sesión de base de datos
+            nombre (str): Proyección a reconstruir
+            tamano_lote (int): Eventos aplicados por cada commit
+
+        Returns:
+            int: Eventos aplicados
+
+        Raises:
+            HTTPException: Si la proyección no existe
+        """
+        proyeccion = ProyeccionService.get_proyeccion(nombre)
+        ProyeccionService._checkpoint(db, nombre)
+        db.execute(
+            update(models.CheckpointProyeccion)
+            .where(models.CheckpointProyeccion.nombre == nombre)
+            .values(ultimo_evento=0, fecha_actualizacion=datetime.now())
+        )
+        proyeccion.reiniciar(db)
+        db.commit()
+        return ProyeccionService.actualizar(db, nombre, tamano_lote)[nombre]
+
+    @staticmethod
+    def consultar(db: Session, nombre: str, skip: int = 0, limit: int = 100) -> schemas.ResultadoProyeccion:
+        """
+        Pone al día una proyección y devuelve sus filas.
+
+        Args:
+            db (Session): Sesión de base de datos
+            nombre (str): Proyección a consultar
+            skip (int): Número de filas a saltar
+            limit (int): Número máximo de filas a retornar
+
+        Returns:
+            schemas.ResultadoProyeccion: Las filas y el último evento aplicado
+
+        Raises:
+            HTTPException: Si la proyección no existe
+        """
+        proyeccion = ProyeccionService.get_proyeccion(nombre)
+        ProyeccionService.actualizar(db, nombre)
+        return schemas.ResultadoProyeccion(
+            nombre=nombre,
+            ultimo_evento=ProyeccionService.get_marca_cambios(db, nombre),
+            filas=proyeccion.consultar(db, skip, limit)
+        )
+
+    @staticmethod
+    def get_marca_cambios(db: Session, nombre: str) -> int:
+        """
+        Marca de cambios de una proyección para el ETag: el último evento aplicado.
+
+        Args:
+            db (Session): Sesión de base de datos
+            nombre (str): Proyección
+
+        Returns:
+            int: ID del último evento aplicado
+        """
+        return db.query(models.CheckpointProyeccion.ultimo_evento).filter(
+            models.CheckpointProyeccion.nombre == nombre
+        ).scalar() or 0
+
+    @staticmethod
+    def estado(db: Session) -> List[schemas.EstadoProyeccion]:
+        """
+        Obtiene el checkpoint de cada proyección y cuántos eventos le faltan aplicar.
+
+        Args:
+            db (Session): Sesión de base de datos
+
+        Returns:
+            List[schemas.EstadoProyeccion]: Estado de cada proyección
+        """
+        ultimo = EventoService.get_marca_cambios(db)
+        checkpoints = {
+            checkpoint.nombre: checkpoint for checkpoint in db.query(models.CheckpointProyeccion)
+        }
+        resultado = []
+        for nombre in ProyeccionService.PROYECCIONES:
+            checkpoint = checkpoints.get(nombre)
+            aplicado = checkpoint.ultimo_evento if checkpoint else 0
+            resultado.append(schemas.EstadoProyeccion(
+                nombre=nombre,
+                ultimo_evento=aplicado,
+                pendientes=db.query(func.count(models.Evento.id_evento)).filter(
+                    models.Evento.id_evento > aplicado
+                ).scalar() if aplicado < ultimo else 0,
+                fecha_actualizacion=checkpoint.fecha_actualizacion if checkpoint else None
+            ))
+        return resultado
+
+    @staticmethod
+    def verificar(db: Session) -> List[str]:
+        """
+        Pone al día las proyecciones de stock y saldo y las compara con el estado
+        de las tablas libros y saldo_caja.
+
+        Args:
+            db (Session): Sesión de base de datos
+
+        Returns:
+            List[str]: Diferencias encontradas (vacía si coinciden)
+        """
+        ProyeccionService.actualizar(db, ProyeccionStock.nombre)
+        ProyeccionService.actualizar(db, ProyeccionSaldo.nombre)
+        diferencias = []
+
+        proyectado = dict(db.query(models.ProyeccionStock.ISBN, models.ProyeccionStock.cantidad))
+        for isbn, cantidad in db.query(models.Libro.ISBN, models.Libro.cantidad_actual):
+            esperado = proyectado.pop(isbn, None)
+            if esperado != cantidad:
+                diferencias.append(f"stock de {isbn}: libros={cantidad}, proyección={esperado}")
+        for isbn, cantidad in proyectado.items():
+            diferencias.append(f"stock de {isbn}: no está en libros, proyección={cantidad}")
+
+        saldo = db.get(models.SaldoCaja, 1)
+        saldo_real = saldo.saldo_actual if saldo else 0.0
+        saldo_proyectado = ProyeccionSaldo.consultar(db, 0, 1)[0]["saldo"]
+        if abs(saldo_real - saldo_proyectado) > 1e-6:
+            diferencias.append(f"saldo de caja: saldo_caja={saldo_real}, proyección={saldo_proyectado}")
+        return diferencias
+
+    @staticmethod
+    def _checkpoint(db: Session, nombre: str) -> models.CheckpointProyeccion:
+        """Obtiene el checkpoint de una proyección, creándolo en 0 si no existe."""
+        checkpoint = db.get(models.CheckpointProyeccion, nombre)
+        if checkpoint is None:
+            checkpoint = models.CheckpointProyeccion(nombre=nombre, ultimo_evento=0)
+            db.add(checkpoint)
+            db.commit()
+        return checkpoint
+
+    @staticmethod
+    def _aplicar_lote(db: Session, proyeccion, tamano_lote: int) -> int:
+        """
+        Aplica el siguiente lote de eventos a una proyección y confirma.
+
+        El checkpoint se avanza con un UPDATE condicionado al valor leído: si otro
+        worker aplicó el mismo tramo en paralelo, el UPDATE no encuentra la fila y el
+        lote se descarta en lugar de aplicarse dos veces.
+        """
+        anterior = ProyeccionService._checkpoint(db, proyeccion.nombre).ultimo_evento
+        eventos = EventoService.get_eventos(db, desde_id=anterior, limit=tamano_lote)
+        eventos = ProyeccionService._hasta_hueco(eventos, anterior)
+        if not eventos:
+            db.rollback()
+            return 0
+
+        reclamado = db.execute(
+            update(models.CheckpointProyeccion)
+            .where(
+                models.CheckpointProyeccion.nombre == proyeccion.nombre,
+                models.CheckpointProyeccion.ultimo_evento == anterior
+            )
+            .values(ultimo_evento=eventos[-1].id_evento, fecha_actualizacion=datetime.now())
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+        if not reclamado:
+            db.rollback()
+            return 0
+
+        proyeccion.aplicar(db, eventos)
+        db.commit()
+        db.expire_all()
+        return len(eventos)
+
+    @staticmethod
+    def _hasta_hueco(eventos: List[models.Evento], anterior: int) -> List[models.Evento]:
+        """Recorta los eventos antes del primer hueco reciente en la numeración."""
+        limite = datetime.now() - timedelta(seconds=ProyeccionService.ESPERA_HUECOS)
+        esperado = anterior + 1
+        for posicion, evento in enumerate(eventos):
+            if evento.id_evento != esperado and evento.fecha > limite:
+                return eventos[:posicion]
+            esperado = evento.id_evento + 1
+        return eventos
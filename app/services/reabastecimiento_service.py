@@ -0,0 +1,287 @@
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.migraciones import reclamar_inicializacion
+from app.models import models
+from app.schemas import schemas
+from app.services.caja_service import CajaService
+
+class ReabastecimientoService:
+    """
+    Servicio de sugerencias de reabastecimiento.
+    Mantiene en velocidad_ventas la velocidad de ventas de cada libro como un
+    promedio móvil exponencial de unidades por día, actualizado en la misma
+    transacción que cada venta, y una marca de stock bajo (stock en o bajo el punto
+    de reorden) indexada. Las sugerencias solo leen los libros marcados: no
+    recorren el catálogo ni el historial de transacciones.
+
+    La velocidad se actualiza después del UPDATE de stock de la venta, que bloquea
+    la fila del libro hasta el commit, así que dos ventas del mismo libro no la
+    leen y escriben a la vez.
+    """
+
+    # Constante de tiempo del promedio móvil, en días: una venta pesa la mitad
+    # después de unos 21 días
+    VENTANA_DIAS = 30.0
+
+    # Días que tarda en llegar un pedido: el punto de reorden es la venta esperada
+    # en ese plazo
+    DIAS_ENTREGA = 7
+
+    # Días de venta que debe cubrir el stock después de reabastecer
+    DIAS_COBERTURA = 30
+
+    # Días de historial usados para calcular las velocidades la primera vez
+    DIAS_INICIALIZACION = 90
+
+    # Sentencias de Core sobre velocidad_ventas, construidas una sola vez. Se usan
+    # en lugar de entidades del ORM porque corren en cada venta: una fila insertada
+    # así es visible enseguida para la siguiente línea del mismo lote, sin flush
+    _VELOCIDAD = models.VelocidadVentas.__table__
+    _LEER_VELOCIDAD = select(_VELOCIDAD.c.velocidad, _VELOCIDAD.c.fecha_velocidad).where(
+        _VELOCIDAD.c.ISBN == bindparam("isbn_libro")
+    )
+    _INSERTAR_VELOCIDAD = insert(_VELOCIDAD)
+    _ACTUALIZAR_VELOCIDAD = (
+        update(_VELOCIDAD)
+        .where(_VELOCIDAD.c.ISBN == bindparam("isbn_libro"))
+        .values(
+            velocidad=bindparam("nueva_velocidad"),
+            fecha_velocidad=bindparam("nueva_fecha"),
+            bajo_stock=bindparam("nuevo_bajo_stock")
+        )
+    )
+    _LEER_STOCK = select(models.Libro.__table__.c.cantidad_actual).where(
+        models.Libro.__table__.c.ISBN == bindparam("isbn_libro")
+    )
+
+    @staticmethod
+    def velocidad_a(velocidad: float, fecha_velocidad: datetime, fecha: datetime) -> float:
+        """Velocidad de ventas (unidades por día) llevada a otra fecha sin nuevas ventas."""
+        dias = max((fecha - fecha_velocidad).total_seconds() / 86400, 0.0)
+        return velocidad * math.exp(-dias / ReabastecimientoService.VENTANA_DIAS)
+
+    @staticmethod
+    def punto_reorden(velocidad: float) -> int:
+        """Stock en o bajo el cual conviene reabastecer: la venta esperada durante la entrega."""
+        return math.ceil(velocidad * ReabastecimientoService.DIAS_ENTREGA)
+
+    @staticmethod
+    def registrar_venta(db: Session, isbn: str, cantidad: int, fecha: datetime, stock: Optional[int] = None) -> None:
+        """
+        Suma una venta a la velocidad del libro y actualiza su marca de stock bajo,
+        sin hacer commit: se confirma junto con la venta.
+
+        Args:
+            db (Session): Sesión de base de datos
+            isbn (str): ISBN del libro vendido
+            cantidad (int): Unidades vendidas
+            fecha (datetime): Fecha de la venta
+            stock (Optional[int]): Stock del libro después de la venta, si el llamador
+                ya lo conoce (si no, se lee de la base)
+        """
+        fila = db.execute(ReabastecimientoService._LEER_VELOCIDAD, {"isbn_libro": isbn}).first()
+        velocidad = cantidad / ReabastecimientoService.VENTANA_DIAS
+        if fila is not None:
+            velocidad += ReabastecimientoService.velocidad_a(fila.velocidad, fila.fecha_velocidad, fecha)
+        if stock is None:
+            stock = ReabastecimientoService._stock(db, isbn)
+        bajo_stock = stock <= ReabastecimientoService.punto_reorden(velocidad)
+
+        if fila is None:
+            db.execute(ReabastecimientoService._INSERTAR_VELOCIDAD, {
+                "ISBN": isbn, "velocidad": velocidad, "fecha_velocidad": fecha, "bajo_stock": bajo_stock
+            })
+        else:
+            db.execute(ReabastecimientoService._ACTUALIZAR_VELOCIDAD, {
+                "isbn_libro": isbn, "nueva_velocidad": velocidad, "nueva_fecha": fecha, "nuevo_bajo_stock": bajo_stock
+            })
+
+    @staticmethod
+    def registrar_stock(
+        db: Session, isbn: str, fecha: Optional[datetime] = None, stock: Optional[int] = None
+    ) -> None:
+        """
+        Actualiza la marca de stock bajo de un libro después de un abastecimiento,
+        sin hacer commit.
+
+        Args:
+            db (Session): Sesión de base de datos
+            isbn (str): ISBN del libro
+            fecha (Optional[datetime]): Fecha del cambio (por defecto, ahora)
+            stock (Optional[int]): Stock del libro después del cambio, si el llamador
+                ya lo conoce (si no, se lee de la base)
+        """
+        fila = db.execute(ReabastecimientoService._LEER_VELOCIDAD, {"isbn_libro": isbn}).first()
+        if fila is None:
+            # Sin ventas registradas no hay punto de reorden
+            return
+        fecha = fecha or datetime.now()
+        velocidad = ReabastecimientoService.velocidad_a(fila.velocidad, fila.fecha_velocidad, fecha)
+        if stock is None:
+            stock = ReabastecimientoService._stock(db, isbn)
+        db.execute(ReabastecimientoService._ACTUALIZAR_VELOCIDAD, {
+            "isbn_libro": isbn,
+            "nueva_velocidad": velocidad,
+            "nueva_fecha": fecha,
+            "nuevo_bajo_stock": stock <= ReabastecimientoService.punto_reorden(velocidad)
+        })
+
+    @staticmethod
+    def registrar_transacciones(db: Session, transacciones: Iterable[Tuple[str, int, int]], fecha: datetime) -> None:
+        """
+        Registra las ventas y abastecimientos de un lote, sin hacer commit.
+
+        Args:
+            db (Session): Sesión de base de datos
+            transacciones (Iterable[Tuple[str, int, int]]): ISBN, tipo de transacción y cantidad de cada línea
+            fecha (datetime): Fecha del lote
+        """
+        for isbn, tipo_transaccion, cantidad in transacciones:
+            if tipo_transaccion == 1:
+                ReabastecimientoService.registrar_venta(db, isbn, cantidad, fecha)
+            else:
+                ReabastecimientoService.registrar_stock(db, isbn, fecha)
+
+    @staticmethod
+    def inicializar(db: Session) -> int:
+        """
+        Calcula las velocidades de ventas desde las ventas de los últimos
+        DIAS_INICIALIZACION días si la tabla está vacía (base con historial previo)
+        y ningún otro worker hizo o está haciendo el cálculo (reclamar_inicializacion).
+        Hace commit.
+
+        Args:
+            db (Session): Sesión de base de datos
+
+        Returns:
+            int: Libros con velocidad calculada
+        """
+        if not reclamar_inicializacion(db, "velocidad_ventas"):
+            return 0
+        if db.query(models.VelocidadVentas.ISBN).first() is not None:
+            db.commit()
+            return 0
+
+        desde = datetime.now() - timedelta(days=ReabastecimientoService.DIAS_INICIALIZACION)
+        velocidades: Dict[str, Tuple[float, datetime]] = {}
+        ventas = db.query(
+            models.Transaccion.ISBN, models.Transaccion.cantidad, models.Transaccion.fecha_transaccion
+        ).filter(
+            models.Transaccion.tipo_transaccion == 1,
+            models.Transaccion.fecha_transaccion >= desde
+        ).order_by(models.Transaccion.fecha_transaccion).yield_per(1000)
+        for isbn, cantidad, fecha in ventas:
+            velocidad, anterior = velocidades.get(isbn, (0.0, fecha))
+            velocidades[isbn] = (
+                ReabastecimientoService.velocidad_a(velocidad, anterior, fecha)
+                + cantidad / ReabastecimientoService.VENTANA_DIAS,
+                fecha
+            )
+        if not velocidades:
+            db.commit()
+            return 0
+
+        stock = {}
+        isbns = list(velocidades)
+        for inicio in range(0, len(isbns), 500):
+            stock.update(db.query(models.Libro.ISBN, models.Libro.cantidad_actual).filter(
+                models.Libro.ISBN.in_(isbns[inicio:inicio + 500])
+            ))
+        for isbn, (velocidad, fecha) in velocidades.items():
+            if isbn not in stock:
+                continue
+            db.add(models.VelocidadVentas(
+                ISBN=isbn,
+                velocidad=velocidad,
+                fecha_velocidad=fecha,
+                bajo_stock=stock[isbn] <= ReabastecimientoService.punto_reorden(velocidad)
+            ))
+        db.commit()
+        return len(stock)
+
+    @staticmethod
+    def get_sugerencias(db: Session, limit: int = 50) -> schemas.SugerenciasReabastecimiento:
+        """
+        Sugiere cuánto reabastecer de cada libro con stock bajo, dentro del saldo de caja.
+
+        Cada libro necesita las unidades que faltan para cubrir DIAS_ENTREGA +
+        DIAS_COBERTURA días de venta a su velocidad actual. El saldo de caja se
+        reparte por urgencia (menos días de stock primero): si no alcanza, la
+        cantidad sugerida es menor que la necesaria.
+
+        Args:
+            db (Session): Sesión de base de datos
+            limit (int): Número máximo de libros
+
+        Returns:
+            schemas.SugerenciasReabastecimiento: Saldo disponible, costo total y libros a reabastecer
+        """
+        ahora = datetime.now()
+        filas = db.query(
+            models.VelocidadVentas.ISBN,
+            models.VelocidadVentas.velocidad,
+            models.VelocidadVentas.fecha_velocidad,
+            models.Libro.titulo,
+            models.Libro.cantidad_actual,
+            models.Libro.precio_compra
+        ).join(
+            models.Libro, models.Libro.ISBN == models.VelocidadVentas.ISBN
+        ).filter(models.VelocidadVentas.bajo_stock.is_(True)).all()
+
+        candidatos = []
+        recuperados = []
+        for isbn, velocidad, fecha_velocidad, titulo, cantidad_actual, precio_compra in filas:
+            velocidad = ReabastecimientoService.velocidad_a(velocidad, fecha_velocidad, ahora)
+            punto = ReabastecimientoService.punto_reorden(velocidad)
+            if cantidad_actual > punto:
+                # La velocidad bajó desde la última venta y el stock ya alcanza
+                recuperados.append(isbn)
+                continue
+            objetivo = math.ceil(
+                velocidad * (ReabastecimientoService.DIAS_ENTREGA + ReabastecimientoService.DIAS_COBERTURA)
+            )
+            candidatos.append((cantidad_actual / velocidad, isbn, titulo, cantidad_actual, precio_compra,
+                               velocidad, punto, max(objetivo - cantidad_actual, 0)))
+
+        if recuperados:
+            db.execute(
+                update(models.VelocidadVentas)
+                .where(models.VelocidadVentas.ISBN.in_(recuperados))
+                .values(bajo_stock=False)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+
+        saldo = CajaService.get_saldo_actual(db)["saldo"]
+        restante = saldo
+        sugerencias = []
+        for dias, isbn, titulo, cantidad_actual, precio_compra, velocidad, punto, necesaria in sorted(candidatos)[:limit]:
+            sugerida = min(necesaria, int(restante // precio_compra)) if precio_compra > 0 else necesaria
+            restante -= sugerida * precio_compra
+            sugerencias.append(schemas.SugerenciaReabastecimiento(
+                ISBN=isbn,
+                titulo=titulo,
+                cantidad_actual=cantidad_actual,
+                venta_diaria=round(velocidad, 4),
+                dias_de_stock=round(dias, 2),
+                punto_reorden=punto,
+                cantidad_necesaria=necesaria,
+                cantidad_sugerida=sugerida,
+                costo=sugerida * precio_compra
+            ))
+
+        return schemas.SugerenciasReabastecimiento(
+            saldo_disponible=saldo,
+            costo_total=saldo - restante,
+            libros=sugerencias
+        )
+
+    @staticmethod
+    def _stock(db: Session, isbn: str) -> int:
+        """Stock actual de un libro, leído de la base (no de la caché del catálogo)."""
+        return db.execute(ReabastecimientoService._LEER_STOCK, {"isbn_libro": isbn}).scalar() or 0
@@ -0,0 +1,321 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+
+from app.database import SessionLocal
+from app.models import models
+from app.schemas import schemas
+from app.services.caja_service import CajaService
+from app.services.libro_service import LibroService
+from app.services.transaccion_service import TransaccionService
+
+class ReporteService:
+    """
+    Servicio para los reportes pesados que recorren el historial completo.
+    Un pedido se guarda en la tabla reportes y se calcula en un proceso aparte
+    (app/ejecutor_reportes.py), nunca en el hilo de la petición. El resultado
+    queda guardado con la marca de datos del momento del pedido: mientras no
+    cambien los libros, las transacciones ni la caja, un pedido con el mismo tipo
+    y parámetros recibe el reporte ya calculado (o el que está en curso).
+    """
+
+    # Estados de un reporte
+    PENDIENTE = "PENDIENTE"
+    EN_PROCESO = "EN_PROCESO"
+    COMPLETADO = "COMPLETADO"
+    ERROR = "ERROR"
+
+    # Reportes disponibles y su descripción
+    REPORTES = {
+        "totales": "Totales de transacciones por tipo, de caja por tipo de movimiento y valor del inventario",
+        "ventas-por-libro": "Libros más vendidos con unidades, número de ventas e ingresos",
+        "reconciliacion-caja": "Saldo de caja reconstruido desde los movimientos, comparado con la cabecera",
+    }
+
+    # Segundos tras los cuales un reporte pendiente o en proceso se da por
+    # abandonado (por ejemplo, si el worker que lo ejecutaba se reinició) y un
+    # pedido igual vuelve a calcularlo
+    TIEMPO_MAXIMO = 600
+
+    @staticmethod
+    def get_calculo(tipo: str) -> Callable[[Session, schemas.ParametrosReporte], Any]:
+        """
+        Obtiene la función que calcula un tipo de reporte.
+
+        Raises:
+            HTTPException: Si el tipo de reporte no existe
+        """
+        if tipo not in ReporteService.REPORTES:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No existe el reporte {tipo}. Use uno de: {', '.join(ReporteService.REPORTES)}"
+            )
+        return getattr(ReporteService, "_reporte_" + tipo.replace("-", "_"))
+
+    @staticmethod
+    def get_marca_datos(db: Session) -> str:
+        """
+        Marca de los datos que leen los reportes: cambia con cualquier cambio del
+        catálogo, de las transacciones o de la caja.
+
+        Args:
+            db (Session): Sesión de base de datos
+
+        Returns:
+            str: Marca de datos
+        """
+        return f"{LibroService.get_marca_cambios(db)}|{CajaService.get_marca_cambios(db)}"
+
+    @staticmethod
+    def crear_reporte(
+        db: Session, tipo: str, parametros: schemas.ParametrosReporte
+    ) -> Tuple[models.Reporte, bool]:
+        """
+        Registra el pedido de un reporte, o devuelve uno equivalente ya calculado
+        o en curso con la misma marca de datos.
+
+        Args:
+            db (Session): Sesión de base de datos
+            tipo (str): Tipo de reporte
+            parametros (schemas.ParametrosReporte): Parámetros del reporte
+
+        Returns:
+            Tuple[models.Reporte, bool]: El reporte y si es nuevo (hay que ejecutarlo)
+
+        Raises:
+            HTTPException: Si el tipo no existe o las fechas están invertidas
+        """
+        ReporteService.get_calculo(tipo)
+        if parametros.fecha_desde and parametros.fecha_hasta and parametros.fecha_desde > parametros.fecha_hasta:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="fecha_desde no puede ser posterior a fecha_hasta"
+            )
+
+        parametros_json = json.dumps(parametros.dict(), default=str, sort_keys=True)
+        marca = ReporteService.get_marca_datos(db)
+        clave = hashlib.sha256("|".join((tipo, parametros_json, marca)).encode()).hexdigest()
+
+        existente = db.query(models.Reporte).filter(
+            models.Reporte.clave == clave
+        ).order_by(models.Reporte.id_reporte.desc()).first()
+        if existente is not None and existente.estado != ReporteService.ERROR and not ReporteService._abandonado(existente):
+            return existente, False
+
+        reporte = models.Reporte(
+            tipo=tipo,
+            parametros=parametros_json,
+            marca=marca,
+            clave=clave,
+            estado=ReporteService.PENDIENTE,
+            fecha_creacion=datetime.now()
+        )
+        db.add(reporte)
+        db.commit()
+        db.refresh(reporte)
+        return reporte, True
+
+    @staticmethod
+    def get_reporte(db: Session, id_reporte: int) -> schemas.Reporte:
+        """
+        Obtiene el estado de un reporte y, si terminó, su resultado.
+
+        Args:
+            db (Session): Sesión de base de datos
+            id_reporte (int): ID del reporte
+
+        Returns:
+            schemas.Reporte: El reporte
+
+        Raises:
+            HTTPException: Si el reporte no existe
+        """
+        reporte = db.get(models.Reporte, id_reporte)
+        if reporte is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Reporte con ID {id_reporte} no encontrado"
+            )
+        return ReporteService.a_esquema(reporte)
+
+    @staticmethod
+    def a_esquema(reporte: models.Reporte) -> schemas.Reporte:
+        """Convierte un reporte guardado en su esquema de respuesta."""
+        estado, error = reporte.estado, reporte.error
+        if ReporteService._abandonado(reporte):
+            estado, error = ReporteService.ERROR, "El reporte no terminó dentro del tiempo máximo"
+        return schemas.Reporte(
+            id_reporte=reporte.id_reporte,
+            tipo=reporte.tipo,
+            parametros=json.loads(reporte.parametros),
+            estado=estado,
+            fecha_creacion=reporte.fecha_creacion,
+            fecha_inicio=reporte.fecha_inicio,
+            fecha_fin=reporte.fecha_fin,
+            resultado=json.loads(reporte.resultado) if reporte.resultado is not None else None,
+            error=error
+        )
+
+    @staticmethod
+    def ejecutar(id_reporte: int) -> None:
+        """
+        Calcula un reporte pendiente y guarda su resultado. Se ejecuta en un
+        proceso del ejecutor de reportes, con su propia sesión.
+
+        Args:
+            id_reporte (int): ID del reporte
+        """
+        with SessionLocal() as db:
+            reporte = db.get(models.Reporte, id_reporte)
+            if reporte is None or reporte.estado != ReporteService.PENDIENTE:
+                return
+            reporte.estado = ReporteService.EN_PROCESO
+            reporte.fecha_inicio = datetime.now()
+            db.commit()
+
+            try:
+                calculo = ReporteService.get_calculo(reporte.tipo)
+                resultado = calculo(db, schemas.ParametrosReporte(**json.loads(reporte.parametros)))
+                # Termina la transacción de lectura antes de guardar el resultado
+                db.rollback()
+                reporte.resultado = json.dumps(resultado, default=str)
+                reporte.estado = ReporteService.COMPLETADO
+            except Exception as e:
+                db.rollback()
+                reporte.error = e.detail if isinstance(e, HTTPException) else str(e)
+                reporte.estado = ReporteService.ERROR
+            reporte.fecha_fin = datetime.now()
+            db.commit()
+
+    @staticmethod
+    def marcar_error(id_reporte: int, mensaje: str) -> None:
+        """
+        Marca como fallido un reporte que no llegó a ejecutarse (pedido rechazado
+        o proceso del ejecutor caído), para que un pedido igual lo vuelva a calcular.
+
+        Args:
+            id_reporte (int): ID del reporte
+            mensaje (str): Motivo del error
+        """
+        with SessionLocal() as db:
+            reporte = db.get(models.Reporte, id_reporte)
+            if reporte is None or reporte.estado in (ReporteService.COMPLETADO, ReporteService.ERROR):
+                return
+            reporte.estado = ReporteService.ERROR
+            reporte.error = mensaje
+            reporte.fecha_fin = datetime.now()
+            db.commit()
+
+    @staticmethod
+    def _abandonado(reporte: models.Reporte) -> bool:
+        """Si un reporte pendiente o en proceso superó el tiempo máximo."""
+        return (
+            reporte.estado in (ReporteService.PENDIENTE, ReporteService.EN_PROCESO)
+            and datetime.now() - reporte.fecha_creacion > timedelta(seconds=ReporteService.TIEMPO_MAXIMO)
+        )
+
+    @staticmethod
+    def _rango(columna, parametros: schemas.ParametrosReporte) -> list:
+        """Condiciones del rango de fechas (días inclusivos) sobre una columna."""
+        condiciones = []
+        if parametros.fecha_desde is not None:
+            condiciones.append(columna >= datetime.combine(parametros.fecha_desde, datetime.min.time()))
+        if parametros.fecha_hasta is not None:
+            condiciones.append(
+                columna < datetime.combine(parametros.fecha_hasta + timedelta(days=1), datetime.min.time())
+            )
+        return condiciones
+
+    @staticmethod
+    def _reporte_totales(db: Session, parametros: schemas.ParametrosReporte) -> Dict[str, Any]:
+        """Totales de transacciones, de caja y valor del inventario."""
+        filtro = schemas.FiltroTransacciones(fecha_desde=parametros.fecha_desde, fecha_hasta=parametros.fecha_hasta)
+        nombres = {tipo.id_tipo: tipo.nombre for tipo in db.query(models.TipoTransaccion)}
+        transacciones = {
+            nombres.get(tipo, str(tipo)): {"transacciones": num, "unidades": unidades or 0}
+            for tipo, num, unidades in TransaccionService._filtrar(
+                db.query(
+                    models.Transaccion.tipo_transaccion,
+                    func.count(models.Transaccion.id_transaccion),
+                    func.sum(models.Transaccion.cantidad)
+                ),
+                filtro
+            ).group_by(models.Transaccion.tipo_transaccion)
+        }
+
+        caja = {
+            tipo: {"movimientos": num, "total": total or 0.0}
+            for tipo, num, total in db.query(
+                models.Caja.tipo_movimiento,
+                func.count(models.Caja.id_movimiento),
+                func.sum(models.Caja.monto)
+            ).filter(
+                *ReporteService._rango(models.Caja.fecha_movimiento, parametros)
+            ).group_by(models.Caja.tipo_movimiento)
+        }
+
+        libros, unidades, valor_costo, valor_venta = db.query(
+            func.count(models.Libro.ISBN),
+            func.coalesce(func.sum(models.Libro.cantidad_actual), 0),
+            func.coalesce(func.sum(models.Libro.cantidad_actual * models.Libro.precio_compra), 0.0),
+            func.coalesce(func.sum(models.Libro.cantidad_actual * models.Libro.precio_venta), 0.0)
+        ).one()
+
+        return {
+            "transacciones": transacciones,
+            "caja": caja,
+            "inventario": {
+                "libros": libros,
+                "unidades": unidades,
+                "valor_costo": valor_costo,
+                "valor_venta": valor_venta,
+            },
+        }
+
+    @staticmethod
+    def _reporte_ventas_por_libro(db: Session, parametros: schemas.ParametrosReporte) -> list:
+        """Libros con más unidades vendidas en el rango de fechas."""
+        filtro = schemas.FiltroTransacciones(
+            tipo_transaccion=1, fecha_desde=parametros.fecha_desde, fecha_hasta=parametros.fecha_hasta
+        )
+        # El ingreso de una venta es el primer movimiento de caja que la referencia
+        primeros = db.query(
+            models.Caja.id_transaccion, func.min(models.Caja.id_movimiento).label("id_movimiento")
+        ).filter(
+            models.Caja.id_transaccion.isnot(None)
+        ).group_by(models.Caja.id_transaccion).subquery()
+        unidades = func.sum(models.Transaccion.cantidad)
+
+        filas = TransaccionService._filtrar(
+            db.query(
+                models.Transaccion.ISBN,
+                models.Libro.titulo,
+                func.count(models.Transaccion.id_transaccion),
+                unidades,
+                func.coalesce(func.sum(models.Caja.monto), 0.0)
+            ).outerjoin(
+                models.Libro, models.Libro.ISBN == models.Transaccion.ISBN
+            ).outerjoin(
+                primeros, primeros.c.id_transaccion == models.Transaccion.id_transaccion
+            ).outerjoin(
+                models.Caja, models.Caja.id_movimiento == primeros.c.id_movimiento
+            ),
+            filtro
+        ).group_by(
+            models.Transaccion.ISBN, models.Libro.titulo
+        ).order_by(unidades.desc(), models.Transaccion.ISBN).limit(parametros.limite)
+
+        return [
+            {"ISBN": isbn, "titulo": titulo, "ventas": ventas, "unidades": cantidad, "ingresos": ingresos}
+            for isbn, titulo, ventas, cantidad, ingresos in filas
+        ]
+
+    @staticmethod
+    def _reporte_reconciliacion_caja(db: Session, parametros: schemas.ParametrosReporte) -> Dict[str, object]:
+        """Reconciliación del saldo de caja, sin corregir la cabecera."""
+        return CajaService.reconciliar_saldo(db, corregir=False)
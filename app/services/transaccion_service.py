@@ -1,11 +1,17 @@
+from sqlalchemy import Row, bindparam, func, insert, update
 from sqlalchemy.orm import Session
+from ..lecturas import FilaTransaccion, columnas, leer
 from ..models import models
 from ..schemas import schemas
+from ..paginacion import decodificar_cursor, despues_de
 from fastapi import HTTPException, status
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional
 
 from app.services.libro_service import LibroService
+from app.services.caja_service import CajaService
+from app.services.evento_service import EventoService
+from app.services.reabastecimiento_service import ReabastecimientoService
 
 class TransaccionService:
     """
@@ -14,6 +20,24 @@ class TransaccionService:
     para mantener la integridad de la información entre inventario y caja.
     """
     
+    # Columnas del esquema Transaccion, en su orden, para los listados que leen
+    # filas en lugar de entidades (ver app/lecturas.py y app/respuestas.py)
+    COLUMNAS = columnas(FilaTransaccion, models.Transaccion)
+    
+    # Sentencias del camino de una venta, construidas una sola vez sobre las tablas
+    # (sin pasar por el ORM): cada ejecución solo recibe los parámetros y reutiliza
+    # el SQL compilado de la caché del engine
+    _LIBRO = models.Libro.__table__
+    _AJUSTAR_STOCK = (
+        update(_LIBRO)
+        .where(_LIBRO.c.ISBN == bindparam("isbn_libro"), _LIBRO.c.cantidad_actual >= bindparam("stock_minimo"))
+        .values(cantidad_actual=_LIBRO.c.cantidad_actual + bindparam("delta_stock"))
+        .returning(_LIBRO.c.cantidad_actual, _LIBRO.c.precio_compra, _LIBRO.c.precio_venta)
+    )
+    _INSERTAR_TRANSACCION = insert(models.Transaccion.__table__).returning(
+        models.Transaccion.__table__.c.id_transaccion
+    )
+    
     @staticmethod
     def get_transaccion(db: Session, id_transaccion: int):
         """
@@ -29,19 +53,175 @@ class TransaccionService:
         return db.query(models.Transaccion).filter(models.Transaccion.id_transaccion == id_transaccion).first()
     
     @staticmethod
-    def get_transacciones(db: Session, skip: int = 0, limit: int = 100):
+    def get_transacciones(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        filtro: Optional[schemas.FiltroTransacciones] = None
+    ) -> List[FilaTransaccion]:
         """
-        Obtiene una lista de transacciones con paginación
+        Obtiene una lista de transacciones, de la más reciente a la más antigua,
+        con paginación. Se leen como filas de solo lectura, sin cargar entidades del ORM
         
         Parámetros:
         - db: Sesión de la base de datos
         - skip: Número de registros a omitir (para paginación)
         - limit: Número máximo de registros a devolver
+        - cursor: Cursor de la página anterior; si se indica, se ignora skip
+        - filtro: Filtros por tipo, ISBN, rango de fechas y rango de cantidades (opcional)
         
         Retorna:
         - Lista de transacciones
         """
-        return db.query(models.Transaccion).offset(skip).limit(limit).all()
+        return leer(
+            TransaccionService.get_filas_transacciones(db, skip=skip, limit=limit, cursor=cursor, filtro=filtro),
+            FilaTransaccion
+        )
+    
+    @staticmethod
+    def get_filas_transacciones(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        filtro: Optional[schemas.FiltroTransacciones] = None
+    ) -> List[Row]:
+        """
+        Como get_transacciones, pero devuelve filas con las columnas del esquema
+        Transaccion, sin cargar entidades del ORM
+        
+        Retorna:
+        - Lista de filas de transacciones
+        """
+        query = TransaccionService._filtrar(db.query(*TransaccionService.COLUMNAS), filtro)
+        return TransaccionService._paginar(query, skip, limit, cursor)
+    
+    @staticmethod
+    def iterar_transacciones(
+        db: Session,
+        filtro: Optional[schemas.FiltroTransacciones] = None,
+        tamano_lote: int = 1000
+    ) -> Iterator[FilaTransaccion]:
+        """
+        Recorre todas las transacciones que cumplen el filtro, de la más reciente
+        a la más antigua, sin cargarlas todas en memoria ni como entidades del ORM.
+        
+        Las filas se leen del cursor de la base de datos en lotes de tamano_lote
+        (yield_per), así que la memoria usada no depende del tamaño del rango.
+        
+        Args:
+            db (Session): Sesión de base de datos
+            filtro (Optional[schemas.FiltroTransacciones]): Filtros a aplicar
+            tamano_lote (int): Filas leídas por cada viaje a la base de datos
+            
+        Returns:
+            Iterator[FilaTransaccion]: Las transacciones, una por una
+            
+        Raises:
+            HTTPException: Si algún rango del filtro no es válido
+        """
+        query = TransaccionService._filtrar(db.query(*TransaccionService.COLUMNAS), filtro)
+        query = query.order_by(*(columna.desc() for columna in TransaccionService._orden()))
+        return (FilaTransaccion(*fila) for fila in query.yield_per(tamano_lote))
+    
+    @staticmethod
+    def get_marca_cambios(db: Session) -> int:
+        """
+        Obtiene el ID de la última transacción registrada.
+        
+        Las transacciones no se modifican una vez creadas, así que cualquier
+        cambio en los listados implica un ID mayor.
+        
+        Args:
+            db (Session): Sesión de base de datos
+            
+        Returns:
+            int: ID de la última transacción, o 0 si no hay ninguna
+        """
+        return db.query(func.max(models.Transaccion.id_transaccion)).scalar() or 0
+    
+    @staticmethod
+    def validar_filtro(filtro: schemas.FiltroTransacciones) -> None:
+        """
+        Verifica que los rangos del filtro no estén invertidos.
+        
+        Args:
+            filtro (schemas.FiltroTransacciones): Filtro a verificar
+            
+        Raises:
+            HTTPException: Si algún rango del filtro está invertido
+        """
+        if filtro.fecha_desde and filtro.fecha_hasta and filtro.fecha_desde > filtro.fecha_hasta:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="fecha_desde no puede ser posterior a fecha_hasta"
+            )
+        if (filtro.cantidad_min is not None and filtro.cantidad_max is not None
+                and filtro.cantidad_min > filtro.cantidad_max):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="cantidad_min no puede ser mayor que cantidad_max"
+            )
+    
+    @staticmethod
+    def _filtrar(query, filtro: Optional[schemas.FiltroTransacciones]):
+        """
+        Agrega a una consulta de transacciones las condiciones del filtro.
+        
+        Todas las condiciones van en la misma consulta: el tipo o el conjunto de
+        ISBN junto con el rango de fechas se resuelven con los índices
+        (tipo, fecha, id) e (ISBN, fecha, id); el rango de cantidades se evalúa
+        sobre las filas que esos índices ya acotaron.
+        
+        Raises:
+            HTTPException: Si algún rango del filtro está invertido
+        """
+        if filtro is None:
+            return query
+        
+        TransaccionService.validar_filtro(filtro)
+        
+        transaccion = models.Transaccion
+        if filtro.tipo_transaccion is not None:
+            query = query.filter(transaccion.tipo_transaccion == filtro.tipo_transaccion)
+        if filtro.isbns:
+            query = query.filter(transaccion.ISBN.in_(filtro.isbns))
+        # Los días del rango son inclusivos: [desde 00:00, hasta + 1 día 00:00)
+        if filtro.fecha_desde is not None:
+            query = query.filter(
+                transaccion.fecha_transaccion >= datetime.combine(filtro.fecha_desde, datetime.min.time())
+            )
+        if filtro.fecha_hasta is not None:
+            query = query.filter(
+                transaccion.fecha_transaccion
+                < datetime.combine(filtro.fecha_hasta + timedelta(days=1), datetime.min.time())
+            )
+        if filtro.cantidad_min is not None:
+            query = query.filter(transaccion.cantidad >= filtro.cantidad_min)
+        if filtro.cantidad_max is not None:
+            query = query.filter(transaccion.cantidad <= filtro.cantidad_max)
+        return query
+    
+    @staticmethod
+    def _orden():
+        """Columnas de ordenamiento de los listados de transacciones."""
+        return (models.Transaccion.fecha_transaccion, models.Transaccion.id_transaccion)
+    
+    @staticmethod
+    def _paginar(query, skip: int, limit: int, cursor: Optional[str]):
+        """
+        Ordena una consulta de transacciones por fecha e ID descendentes y aplica
+        la paginación por cursor (keyset) o, si no hay cursor, por OFFSET.
+        """
+        columnas = TransaccionService._orden()
+        query = query.order_by(*(columna.desc() for columna in columnas))
+        
+        if cursor is not None:
+            valores = decodificar_cursor(cursor, datetime, int)
+            return query.filter(despues_de(columnas, valores, descendente=True)).limit(limit).all()
+        
+        return query.offset(skip).limit(limit).all()
     
     @staticmethod
     def get_transacciones_by_libro(db: Session, ISBN: str):
@@ -68,128 +248,197 @@ class TransaccionService:
         Retorna:
         - Último saldo registrado o 0 si no hay registros
         """
-        ultimo_movimiento = db.query(models.Caja).order_by(models.Caja.id_movimiento.desc()).first()
-        if not ultimo_movimiento:
-            return 0
-        return ultimo_movimiento.saldo_actual
+        return CajaService.get_saldo_actual(db)["saldo"]
     
     @staticmethod
-    def create_transaccion(db: Session, transaccion: schemas.TransaccionCreate) -> models.Transaccion:
+    def mover_stock(db: Session, isbn: str, delta: int) -> bool:
         """
-        Crea una nueva transacción (venta o abastecimiento).
-        Este método reemplaza los triggers de BD manejando la lógica de actualización
-        de inventario y caja en una sola transacción.
+        Modifica el stock de un libro de forma atómica
+        (UPDATE ... SET cantidad_actual = cantidad_actual + :delta).
+        
+        Cuando delta es negativo, el UPDATE solo se aplica si el stock actual es
+        suficiente, así que una venta concurrente nunca deja el stock negativo.
+        
+        Args:
+            db (Session): Sesión de base de datos
+            isbn (str): ISBN del libro
+            delta (int): Unidades a sumar (positivo) o restar (negativo)
+            
+        Returns:
+            bool: True si se actualizó el stock, False si no había stock suficiente o el libro no existe
+        """
+        return TransaccionService.mover_stock_condicionado(
+            db, isbn, delta, stock_minimo=-delta if delta < 0 else 0
+        )
+    
+    @staticmethod
+    def mover_stock_condicionado(db: Session, isbn: str, delta: int, stock_minimo: int) -> bool:
+        """
+        Modifica el stock de un libro de forma atómica solo si el stock actual es
+        al menos stock_minimo.
+        
+        Args:
+            db (Session): Sesión de base de datos
+            isbn (str): ISBN del libro
+            delta (int): Unidades a sumar (positivo) o restar (negativo)
+            stock_minimo (int): Stock que debe haber antes de aplicar el cambio
+            
+        Returns:
+            bool: True si se actualizó el stock, False en otro caso
+        """
+        return TransaccionService.ajustar_stock(db, isbn, delta, stock_minimo) is not None
+    
+    @staticmethod
+    def ajustar_stock(db: Session, isbn: str, delta: int, stock_minimo: int = 0) -> Optional[Row]:
+        """
+        Como mover_stock_condicionado, pero devuelve en la misma sentencia
+        (UPDATE ... RETURNING) el stock resultante y los precios del libro.
+        
+        Args:
+            db (Session): Sesión de base de datos
+            isbn (str): ISBN del libro
+            delta (int): Unidades a sumar (positivo) o restar (negativo)
+            stock_minimo (int): Stock que debe haber antes de aplicar el cambio
+            
+        Returns:
+            Optional[Row]: cantidad_actual, precio_compra y precio_venta del libro,
+                o None si el libro no existe o no había stock suficiente
+        """
+        return db.execute(
+            TransaccionService._AJUSTAR_STOCK,
+            {"isbn_libro": isbn, "delta_stock": delta, "stock_minimo": max(stock_minimo, 0)}
+        ).first()
+    
+    @staticmethod
+    def aplicar_transaccion(db: Session, transaccion: schemas.TransaccionCreate) -> FilaTransaccion:
+        """
+        Aplica una transacción (venta o abastecimiento) sobre el inventario y la caja
+        sin hacer commit: el llamador decide cuándo confirmar o revertir. La usan
+        create_transaccion y la cola de escritura, que confirma varias juntas.
+        
+        Todas las escrituras son sentencias de Core ya construidas (ninguna entidad
+        del ORM entra en la sesión), así que el commit no tiene nada que hacer flush.
         
         Args:
             db (Session): Sesión de base de datos
             transaccion (schemas.TransaccionCreate): Datos de la transacción a crear
             
         Returns:
-            models.Transaccion: La transacción creada
+            FilaTransaccion: La transacción registrada
             
         Raises:
-            HTTPException: Si hay errores de validación o falla la operación
+            HTTPException: Si el libro no existe, el tipo no es válido o no alcanzan el stock o el saldo
         """
-        # Verificar que existe el libro
-        libro = db.query(models.Libro).filter(models.Libro.isbn == transaccion.isbn).first()
-        if not libro:
+        if transaccion.tipo_transaccion not in (1, 2):
+            # Un libro inexistente se informa antes que el tipo
+            LibroService.consultar_libro(db, transaccion.ISBN)
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"No se encontró un libro con el ISBN {transaccion.isbn}"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Tipo de transacción no válido: {transaccion.tipo_transaccion}"
             )
         
-        # Validar la transacción según su tipo
-        if transaccion.tipo_transaccion == 1:  # VENTA
-            # Verificar que hay suficiente stock
-            if libro.cantidad_actual < transaccion.cantidad:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Stock insuficiente. Disponible: {libro.cantidad_actual}, Solicitado: {transaccion.cantidad}"
-                )
+        # 1. Actualizar el inventario con un UPDATE atómico condicionado, de modo que dos
+        # ventas concurrentes no pueden partir del mismo stock. El mismo UPDATE devuelve
+        # el stock resultante y los precios vigentes del libro (RETURNING)
+        venta = transaccion.tipo_transaccion == 1
+        libro = TransaccionService.ajustar_stock(
+            db,
+            transaccion.ISBN,
+            -transaccion.cantidad if venta else transaccion.cantidad,
+            stock_minimo=transaccion.cantidad if venta else 0
+        )
+        if libro is None:
+            # El libro no existe (404) o no alcanza el stock
+            disponible = LibroService.get_libro(db, transaccion.ISBN).cantidad_actual
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Stock insuficiente. Disponible: {disponible}, Solicitado: {transaccion.cantidad}"
+            )
+        if venta:
+            tipo_movimiento = "INGRESO"
+            monto = transaccion.cantidad * libro.precio_venta
+        else:
+            tipo_movimiento = "EGRESO"
+            monto = transaccion.cantidad * libro.precio_compra
+        
+        # 2. Crear el registro de transacción
+        fecha = datetime.now()
+        id_transaccion = db.execute(TransaccionService._INSERTAR_TRANSACCION, {
+            "ISBN": transaccion.ISBN,
+            "tipo_transaccion": transaccion.tipo_transaccion,
+            "cantidad": transaccion.cantidad,
+            "fecha_transaccion": fecha,
+        }).scalar_one()
+        
+        # 3. Registrar el movimiento en caja; en un abastecimiento falla si el
+        # saldo no alcanza (la cabecera de saldo queda bloqueada hasta el commit)
+        movimiento = CajaService.registrar_movimiento(
+            db,
+            tipo_movimiento=tipo_movimiento,
+            monto=monto,
+            id_transaccion=id_transaccion,
+            fecha=fecha
+        )
+        
+        # 4. Agregar el evento al registro de eventos
+        EventoService.registrar(
+            db,
+            EventoService.TIPOS_TRANSACCION[transaccion.tipo_transaccion],
+            fecha=fecha,
+            ISBN=transaccion.ISBN,
+            cantidad=transaccion.cantidad,
+            monto=monto,
+            id_transaccion=id_transaccion,
+            id_movimiento=movimiento.id_movimiento
+        )
+        
+        # 5. Actualizar la velocidad de ventas y la marca de stock bajo del libro
+        if venta:
+            ReabastecimientoService.registrar_venta(
+                db, transaccion.ISBN, transaccion.cantidad, fecha, stock=libro.cantidad_actual
+            )
+        else:
+            ReabastecimientoService.registrar_stock(db, transaccion.ISBN, fecha, stock=libro.cantidad_actual)
+        
+        return FilaTransaccion(
+            ISBN=transaccion.ISBN,
+            tipo_transaccion=transaccion.tipo_transaccion,
+            cantidad=transaccion.cantidad,
+            id_transaccion=id_transaccion,
+            fecha_transaccion=fecha
+        )
+    
+    @staticmethod
+    def create_transaccion(db: Session, transaccion: schemas.TransaccionCreate) -> FilaTransaccion:
+        """
+        Crea una nueva transacción (venta o abastecimiento).
+        Este método reemplaza los triggers de BD manejando la lógica de actualización
+        de inventario y caja en una sola transacción.
         
+        Args:
+            db (Session): Sesión de base de datos
+            transaccion (schemas.TransaccionCreate): Datos de la transacción a crear
+            
+        Returns:
+            FilaTransaccion: La transacción creada
+            
+        Raises:
+            HTTPException: Si hay errores de validación o falla la operación
+        """
         # Procesar la transacción dentro de una sola transacción de BD
         try:
-            # 1. Crear el registro de transacción
-            db_transaccion = models.Transaccion(
-                isbn=transaccion.isbn,
-                tipo_transaccion=transaccion.tipo_transaccion,
-                cantidad=transaccion.cantidad,
-                precio_venta=transaccion.precio_venta or libro.precio_venta,
-                precio_compra=transaccion.precio_compra or libro.precio_compra,
-                fecha_transaccion=datetime.now()
-            )
+            db_transaccion = TransaccionService.aplicar_transaccion(db, transaccion)
             
-            db.add(db_transaccion)
-            db.flush()  # Obtener el ID generado pero sin commit todavía
-            
-            # 2. Actualizar el inventario
-            if transaccion.tipo_transaccion == 1:  # VENTA
-                # Actualizar inventario: restar unidades
-                libro.cantidad_actual -= transaccion.cantidad
-                
-                # Calcular el monto de la venta
-                monto_venta = transaccion.cantidad * libro.precio_venta
-                
-                # 3. Obtener el saldo actual de caja
-                ultimo_movimiento = db.query(models.Caja).order_by(
-                    models.Caja.id_movimiento.desc()
-                ).first()
-                
-                saldo_actual = 0
-                if ultimo_movimiento:
-                    saldo_actual = ultimo_movimiento.saldo_actual
-                
-                # 4. Registrar ingreso en caja
-                db_movimiento = models.Caja(
-                    tipo_movimiento="INGRESO",
-                    monto=monto_venta,
-                    saldo_actual=saldo_actual + monto_venta,
-                    id_transaccion=db_transaccion.id_transaccion,
-                    fecha_movimiento=datetime.now()
-                )
-                
-                db.add(db_movimiento)
-                
-            elif transaccion.tipo_transaccion == 2:  # ABASTECIMIENTO
-                # Actualizar inventario: sumar unidades
-                libro.cantidad_actual += transaccion.cantidad
-                
-                # Calcular el monto del abastecimiento
-                monto_abastecimiento = transaccion.cantidad * libro.precio_compra
-                
-                # 3. Obtener el saldo actual de caja
-                ultimo_movimiento = db.query(models.Caja).order_by(
-                    models.Caja.id_movimiento.desc()
-                ).first()
-                
-                saldo_actual = 0
-                if ultimo_movimiento:
-                    saldo_actual = ultimo_movimiento.saldo_actual
-                
-                # Validar que hay suficiente saldo en caja
-                if monto_abastecimiento > saldo_actual:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Saldo insuficiente en caja. Disponible: {saldo_actual}, Requerido: {monto_abastecimiento}"
-                    )
-                
-                # 4. Registrar egreso en caja
-                db_movimiento = models.Caja(
-                    tipo_movimiento="EGRESO",
-                    monto=monto_abastecimiento,
-                    saldo_actual=saldo_actual - monto_abastecimiento,
-                    id_transaccion=db_transaccion.id_transaccion,
-                    fecha_movimiento=datetime.now()
-                )
-                
-                db.add(db_movimiento)
-                
-            # Confirmar todos los cambios
+            # Confirmar todos los cambios; la transacción ya tiene su ID y fecha, no
+            # hace falta releerla
             db.commit()
-            db.refresh(db_transaccion)
+            LibroService.invalidar_cache(transaccion.ISBN)
             
             return db_transaccion
             
+        except HTTPException:
+            db.rollback()
+            raise
         except Exception as e:
             db.rollback()
             raise HTTPException(
@@ -198,27 +447,246 @@ class TransaccionService:
             )
     
     @staticmethod
-    def get_transacciones_por_libro(db: Session, isbn: str, skip: int = 0, limit: int = 100) -> List[models.Transaccion]:
+    def create_transacciones_lote(db: Session, lote: schemas.TransaccionLoteCreate) -> schemas.TransaccionLoteResultado:
+        """
+        Registra un lote de transacciones (por ejemplo, un carrito completo) en una
+        sola transacción de base de datos.
+
+        Todos los libros del lote se cargan con una única consulta IN, el stock y el
+        saldo se validan línea por línea en memoria y luego se aplican con UPDATE
+        atómicos (uno por libro y uno para la caja) que vuelven a exigir stock y saldo
+        suficientes. Las transacciones y movimientos de caja se insertan en bloque con
+        un único commit. Si alguna línea falla se revierte el lote completo.
+
+        Args:
+            db (Session): Sesión de base de datos
+            lote (schemas.TransaccionLoteCreate): Líneas del lote a registrar
+
+        Returns:
+            schemas.TransaccionLoteResultado: Resultado de cada línea y saldo final de caja
+
+        Raises:
+            HTTPException: Si alguna línea no es válida (con el detalle por línea) o falla la operación
+        """
+        isbns = {linea.ISBN for linea in lote.lineas}
+        libros = {
+            libro.ISBN: libro
+            for libro in db.query(models.Libro).filter(models.Libro.ISBN.in_(isbns))
+        }
+
+        saldo_actual = CajaService.get_saldo_actual(db)["saldo"]
+        stock = {isbn: libro.cantidad_actual for isbn, libro in libros.items()}
+
+        # Validar todas las líneas en orden, simulando el efecto acumulado sobre stock y saldo
+        resultados = []
+        hay_errores = False
+        for numero, linea in enumerate(lote.lineas, start=1):
+            resultado = schemas.ResultadoLineaLote(
+                linea=numero,
+                ISBN=linea.ISBN,
+                tipo_transaccion=linea.tipo_transaccion,
+                cantidad=linea.cantidad,
+                exito=False
+            )
+            resultados.append(resultado)
+
+            libro = libros.get(linea.ISBN)
+            if not libro:
+                resultado.error = f"No se encontró un libro con el ISBN {linea.ISBN}"
+            elif linea.tipo_transaccion == 1:  # VENTA
+                if stock[linea.ISBN] < linea.cantidad:
+                    resultado.error = f"Stock insuficiente. Disponible: {stock[linea.ISBN]}, Solicitado: {linea.cantidad}"
+                else:
+                    stock[linea.ISBN] -= linea.cantidad
+                    resultado.monto = linea.cantidad * libro.precio_venta
+                    saldo_actual += resultado.monto
+            elif linea.tipo_transaccion == 2:  # ABASTECIMIENTO
+                monto_abastecimiento = linea.cantidad * libro.precio_compra
+                if monto_abastecimiento > saldo_actual:
+                    resultado.error = f"Saldo insuficiente en caja. Disponible: {saldo_actual}, Requerido: {monto_abastecimiento}"
+                else:
+                    stock[linea.ISBN] += linea.cantidad
+                    resultado.monto = monto_abastecimiento
+                    saldo_actual -= monto_abastecimiento
+            else:
+                resultado.error = f"Tipo de transacción no válido: {linea.tipo_transaccion}"
+
+            if resultado.error:
+                hay_errores = True
+            else:
+                resultado.saldo_actual = saldo_actual
+
+        if hay_errores:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "mensaje": "El lote no se registró porque contiene líneas no válidas",
+                    "resultados": [resultado.dict() for resultado in resultados]
+                }
+            )
+
+        # Efecto neto del lote sobre cada libro y sobre la caja, junto con el punto más
+        # bajo que alcanza cada uno durante el lote (se exige que no sea negativo)
+        deltas_stock = {}
+        minimos_stock = {}
+        for linea in lote.lineas:
+            delta = linea.cantidad if linea.tipo_transaccion == 2 else -linea.cantidad
+            deltas_stock[linea.ISBN] = deltas_stock.get(linea.ISBN, 0) + delta
+            minimos_stock[linea.ISBN] = min(minimos_stock.get(linea.ISBN, 0), deltas_stock[linea.ISBN])
+
+        deltas_saldo = []
+        acumulado = 0
+        minimo_saldo = 0
+        for linea, resultado in zip(lote.lineas, resultados):
+            acumulado += resultado.monto if linea.tipo_transaccion == 1 else -resultado.monto
+            deltas_saldo.append(acumulado)
+            minimo_saldo = min(minimo_saldo, acumulado)
+
+        try:
+            fecha = datetime.now()
+
+            # 1. Aplicar el inventario con UPDATE atómicos condicionados (en orden de ISBN
+            # para que lotes concurrentes bloqueen los libros siempre en el mismo orden)
+            for isbn in sorted(deltas_stock):
+                if not TransaccionService.mover_stock_condicionado(
+                    db, isbn, deltas_stock[isbn], stock_minimo=-minimos_stock[isbn]
+                ):
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Stock insuficiente para el ISBN {isbn}: el inventario cambió mientras se procesaba el lote"
+                    )
+
+            # 2. Mover el saldo de caja de una vez; la cabecera queda bloqueada hasta el commit
+            nuevo_saldo = CajaService.mover_saldo(
+                db, acumulado, saldo_minimo=-minimo_saldo if minimo_saldo < 0 else None
+            )
+            if nuevo_saldo is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Saldo insuficiente en caja: el saldo cambió mientras se procesaba el lote"
+                )
+
+            # Recalcular el saldo de cada línea a partir del saldo efectivamente bloqueado
+            saldo_inicial = nuevo_saldo - acumulado
+            for resultado, delta in zip(resultados, deltas_saldo):
+                resultado.saldo_actual = saldo_inicial + delta
+            saldo_actual = nuevo_saldo
+
+            # 3. Insertar todas las transacciones en bloque, conservando el orden de las líneas
+            ids_transaccion = db.execute(
+                insert(models.Transaccion).returning(
+                    models.Transaccion.id_transaccion, sort_by_parameter_order=True
+                ),
+                [
+                    {
+                        "ISBN": linea.ISBN,
+                        "tipo_transaccion": linea.tipo_transaccion,
+                        "cantidad": linea.cantidad,
+                        "fecha_transaccion": fecha
+                    }
+                    for linea in lote.lineas
+                ]
+            ).scalars().all()
+
+            # 4. Registrar los movimientos de caja en bloque
+            ids_movimiento = db.execute(
+                insert(models.Caja).returning(
+                    models.Caja.id_movimiento, sort_by_parameter_order=True
+                ),
+                [
+                    {
+                        "tipo_movimiento": "INGRESO" if linea.tipo_transaccion == 1 else "EGRESO",
+                        "monto": resultado.monto,
+                        "saldo_actual": resultado.saldo_actual,
+                        "id_transaccion": id_transaccion,
+                        "fecha_movimiento": fecha
+                    }
+                    for linea, resultado, id_transaccion in zip(lote.lineas, resultados, ids_transaccion)
+                ]
+            ).scalars().all()
+
+            # 5. Apuntar la cabecera de saldo al último movimiento del lote y
+            # acumular el lote en el resumen diario de caja
+            CajaService.marcar_ultimo_movimiento(db, ids_movimiento[-1], fecha)
+            CajaService.acumular_resumen_diario(db, fecha.date(), [
+                ("INGRESO" if linea.tipo_transaccion == 1 else "EGRESO", resultado.monto)
+                for linea, resultado in zip(lote.lineas, resultados)
+            ])
+
+            # 6. Agregar los eventos del lote al registro de eventos
+            EventoService.registrar_varios(db, [
+                {
+                    "tipo": EventoService.TIPOS_TRANSACCION[linea.tipo_transaccion],
+                    "fecha": fecha,
+                    "ISBN": linea.ISBN,
+                    "cantidad": linea.cantidad,
+                    "monto": resultado.monto,
+                    "id_transaccion": id_transaccion,
+                    "id_movimiento": id_movimiento
+                }
+                for linea, resultado, id_transaccion, id_movimiento
+                in zip(lote.lineas, resultados, ids_transaccion, ids_movimiento)
+            ])
+
+            # 7. Actualizar la velocidad de ventas y la marca de stock bajo de cada libro
+            ReabastecimientoService.registrar_transacciones(db, [
+                (linea.ISBN, linea.tipo_transaccion, linea.cantidad) for linea in lote.lineas
+            ], fecha)
+
+            db.commit()
+            LibroService.invalidar_cache(*sorted(isbns))
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al procesar el lote de transacciones: {str(e)}"
+            )
+
+        for resultado, id_transaccion, id_movimiento in zip(resultados, ids_transaccion, ids_movimiento):
+            resultado.exito = True
+            resultado.id_transaccion = id_transaccion
+            resultado.id_movimiento = id_movimiento
+
+        return schemas.TransaccionLoteResultado(
+            procesadas=len(resultados),
+            saldo_final=saldo_actual,
+            resultados=resultados
+        )
+
+    @staticmethod
+    def get_transacciones_por_libro(
+        db: Session,
+        isbn: str,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        filtro: Optional[schemas.FiltroTransacciones] = None
+    ) -> List[FilaTransaccion]:
         """
-        Obtiene la lista de transacciones de un libro específico.
+        Obtiene la lista de transacciones de un libro específico, de la más
+        reciente a la más antigua, como filas de solo lectura.
         
         Args:
             db (Session): Sesión de base de datos
             isbn (str): ISBN del libro
             skip (int): Número de registros a omitir
             limit (int): Número máximo de registros a retornar
+            cursor (Optional[str]): Cursor de la página anterior; si se indica, se ignora skip
+            filtro (Optional[schemas.FiltroTransacciones]): Filtros adicionales por tipo,
+                rango de fechas y rango de cantidades
             
         Returns:
-            List[models.Transaccion]: Lista de transacciones del libro
+            List[FilaTransaccion]: Lista de transacciones del libro
             
         Raises:
-            HTTPException: Si el libro no existe
+            HTTPException: Si el libro no existe o algún rango del filtro no es válido
         """
         # Verificar que existe el libro
-        libro = LibroService.get_libro(db, isbn)
+        LibroService.consultar_libro(db, isbn)
         
-        return db.query(models.Transaccion).filter(
-            models.Transaccion.isbn == isbn
-        ).order_by(
-            models.Transaccion.fecha_transaccion.desc()
-        ).offset(skip).limit(limit).all() 
\ No newline at end of file
+        query = db.query(*TransaccionService.COLUMNAS).filter(models.Transaccion.ISBN == isbn)
+        query = TransaccionService._filtrar(query, filtro)
+        return leer(TransaccionService._paginar(query, skip, limit, cursor), FilaTransaccion)
\ No newline at end of file
@@ -69,11 +69,30 @@ function resetearFormulario(formulario, borrarValidacion = true) {
     }
 }
 
+// Respuestas GET guardadas con su ETag, por URL
+const respuestasConEtag = new Map();
+
 // Función para realizar peticiones API con manejo de errores
 async function fetchApi(url, opciones = {}) {
     try {
+        const metodo = (opciones.method || 'GET').toUpperCase();
+        const guardada = metodo === 'GET' ? respuestasConEtag.get(url) : undefined;
+        
+        // Si ya tenemos una versión de este recurso, pedirla solo si cambió
+        if (guardada) {
+            opciones = {
+                ...opciones,
+                headers: { ...(opciones.headers || {}), 'If-None-Match': guardada.etag }
+            };
+        }
+        
         const response = await fetch(url, opciones);
         
+        // 304: el recurso no cambió desde la última vez
+        if (response.status === 304 && guardada) {
+            return guardada.datos;
+        }
+        
         // Si la respuesta no es ok (2xx)
         if (!response.ok) {
             const error = await response.json().catch(() => ({
@@ -88,8 +107,13 @@ async function fetchApi(url, opciones = {}) {
             return null;
         }
         
-        // Devolver la respuesta JSON
-        return await response.json();
+        // Devolver la respuesta JSON, guardándola si trae ETag
+        const datos = await response.json();
+        const etag = response.headers.get('ETag');
+        if (metodo === 'GET' && etag) {
+            respuestasConEtag.set(url, { etag, datos });
+        }
+        return datos;
     } catch (error) {
         console.error('Error en petición API:', error);
         mostrarAlerta(error.message, 'danger');
@@ -40,9 +40,6 @@ async function cargarMovimientos() {
         // Realizar petición a la API
         movimientos = await fetchApi('/api/caja');
         
-        // Calcular totales
-        calcularTotales(movimientos);
-        
         // Actualizar la tabla
         actualizarTablaMovimientos(movimientos);
     } catch (error) {
@@ -57,20 +54,24 @@ async function cargarMovimientos() {
     }
 }
 
-// Función para calcular totales
-function calcularTotales(movimientos) {
-    totalIngresos = 0;
-    totalEgresos = 0;
-    
-    movimientos.forEach(movimiento => {
-        if (movimiento.tipo_movimiento === 'INGRESO') {
-            totalIngresos += movimiento.monto;
-        } else {
-            totalEgresos += movimiento.monto;
-        }
-    });
-    
-    // Actualizar UI
+// Función para cargar los totales (calculados en el servidor sobre todo el historial)
+async function cargarResumen() {
+    try {
+        // Realizar petición a la API
+        const resumen = await fetchApi('/api/caja/resumen');
+        totalIngresos = resumen.total_ingresos;
+        totalEgresos = resumen.total_egresos;
+        
+        // Actualizar UI
+        mostrarTotales();
+    } catch (error) {
+        console.error('Error al cargar el resumen de caja:', error);
+        mostrarAlerta('Error al cargar los totales de caja', 'danger');
+    }
+}
+
+// Función para mostrar los totales
+function mostrarTotales() {
     document.querySelector('#totalIngresos').textContent = formatoMoneda(totalIngresos);
     document.querySelector('#totalEgresos').textContent = formatoMoneda(totalEgresos);
     document.querySelector('#resultado').textContent = formatoMoneda(totalIngresos - totalEgresos);
@@ -183,7 +184,7 @@ async function guardarMovimiento(event) {
         );
         
         // Recargar datos
-        await Promise.all([cargarSaldo(), cargarMovimientos()]);
+        await Promise.all([cargarSaldo(), cargarResumen(), cargarMovimientos()]);
     } catch (error) {
         console.error('Error al registrar movimiento:', error);
     }
@@ -193,6 +194,7 @@ async function guardarMovimiento(event) {
 document.addEventListener('DOMContentLoaded', () => {
     // Cargar datos iniciales
     cargarSaldo();
+    cargarResumen();
     cargarMovimientos();
     
     // Configurar listeners de eventos
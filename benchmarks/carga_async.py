@@ -0,0 +1,181 @@
+"""
+Prueba de carga: capa de base de datos síncrona contra asíncrona.
+
+Levanta la aplicación con uvicorn dos veces sobre la misma base inicial, una con
+la configuración por defecto (endpoints síncronos en el threadpool) y otra con
+DB_ASYNC=1 (endpoints atendidos con AsyncSession), y lanza contra cada una la
+misma mezcla de peticiones concurrentes:
+
+- GET /api/transacciones/?limit=50
+- GET /api/caja/saldo
+- GET /api/libros/{isbn}
+- POST /api/transacciones/ (ventas y abastecimientos)
+
+Para cada modo muestra peticiones por segundo, latencias p50/p95/p99 y errores.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.carga_async --concurrencia 64 --duracion 10
+
+Por defecto usa una base SQLite temporal por modo; con --database-url puede
+apuntarse a PostgreSQL (la base se reinicia antes de cada modo). El modo
+asíncrono necesita aiosqlite o asyncpg instalados.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrencia", type=int, default=64, help="Clientes concurrentes")
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos de carga por modo")
+    parser.add_argument("--libros", type=int, default=50, help="Libros en el catálogo de prueba")
+    parser.add_argument("--transacciones", type=int, default=2000, help="Transacciones iniciales en el historial")
+    parser.add_argument("--proporcion-escrituras", type=float, default=0.1, help="Fracción de peticiones que son ventas o abastecimientos")
+    parser.add_argument("--modos", default="sync,async", help="Modos a comparar, separados por comas")
+    parser.add_argument("--database-url", help="URL de base de datos (por defecto, SQLite temporal)")
+    parser.add_argument("--semilla", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def preparar_base(url: str, args: argparse.Namespace) -> None:
+    """Crea el esquema y carga el catálogo, el saldo inicial y el historial en un proceso aparte."""
+    codigo = f"""
+import random
+from app.database import SessionLocal, engine
+from app.migraciones import aplicar_migraciones
+from app.models import models
+from app.schemas import schemas
+from app.services import CajaService, TransaccionService
+
+models.Base.metadata.drop_all(bind=engine)
+aplicar_migraciones(engine)
+aleatorio = random.Random({args.semilla})
+with SessionLocal() as db:
+    for i in range(1, {args.libros} + 1):
+        db.add(models.Libro(ISBN=f"978{{i:010d}}", titulo=f"Libro de carga {{i}}",
+                            precio_compra=7.0, precio_venta=10.0, cantidad_actual=1000000))
+    db.commit()
+    CajaService.inicializar(db)
+    CajaService.create_movimiento(db, schemas.CajaCreate(tipo_movimiento="INGRESO", monto=1e9, saldo_actual=0))
+    for _ in range({args.transacciones}):
+        TransaccionService.create_transaccion(db, schemas.TransaccionCreate(
+            ISBN=f"978{{aleatorio.randint(1, {args.libros}):010d}}",
+            tipo_transaccion=aleatorio.choice((1, 2)), cantidad=1))
+"""
+    entorno = dict(os.environ, DATABASE_URL=url, DB_ASYNC="0")
+    subprocess.run([sys.executable, "-W", "ignore", "-c", codigo], check=True, env=entorno)
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def esperar_servidor(cliente, url: str, limite: float = 30.0) -> None:
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        try:
+            if (await cliente.get(f"{url}/api")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"El servidor no respondió en {url}")
+
+
+async def generar_carga(url: str, args: argparse.Namespace) -> dict:
+    import httpx
+
+    latencias, errores = [], 0
+    limites = httpx.Limits(max_connections=args.concurrencia, max_keepalive_connections=args.concurrencia)
+    async with httpx.AsyncClient(timeout=30.0, limits=limites) as cliente:
+        await esperar_servidor(cliente, url)
+        fin = time.monotonic() + args.duracion
+
+        async def trabajador(numero: int) -> None:
+            nonlocal errores
+            aleatorio = random.Random(args.semilla + numero)
+            while time.monotonic() < fin:
+                isbn = f"978{aleatorio.randint(1, args.libros):010d}"
+                eleccion = aleatorio.random()
+                inicio = time.perf_counter()
+                if eleccion < args.proporcion_escrituras:
+                    respuesta = await cliente.post(f"{url}/api/transacciones/", json={
+                        "ISBN": isbn, "tipo_transaccion": aleatorio.choice((1, 2)), "cantidad": 1
+                    })
+                elif eleccion < 0.5:
+                    respuesta = await cliente.get(f"{url}/api/transacciones/", params={"limit": 50})
+                elif eleccion < 0.75:
+                    respuesta = await cliente.get(f"{url}/api/caja/saldo")
+                else:
+                    respuesta = await cliente.get(f"{url}/api/libros/{isbn}")
+                latencias.append(time.perf_counter() - inicio)
+                if respuesta.status_code >= 400:
+                    errores += 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajador(i) for i in range(args.concurrencia)))
+        duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    cuantil = lambda q: latencias[min(len(latencias) - 1, int(q * len(latencias)))] * 1000
+    return {
+        "peticiones": len(latencias),
+        "por_segundo": len(latencias) / duracion,
+        "p50": cuantil(0.50),
+        "p95": cuantil(0.95),
+        "p99": cuantil(0.99),
+        "media": statistics.fmean(latencias) * 1000 if latencias else 0.0,
+        "errores": errores,
+    }
+
+
+def ejecutar_modo(modo: str, args: argparse.Namespace, directorio: str) -> dict:
+    url_base = args.database_url or f"sqlite:///{os.path.join(directorio, f'carga_{modo}.db')}"
+    preparar_base(url_base, args)
+
+    puerto = puerto_libre()
+    entorno = dict(os.environ, DATABASE_URL=url_base, DB_ASYNC="1" if modo == "async" else "0")
+    servidor = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "app.main:app",
+         "--port", str(puerto), "--log-level", "warning", "--no-access-log"],
+        env=entorno
+    )
+    try:
+        return asyncio.run(generar_carga(f"http://127.0.0.1:{puerto}", args))
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=10)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    directorio = tempfile.mkdtemp(prefix="carga_tienda_")
+    resultados = {}
+    try:
+        for modo in args.modos.split(","):
+            print(f"Modo {modo}: {args.concurrencia} clientes durante {args.duracion:.0f}s...", flush=True)
+            resultados[modo] = ejecutar_modo(modo, args, directorio)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    print()
+    print(f"{'modo':<8}{'pet/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errores':>10}")
+    for modo, r in resultados.items():
+        print(f"{modo:<8}{r['por_segundo']:>10.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}{r['p99']:>10.1f}{r['errores']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
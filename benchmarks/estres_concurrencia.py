@@ -0,0 +1,173 @@
+"""
+Prueba de estrés de concurrencia para ventas y abastecimientos.
+
+Lanza varios hilos que registran ventas y abastecimientos al mismo tiempo sobre
+los mismos libros (cada hilo con su propia sesión, como los workers de gunicorn)
+y al final verifica que no se perdió stock ni saldo:
+
+- Ningún libro queda con stock negativo ni se vende más de lo disponible.
+- El stock final de cada libro coincide con el inicial más los abastecimientos
+  menos las ventas registradas.
+- Los movimientos de caja forman una sola cadena: cada saldo es el anterior
+  más o menos su monto, y la cabecera de saldo coincide con el último movimiento.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.estres_concurrencia --hilos 16 --operaciones 200
+
+Por defecto usa una base SQLite temporal; con --database-url puede apuntarse a
+otra base (por ejemplo PostgreSQL). Termina con código 1 si alguna verificación falla.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hilos", type=int, default=16, help="Número de hilos concurrentes")
+    parser.add_argument("--operaciones", type=int, default=200, help="Operaciones por hilo")
+    parser.add_argument("--libros", type=int, default=3, help="Libros sobre los que se concentran las operaciones")
+    parser.add_argument("--stock-inicial", type=int, default=50, help="Stock inicial de cada libro")
+    parser.add_argument("--saldo-inicial", type=float, default=500.0, help="Saldo inicial de caja")
+    parser.add_argument("--proporcion-ventas", type=float, default=0.7, help="Fracción de operaciones que son ventas")
+    parser.add_argument("--database-url", help="URL de base de datos (por defecto, SQLite temporal)")
+    parser.add_argument("--semilla", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        directorio = tempfile.mkdtemp(prefix="estres_tienda_")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directorio, 'estres.db')}"
+
+    # Importar la aplicación después de fijar DATABASE_URL
+    from fastapi import HTTPException
+    from app.database import SessionLocal, engine
+    from app.models import models
+    from app.schemas import schemas
+    from app.services import CajaService, TransaccionService
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+
+    isbns = [f"978{i:010d}" for i in range(1, args.libros + 1)]
+    with SessionLocal() as db:
+        db.add_all([
+            models.TipoTransaccion(id_tipo=1, nombre="VENTA"),
+            models.TipoTransaccion(id_tipo=2, nombre="ABASTECIMIENTO"),
+        ])
+        for isbn in isbns:
+            db.add(models.Libro(
+                ISBN=isbn,
+                titulo=f"Libro de estrés {isbn}",
+                precio_compra=7.0,
+                precio_venta=10.0,
+                cantidad_actual=args.stock_inicial
+            ))
+        db.commit()
+        CajaService.create_movimiento(db, schemas.CajaCreate(
+            tipo_movimiento="INGRESO", monto=args.saldo_inicial, saldo_actual=0
+        ))
+
+    resultados = Counter()
+    errores = []
+    bloqueo_resultados = threading.Lock()
+    barrera = threading.Barrier(args.hilos)
+
+    def trabajador(numero: int) -> None:
+        aleatorio = random.Random(args.semilla + numero)
+        barrera.wait()
+        for _ in range(args.operaciones):
+            tipo = 1 if aleatorio.random() < args.proporcion_ventas else 2
+            transaccion = schemas.TransaccionCreate(
+                ISBN=aleatorio.choice(isbns),
+                tipo_transaccion=tipo,
+                cantidad=aleatorio.randint(1, 3)
+            )
+            with SessionLocal() as db:
+                try:
+                    TransaccionService.create_transaccion(db, transaccion)
+                    clave = "ok"
+                except HTTPException as e:
+                    clave = f"rechazada_{e.status_code}"
+                    if e.status_code >= 500:
+                        with bloqueo_resultados:
+                            errores.append(e.detail)
+            with bloqueo_resultados:
+                resultados[clave] += 1
+
+    hilos = [threading.Thread(target=trabajador, args=(i,)) for i in range(args.hilos)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    total = args.hilos * args.operaciones
+    print(f"Operaciones: {total} en {duracion:.2f}s ({total / duracion:.1f} op/s) con {args.hilos} hilos")
+    for clave, cantidad in sorted(resultados.items()):
+        print(f"  {clave}: {cantidad}")
+    for detalle in errores[:5]:
+        print(f"  error: {detalle}")
+
+    fallas = verificar_invariantes(SessionLocal, models, isbns, args.stock_inicial)
+    for falla in fallas:
+        print(f"FALLA: {falla}")
+    if not fallas:
+        print("OK: no se perdió stock ni saldo")
+    return 1 if fallas else 0
+
+
+def verificar_invariantes(SessionLocal, models, isbns, stock_inicial):
+    """Devuelve la lista de invariantes de stock y saldo que no se cumplen."""
+    fallas = []
+    with SessionLocal() as db:
+        for isbn in isbns:
+            libro = db.get(models.Libro, isbn)
+            movimientos = Counter()
+            for tipo, cantidad in db.query(
+                models.Transaccion.tipo_transaccion, models.Transaccion.cantidad
+            ).filter(models.Transaccion.ISBN == isbn):
+                movimientos[tipo] += cantidad
+
+            esperado = stock_inicial - movimientos[1] + movimientos[2]
+            if libro.cantidad_actual < 0:
+                fallas.append(f"{isbn}: stock negativo ({libro.cantidad_actual})")
+            if libro.cantidad_actual != esperado:
+                fallas.append(f"{isbn}: stock {libro.cantidad_actual}, esperado {esperado}")
+
+        saldo = 0.0
+        cadena_rota = 0
+        for movimiento in db.query(models.Caja).order_by(models.Caja.id_movimiento):
+            saldo += movimiento.monto if movimiento.tipo_movimiento == "INGRESO" else -movimiento.monto
+            if abs(movimiento.saldo_actual - saldo) > 1e-6:
+                cadena_rota += 1
+            if movimiento.saldo_actual < -1e-6:
+                fallas.append(f"caja: saldo negativo en el movimiento {movimiento.id_movimiento}")
+        if cadena_rota:
+            fallas.append(f"caja: {cadena_rota} movimientos no encadenan con el saldo anterior")
+
+        cabecera = db.get(models.SaldoCaja, 1)
+        if abs(cabecera.saldo_actual - saldo) > 1e-6:
+            fallas.append(f"caja: cabecera {cabecera.saldo_actual}, saldo calculado {saldo}")
+
+        transacciones = db.query(models.Transaccion).count()
+        movimientos_transaccion = db.query(models.Caja).filter(models.Caja.id_transaccion.isnot(None)).count()
+        if transacciones != movimientos_transaccion:
+            fallas.append(f"caja: {transacciones} transacciones pero {movimientos_transaccion} movimientos asociados")
+    return fallas
+
+
+if __name__ == "__main__":
+    sys.exit(main())
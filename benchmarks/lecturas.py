@@ -0,0 +1,114 @@
+"""
+Benchmark de las lecturas de los listados: entidades del ORM contra filas de
+solo lectura (app/lecturas.py).
+
+Siembra una base SQLite temporal y, para libros, transacciones y movimientos de
+caja, lee la misma página como entidades (`db.query(Modelo)`, que pasan por el
+mapa de identidad) y como filas con `__slots__` (lo que hacen los servicios).
+Reporta el tiempo y la memoria asignada por fila de cada forma; la memoria se
+mide con tracemalloc mientras la página sigue en uso, en una sesión nueva.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.lecturas --filas 5000 --repeticiones 10
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.suite import sembrar
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=5000, help="Filas leídas por página")
+    parser.add_argument("--repeticiones", type=int, default=10, help="Lecturas medidas de cada forma")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Imprimir los resultados como JSON")
+    return parser.parse_args(argv)
+
+
+def medir(fabrica_sesiones, leer, repeticiones: int) -> dict:
+    """Tiempo mediano y memoria asignada al leer una página en una sesión nueva."""
+    with fabrica_sesiones() as db:
+        filas = len(leer(db))
+    tiempos = []
+    for _ in range(repeticiones):
+        with fabrica_sesiones() as db:
+            inicio = time.perf_counter()
+            leer(db)
+            tiempos.append(time.perf_counter() - inicio)
+    with fabrica_sesiones() as db:
+        tracemalloc.start()
+        pagina = leer(db)
+        memoria, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del pagina
+    return {
+        "filas": filas,
+        "us_por_fila": round(statistics.median(tiempos) / max(filas, 1) * 1e6, 2),
+        "bytes_por_fila": round(memoria / max(filas, 1)),
+    }
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    directorio = tempfile.mkdtemp(prefix="lecturas_tienda_")
+    try:
+        url = f"sqlite:///{os.path.join(directorio, 'lecturas.db')}"
+        sembrar(url, argparse.Namespace(semilla=args.semilla, libros=args.filas, transacciones=args.filas))
+        os.environ["DATABASE_URL"] = url
+
+        # Importar la aplicación después de fijar DATABASE_URL
+        from app.database import SessionLocal
+        from app.models import models
+        from app.services import CajaService, LibroService, TransaccionService
+
+        limite = args.filas
+        casos = {
+            "libros": (
+                lambda db: db.query(models.Libro).order_by(models.Libro.ISBN).limit(limite).all(),
+                lambda db: LibroService.get_libros(db, limit=limite),
+            ),
+            "transacciones": (
+                lambda db: db.query(models.Transaccion).order_by(
+                    models.Transaccion.fecha_transaccion.desc(), models.Transaccion.id_transaccion.desc()
+                ).limit(limite).all(),
+                lambda db: TransaccionService.get_transacciones(db, limit=limite),
+            ),
+            "caja": (
+                lambda db: db.query(models.Caja).order_by(
+                    models.Caja.fecha_movimiento.desc(), models.Caja.id_movimiento.desc()
+                ).limit(limite).all(),
+                lambda db: CajaService.get_movimientos(db, limit=limite),
+            ),
+        }
+        resultados = {
+            nombre: {
+                "entidades": medir(SessionLocal, entidades, args.repeticiones),
+                "filas": medir(SessionLocal, filas, args.repeticiones),
+            }
+            for nombre, (entidades, filas) in casos.items()
+        }
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+        return 0
+    print(f"{'listado':<15}{'filas':>7}{'entidad µs':>12}{'fila µs':>10}{'entidad B':>11}{'fila B':>9}")
+    for nombre, resultado in resultados.items():
+        entidades, filas = resultado["entidades"], resultado["filas"]
+        print(f"{nombre:<15}{filas['filas']:>7}{entidades['us_por_fila']:>12.2f}{filas['us_por_fila']:>10.2f}"
+              f"{entidades['bytes_por_fila']:>11}{filas['bytes_por_fila']:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Benchmark de commit agrupado: transacciones por segundo según el tamaño de lote.
+
+Registra ventas y abastecimientos desde varios hilos, primero cada una con su
+propio commit (TransaccionService.create_transaccion, como sin la cola) y
+después a través de ColaEscritura con distintos tamaños máximos de lote, y
+muestra para cada configuración las transacciones por segundo, la latencia
+p50/p95 que ve cada petición y el tamaño medio de los lotes confirmados.
+
+Al terminar verifica que no se haya perdido stock ni saldo.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.lotes_escritura --hilos 32 --operaciones 100 --lotes 1,4,16,64
+
+Por defecto usa una base SQLite temporal con el perfil de producción
+(synchronous=NORMAL); --synchronous FULL muestra el efecto con un fsync por
+commit. Con --database-url puede apuntarse a PostgreSQL. Termina con código 1 si
+alguna verificación falla.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hilos", type=int, default=32, help="Hilos que registran transacciones a la vez")
+    parser.add_argument("--operaciones", type=int, default=100, help="Transacciones por hilo y configuración")
+    parser.add_argument("--lotes", default="1,4,16,64", help="Tamaños máximos de lote a medir, separados por comas")
+    parser.add_argument("--espera-ms", type=float, default=2.0, help="Espera máxima para juntar un lote (ms)")
+    parser.add_argument("--libros", type=int, default=20, help="Libros del catálogo de prueba")
+    parser.add_argument("--synchronous", help="PRAGMA synchronous de SQLite (por defecto, el del perfil)")
+    parser.add_argument("--database-url", help="URL de base de datos (por defecto, SQLite temporal)")
+    parser.add_argument("--semilla", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        directorio = tempfile.mkdtemp(prefix="lotes_tienda_")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directorio, 'lotes.db')}"
+    if args.synchronous:
+        os.environ["SQLITE_SYNCHRONOUS"] = args.synchronous
+
+    # Importar la aplicación después de fijar DATABASE_URL
+    from fastapi import HTTPException
+    from sqlalchemy.orm import sessionmaker
+    from app.cola_escritura import ColaEscritura
+    from app.database import SessionLocal, crear_engine_escritura, engine
+    from app.migraciones import aplicar_migraciones
+    from app.models import models
+    from app.schemas import schemas
+    from app.services import CajaService, TransaccionService
+    from benchmarks.estres_concurrencia import verificar_invariantes
+
+    models.Base.metadata.drop_all(bind=engine)
+    aplicar_migraciones(engine)
+
+    isbns = [f"978{i:010d}" for i in range(1, args.libros + 1)]
+    stock_inicial = 1_000_000
+    with SessionLocal() as db:
+        for isbn in isbns:
+            db.add(models.Libro(
+                ISBN=isbn, titulo=f"Libro {isbn}", precio_compra=7.0, precio_venta=10.0, cantidad_actual=stock_inicial
+            ))
+        db.commit()
+        CajaService.inicializar(db)
+        CajaService.create_movimiento(db, schemas.CajaCreate(tipo_movimiento="INGRESO", monto=1e7, saldo_actual=0))
+
+    fabrica_escritura = sessionmaker(bind=crear_engine_escritura(), autoflush=False, expire_on_commit=False)
+
+    def medir(registrar) -> tuple:
+        """Lanza los hilos con la función de registro y devuelve (tx/s, latencias, errores)."""
+        latencias, errores = [], []
+        bloqueo = threading.Lock()
+        barrera = threading.Barrier(args.hilos + 1)
+
+        def trabajador(numero: int) -> None:
+            aleatorio = random.Random(args.semilla + numero)
+            propias = []
+            fallos = 0
+            barrera.wait()
+            for _ in range(args.operaciones):
+                transaccion = schemas.TransaccionCreate(
+                    ISBN=aleatorio.choice(isbns),
+                    tipo_transaccion=1 if aleatorio.random() < 0.8 else 2,
+                    cantidad=aleatorio.randint(1, 3)
+                )
+                inicio = time.perf_counter()
+                try:
+                    registrar(transaccion)
+                except HTTPException:
+                    fallos += 1
+                propias.append(time.perf_counter() - inicio)
+            with bloqueo:
+                latencias.extend(propias)
+                errores.append(fallos)
+
+        hilos = [threading.Thread(target=trabajador, args=(n,)) for n in range(args.hilos)]
+        for hilo in hilos:
+            hilo.start()
+        barrera.wait()
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+        latencias.sort()
+        return len(latencias) / duracion, latencias, sum(errores)
+
+    def sin_cola(transaccion) -> None:
+        with SessionLocal() as db:
+            TransaccionService.create_transaccion(db, transaccion)
+
+    resultados = [("sin cola", "-") + medir(sin_cola)]
+
+    for max_lote in (int(valor) for valor in args.lotes.split(",")):
+        cola = ColaEscritura(fabrica_escritura, max_lote=max_lote, espera_maxima=args.espera_ms / 1000)
+        cola.iniciar()
+        try:
+            medicion = medir(lambda transaccion: cola.enviar(TransaccionService.aplicar_transaccion, transaccion))
+        finally:
+            cola.detener()
+        resultados.append((f"lote {max_lote}", cola.estadisticas()["operaciones_por_lote"]) + medicion)
+
+    cuantil = lambda latencias, q: latencias[min(len(latencias) - 1, int(q * len(latencias)))] * 1000
+    print(f"{args.hilos} hilos x {args.operaciones} transacciones, espera máxima {args.espera_ms} ms")
+    print(f"{'configuración':<14}{'tx/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'por lote':>10}{'rechazos':>10}")
+    for nombre, por_lote, tps, latencias, errores in resultados:
+        print(f"{nombre:<14}{tps:>10.1f}{cuantil(latencias, 0.5):>10.2f}{cuantil(latencias, 0.95):>10.2f}"
+              f"{por_lote:>10}{errores:>10}")
+
+    fallas = verificar_invariantes(SessionLocal, models, isbns, stock_inicial)
+    if fallas:
+        print("\nFALLAS:")
+        for falla in fallas:
+            print(f"  - {falla}")
+        return 1
+    print("\nOK: no se perdió stock ni saldo")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
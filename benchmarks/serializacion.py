@@ -0,0 +1,124 @@
+"""
+Benchmark de los listados grandes con y sin respuestas rápidas (app/respuestas.py).
+
+Siembra una base SQLite temporal y mide, en un proceso con RESPUESTAS_RAPIDAS=0
+y en otro con RESPUESTAS_RAPIDAS=1, el tiempo y la CPU por petición de los
+listados de libros, transacciones y movimientos de caja para cada tamaño de
+página. Las peticiones se hacen en proceso (sin red), así que la diferencia es
+la de la consulta, la validación y la codificación del JSON. También verifica
+que ambos caminos devuelvan exactamente el mismo JSON.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.serializacion --paginas 100,1000 --repeticiones 30
+
+Termina con código 1 si algún listado difiere entre los dos caminos.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.suite import sembrar
+
+LISTADOS = {
+    "libros": "/api/libros/",
+    "transacciones": "/api/transacciones/",
+    "caja": "/api/caja/",
+}
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--libros", type=int, default=5000, help="Libros del catálogo sembrado")
+    parser.add_argument("--transacciones", type=int, default=5000, help="Transacciones del historial sembrado")
+    parser.add_argument("--paginas", default="100,1000", help="Tamaños de página, separados por comas")
+    parser.add_argument("--repeticiones", type=int, default=30, help="Peticiones medidas por listado y página")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Imprimir los resultados como JSON")
+    parser.add_argument("--medir", choices=("normal", "rapido"), help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def medir(args: argparse.Namespace) -> Dict[str, dict]:
+    """Mide los listados en este proceso (con el RESPUESTAS_RAPIDAS del entorno)."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    resultados = {}
+    with TestClient(app) as cliente:
+        for nombre, ruta in LISTADOS.items():
+            for tamano in (int(valor) for valor in args.paginas.split(",")):
+                parametros = {"limit": tamano}
+                respuesta = cliente.get(ruta, params=parametros)
+                respuesta.raise_for_status()
+                tiempos: List[float] = []
+                cpu_inicio = time.process_time()
+                for _ in range(args.repeticiones):
+                    inicio = time.perf_counter()
+                    cliente.get(ruta, params=parametros).raise_for_status()
+                    tiempos.append(time.perf_counter() - inicio)
+                cpu = time.process_time() - cpu_inicio
+                resultados[f"{nombre}/{tamano}"] = {
+                    "filas": len(respuesta.json()),
+                    "mediana_ms": round(statistics.median(tiempos) * 1000, 3),
+                    "cpu_ms": round(cpu / args.repeticiones * 1000, 3),
+                    "bytes": len(respuesta.content),
+                    "sha256": hashlib.sha256(respuesta.content).hexdigest(),
+                }
+    return resultados
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.medir:
+        print(json.dumps(medir(args)))
+        return 0
+
+    directorio = tempfile.mkdtemp(prefix="serializacion_tienda_")
+    try:
+        url = f"sqlite:///{os.path.join(directorio, 'serializacion.db')}"
+        sembrar(url, args)
+        caminos = {}
+        for modo in ("normal", "rapido"):
+            entorno = dict(
+                os.environ, DATABASE_URL=url, DB_ASYNC="0", INSTRUMENTACION="0",
+                RESPUESTAS_RAPIDAS="1" if modo == "rapido" else "0"
+            )
+            salida = subprocess.run(
+                [sys.executable, "-W", "ignore", "-m", "benchmarks.serializacion", "--medir", modo,
+                 "--paginas", args.paginas, "--repeticiones", str(args.repeticiones)],
+                check=True, env=entorno, capture_output=True, text=True
+            ).stdout
+            caminos[modo] = json.loads(salida.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    distintos = [
+        clave for clave in caminos["normal"]
+        if caminos["normal"][clave]["sha256"] != caminos["rapido"][clave]["sha256"]
+    ]
+    if args.json:
+        print(json.dumps({**caminos, "distintos": distintos}, indent=2))
+    else:
+        print(f"{'listado/página':<22}{'filas':>7}{'normal ms':>11}{'rápido ms':>11}"
+              f"{'normal CPU':>12}{'rápido CPU':>12}{'mejora':>9}")
+        for clave, normal in caminos["normal"].items():
+            rapido = caminos["rapido"][clave]
+            mejora = normal["cpu_ms"] / rapido["cpu_ms"] if rapido["cpu_ms"] else float("inf")
+            print(f"{clave:<22}{normal['filas']:>7}{normal['mediana_ms']:>11.2f}{rapido['mediana_ms']:>11.2f}"
+                  f"{normal['cpu_ms']:>12.2f}{rapido['cpu_ms']:>12.2f}{mejora:>8.1f}x")
+        for clave in distintos:
+            print(f"ERROR: {clave} devuelve un JSON distinto en el camino rápido")
+    return 1 if distintos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
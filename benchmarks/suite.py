@@ -0,0 +1,338 @@
+"""
+Suite de benchmarks de extremo a extremo de la API.
+
+Siembra un catálogo y un historial sintéticos en una base nueva, levanta la
+aplicación (en el mismo proceso, a través de ASGI, o con uvicorn) y la somete a
+una mezcla de peticiones con la concurrencia indicada. Para cada endpoint
+muestra peticiones por segundo, latencias p50/p95/p99 y errores, y compara el
+resultado con la línea base guardada para la misma configuración: un p95 o un
+throughput que empeora más que la tolerancia se marca como regresión.
+
+Mezclas disponibles (--mezcla):
+
+- mixta: ventas, abastecimientos, lecturas de libros, del catálogo, del saldo,
+  del historial y búsquedas
+- lecturas: solo lecturas
+- escrituras: solo ventas y abastecimientos
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.suite --mezcla mixta --concurrencia 32 --duracion 10
+    python -m benchmarks.suite --modo uvicorn --workers 2 --cola
+    python -m benchmarks.suite --guardar-base   # reemplaza la línea base de esta configuración
+
+Por defecto usa una base SQLite temporal; con --database-url puede apuntarse a
+PostgreSQL (la base se reinicia). Las líneas base se guardan en
+benchmarks/lineas_base.json, una por combinación de mezcla, modo, workers, cola
+y concurrencia, y solo son comparables en la misma máquina. Termina con código 1
+si hay alguna regresión.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.carga_async import esperar_servidor, puerto_libre
+
+ARCHIVO_LINEAS_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lineas_base.json")
+
+# Palabras de los títulos sintéticos (también se usan como términos de búsqueda)
+PALABRAS = (
+    "amor guerra noche canción sombra viento fuego hielo ciudad río mar luna sol "
+    "jardín secreto misterio memoria olvido sueño verdad silencio camino historia"
+).split()
+
+# Peso de cada operación en cada mezcla
+MEZCLAS = {
+    "mixta": {
+        "venta": 10, "abastecimiento": 5, "libro": 30, "catalogo": 15,
+        "saldo": 15, "transacciones": 15, "busqueda": 10,
+    },
+    "lecturas": {"libro": 35, "catalogo": 20, "saldo": 15, "transacciones": 15, "busqueda": 15},
+    "escrituras": {"venta": 70, "abastecimiento": 30},
+}
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mezcla", choices=sorted(MEZCLAS), default="mixta", help="Mezcla de operaciones")
+    parser.add_argument("--modo", choices=("proceso", "uvicorn"), default="proceso",
+                        help="Aplicación en este proceso (ASGI) o servida por uvicorn")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn (solo --modo uvicorn)")
+    parser.add_argument("--cola", action="store_true", help="Activar la cola de escritura (COLA_ESCRITURA=1)")
+    parser.add_argument("--concurrencia", type=int, default=32, help="Clientes concurrentes")
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos de carga medidos")
+    parser.add_argument("--calentamiento", type=float, default=2.0, help="Segundos de carga previos, sin medir")
+    parser.add_argument("--libros", type=int, default=1000, help="Libros en el catálogo sintético")
+    parser.add_argument("--transacciones", type=int, default=5000, help="Transacciones en el historial sintético")
+    parser.add_argument("--database-url", help="URL de base de datos (por defecto, SQLite temporal)")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="Empeoramiento relativo de p95 o throughput aceptado frente a la línea base")
+    parser.add_argument("--lineas-base", default=ARCHIVO_LINEAS_BASE, help="Archivo JSON de líneas base")
+    parser.add_argument("--guardar-base", action="store_true", help="Guardar el resultado como nueva línea base")
+    parser.add_argument("--json", help="Escribir también el resultado en este archivo")
+    return parser.parse_args(argv)
+
+
+def sembrar(url: str, args: argparse.Namespace) -> None:
+    """Crea el esquema y siembra catálogo, saldo e historial en un proceso aparte."""
+    codigo = f"""
+import random
+from app.database import SessionLocal, engine
+from app.migraciones import aplicar_migraciones
+from app.models import models
+from app.schemas import schemas
+from app.services import BusquedaService, CajaService, EventoService, TransaccionService
+
+models.Base.metadata.drop_all(bind=engine)
+aplicar_migraciones(engine)
+aleatorio = random.Random({args.semilla})
+palabras = {PALABRAS!r}
+with SessionLocal() as db:
+    libros = [
+        (f"978{{i:010d}}", " ".join(aleatorio.choice(palabras) for _ in range(aleatorio.randint(2, 5))).capitalize())
+        for i in range(1, {args.libros} + 1)
+    ]
+    db.add_all(models.Libro(ISBN=isbn, titulo=titulo, precio_compra=7.0, precio_venta=10.0,
+                            cantidad_actual=1000000) for isbn, titulo in libros)
+    BusquedaService.agregar(db, libros)
+    db.commit()
+    CajaService.inicializar(db)
+    EventoService.inicializar(db)
+    CajaService.create_movimiento(db, schemas.CajaCreate(tipo_movimiento="INGRESO", monto=1e9, saldo_actual=0))
+    restantes = {args.transacciones}
+    while restantes > 0:
+        lineas = [
+            schemas.TransaccionCreate(ISBN=f"978{{aleatorio.randint(1, {args.libros}):010d}}",
+                                      tipo_transaccion=aleatorio.choice((1, 2)), cantidad=1)
+            for _ in range(min(restantes, 100))
+        ]
+        TransaccionService.create_transacciones_lote(db, schemas.TransaccionLoteCreate(lineas=lineas))
+        restantes -= len(lineas)
+"""
+    entorno = dict(os.environ, DATABASE_URL=url, DB_ASYNC="0")
+    subprocess.run([sys.executable, "-W", "ignore", "-c", codigo], check=True, env=entorno)
+
+
+def operaciones(args: argparse.Namespace) -> Dict[str, Callable[[random.Random], Tuple[str, str, dict]]]:
+    """Cada operación devuelve método, ruta y argumentos de la petición."""
+    isbn = lambda aleatorio: f"978{aleatorio.randint(1, args.libros):010d}"
+    return {
+        "venta": lambda a: ("POST", "/api/transacciones/",
+                            {"json": {"ISBN": isbn(a), "tipo_transaccion": 1, "cantidad": 1}}),
+        "abastecimiento": lambda a: ("POST", "/api/transacciones/",
+                                     {"json": {"ISBN": isbn(a), "tipo_transaccion": 2, "cantidad": 1}}),
+        "libro": lambda a: ("GET", f"/api/libros/{isbn(a)}", {}),
+        "catalogo": lambda a: ("GET", "/api/libros/", {"params": {"limit": 50, "skip": a.randint(0, args.libros)}}),
+        "saldo": lambda a: ("GET", "/api/caja/saldo", {}),
+        "transacciones": lambda a: ("GET", "/api/transacciones/", {"params": {"limit": 50}}),
+        "busqueda": lambda a: ("GET", "/api/libros/buscar", {"params": {"q": a.choice(PALABRAS)[:a.randint(3, 6)]}}),
+    }
+
+
+def percentil(ordenadas: List[float], q: float) -> float:
+    """Percentil q (0 a 1) de una lista ordenada de segundos, en milisegundos."""
+    if not ordenadas:
+        return 0.0
+    return ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))] * 1000
+
+
+async def generar_carga(cliente, args: argparse.Namespace) -> Dict[str, dict]:
+    """
+    Lanza los clientes concurrentes y devuelve las estadísticas de cada operación
+    (con el primer error de cada una en "ejemplo_error").
+    """
+    pesos = MEZCLAS[args.mezcla]
+    nombres, valores = list(pesos), list(pesos.values())
+    generadores = operaciones(args)
+    latencias: Dict[str, List[float]] = defaultdict(list)
+    errores: Dict[str, int] = defaultdict(int)
+    ejemplos_error: Dict[str, str] = {}
+    inicio_medicion = time.monotonic() + args.calentamiento
+    fin = inicio_medicion + args.duracion
+
+    async def cliente_carga(numero: int) -> None:
+        aleatorio = random.Random(args.semilla * 1000 + numero)
+        while (ahora := time.monotonic()) < fin:
+            nombre = aleatorio.choices(nombres, valores)[0]
+            metodo, ruta, opciones = generadores[nombre](aleatorio)
+            inicio = time.perf_counter()
+            try:
+                respuesta = await cliente.request(metodo, ruta, **opciones)
+                error = f"{respuesta.status_code} {respuesta.text[:200]}" if respuesta.status_code >= 400 else None
+            except Exception as e:
+                error = repr(e)
+            if ahora >= inicio_medicion:
+                latencias[nombre].append(time.perf_counter() - inicio)
+                if error:
+                    errores[nombre] += 1
+                    ejemplos_error.setdefault(nombre, error)
+
+    await asyncio.gather(*(cliente_carga(numero) for numero in range(args.concurrencia)))
+
+    resultados = {}
+    for nombre in nombres + ["total"]:
+        medidas = sorted(
+            (medida for lista in latencias.values() for medida in lista) if nombre == "total" else latencias[nombre]
+        )
+        if not medidas:
+            continue
+        resultados[nombre] = {
+            "peticiones": len(medidas),
+            "por_segundo": round(len(medidas) / args.duracion, 1),
+            "p50": round(percentil(medidas, 0.50), 2),
+            "p95": round(percentil(medidas, 0.95), 2),
+            "p99": round(percentil(medidas, 0.99), 2),
+            "errores": sum(errores.values()) if nombre == "total" else errores[nombre],
+        }
+        if nombre in ejemplos_error:
+            resultados[nombre]["ejemplo_error"] = ejemplos_error[nombre]
+    return resultados
+
+
+async def ejecutar_en_proceso(args: argparse.Namespace) -> Dict[str, dict]:
+    import httpx
+    from app.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://suite",
+                                 timeout=60.0) as cliente:
+        return await generar_carga(cliente, args)
+
+
+async def ejecutar_con_uvicorn(url: str, args: argparse.Namespace) -> Dict[str, dict]:
+    import httpx
+
+    limites = httpx.Limits(max_connections=args.concurrencia, max_keepalive_connections=args.concurrencia)
+    async with httpx.AsyncClient(base_url=url, timeout=60.0, limits=limites) as cliente:
+        await esperar_servidor(cliente, url)
+        return await generar_carga(cliente, args)
+
+
+def ejecutar(args: argparse.Namespace, url_base: str) -> Dict[str, dict]:
+    """Siembra la base y corre la carga en el modo indicado."""
+    sembrar(url_base, args)
+    entorno = {"DATABASE_URL": url_base, "DB_ASYNC": "0", "COLA_ESCRITURA": "1" if args.cola else "0"}
+
+    if args.modo == "proceso":
+        # La aplicación lee la configuración al importarse
+        os.environ.update(entorno)
+        return asyncio.run(ejecutar_en_proceso(args))
+
+    puerto = puerto_libre()
+    servidor = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "app.main:app", "--port", str(puerto),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        env=dict(os.environ, **entorno)
+    )
+    try:
+        return asyncio.run(ejecutar_con_uvicorn(f"http://127.0.0.1:{puerto}", args))
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=30)
+
+
+def clave_configuracion(args: argparse.Namespace) -> str:
+    """Configuraciones con la misma clave son comparables entre sí."""
+    workers = args.workers if args.modo == "uvicorn" else 1
+    return f"{args.mezcla}/{args.modo}/w{workers}/{'cola' if args.cola else 'directo'}/c{args.concurrencia}"
+
+
+def comparar(resultados: Dict[str, dict], base: Dict[str, dict], tolerancia: float) -> List[str]:
+    """
+    Regresiones frente a la línea base: p95 más alto o throughput más bajo que la
+    tolerancia, o una proporción de errores mayor.
+    """
+    regresiones = []
+    for nombre, actual in resultados.items():
+        anterior = base.get(nombre)
+        if anterior is None:
+            continue
+        if anterior["p95"] > 0 and actual["p95"] > anterior["p95"] * (1 + tolerancia):
+            regresiones.append(f"{nombre}: p95 {actual['p95']:.1f} ms (base {anterior['p95']:.1f} ms)")
+        if actual["por_segundo"] < anterior["por_segundo"] * (1 - tolerancia):
+            regresiones.append(
+                f"{nombre}: {actual['por_segundo']:.1f} pet/s (base {anterior['por_segundo']:.1f} pet/s)"
+            )
+        # Un error aislado (por ejemplo, un bloqueo que agotó busy_timeout) no es una regresión
+        if actual["errores"] / actual["peticiones"] > anterior["errores"] / anterior["peticiones"] + 0.001:
+            regresiones.append(f"{nombre}: {actual['errores']} errores (base {anterior['errores']})")
+    return regresiones
+
+
+def mostrar(resultados: Dict[str, dict], base: Dict[str, dict]) -> None:
+    print(f"{'operación':<16}{'pet/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errores':>9}{'p95 base':>10}")
+    for nombre, r in resultados.items():
+        anterior = base.get(nombre, {}).get("p95")
+        columna_base = f"{anterior:>10.1f}" if anterior is not None else f"{'-':>10}"
+        print(f"{nombre:<16}{r['por_segundo']:>10.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}{r['p99']:>10.1f}"
+              f"{r['errores']:>9}{columna_base}")
+    for nombre, r in resultados.items():
+        if "ejemplo_error" in r:
+            print(f"  {nombre}: {r['ejemplo_error']}")
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    directorio = tempfile.mkdtemp(prefix="suite_tienda_")
+    clave = clave_configuracion(args)
+    try:
+        print(f"{clave}: {args.libros} libros, {args.transacciones} transacciones, "
+              f"{args.duracion:.0f}s de carga (+{args.calentamiento:.0f}s de calentamiento)...", flush=True)
+        resultados = ejecutar(args, args.database_url or f"sqlite:///{os.path.join(directorio, 'suite.db')}")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    lineas_base = {}
+    if os.path.exists(args.lineas_base):
+        with open(args.lineas_base, encoding="utf-8") as archivo:
+            lineas_base = json.load(archivo)
+    base = lineas_base.get(clave, {}).get("resultados", {})
+
+    print()
+    mostrar(resultados, base)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump({"configuracion": clave, "resultados": resultados}, archivo, indent=2)
+
+    if args.guardar_base:
+        lineas_base[clave] = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "maquina": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPU, Python {platform.python_version()}",
+            "libros": args.libros,
+            "transacciones": args.transacciones,
+            "duracion": args.duracion,
+            "resultados": resultados,
+        }
+        with open(args.lineas_base, "w", encoding="utf-8") as archivo:
+            json.dump(lineas_base, archivo, indent=2, sort_keys=True)
+            archivo.write("\n")
+        print(f"\nLínea base guardada para {clave}")
+        return 0
+
+    if not base:
+        print(f"\nNo hay línea base para {clave} (use --guardar-base para crearla)")
+        return 0
+
+    regresiones = comparar(resultados, base, args.tolerancia)
+    if regresiones:
+        print(f"\nRegresiones (tolerancia {args.tolerancia:.0%}):")
+        for regresion in regresiones:
+            print(f"  - {regresion}")
+        return 1
+    print(f"\nSin regresiones frente a la línea base (tolerancia {args.tolerancia:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Micro-benchmark del camino de una venta (TransaccionService.create_transaccion).
+
+Siembra una base SQLite temporal y registra ventas de a una, cada una en su
+propia sesión como en un endpoint, y reporta por venta el tiempo de CPU del
+proceso, el tiempo total y el número de sentencias SQL ejecutadas. Antes de
+medir se hace una venta de cada libro, para que la caché del catálogo y las
+filas de velocidad de ventas ya existan, como en un servidor en marcha.
+
+Con --comparar-con se mide también el código de `app/` de otra revisión de git
+(por ejemplo, la anterior a un cambio) sobre una base sembrada igual, y se
+muestran ambas mediciones lado a lado.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.venta --ventas 2000
+    python -m benchmarks.venta --ventas 2000 --comparar-con HEAD~1
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ventas", type=int, default=2000, help="Ventas medidas")
+    parser.add_argument("--libros", type=int, default=100, help="Libros sobre los que se reparten las ventas")
+    parser.add_argument("--comparar-con", metavar="REVISION", help="Revisión de git con la que comparar")
+    parser.add_argument("--json", action="store_true", help="Imprimir los resultados como JSON")
+    parser.add_argument("--medir", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def medir(args: argparse.Namespace) -> dict:
+    """Siembra la base de DATABASE_URL y mide las ventas con el `app` importable."""
+    from sqlalchemy import event
+    from app.database import SessionLocal, engine
+    from app.models import models
+    from app.schemas import schemas
+    from app.services import CajaService, TransaccionService
+
+    models.Base.metadata.create_all(bind=engine)
+    isbns = [f"978{i:010d}" for i in range(1, args.libros + 1)]
+    with SessionLocal() as db:
+        db.add_all([
+            models.TipoTransaccion(id_tipo=1, nombre="VENTA"),
+            models.TipoTransaccion(id_tipo=2, nombre="ABASTECIMIENTO"),
+        ])
+        db.add_all(
+            models.Libro(ISBN=isbn, titulo=f"Libro {isbn}", precio_compra=7.0, precio_venta=10.0,
+                         cantidad_actual=10 * args.ventas)
+            for isbn in isbns
+        )
+        db.commit()
+        CajaService.create_movimiento(db, schemas.CajaCreate(tipo_movimiento="INGRESO", monto=1e6, saldo_actual=0))
+
+    ventas = [
+        schemas.TransaccionCreate(ISBN=isbns[numero % len(isbns)], tipo_transaccion=1, cantidad=1)
+        for numero in range(len(isbns) + args.ventas)
+    ]
+    for venta in ventas[:len(isbns)]:
+        with SessionLocal() as db:
+            TransaccionService.create_transaccion(db, venta)
+
+    sentencias = 0
+
+    def contar(*_):
+        nonlocal sentencias
+        sentencias += 1
+
+    event.listen(engine, "after_cursor_execute", contar)
+    cpu = time.process_time()
+    inicio = time.perf_counter()
+    for venta in ventas[len(isbns):]:
+        with SessionLocal() as db:
+            TransaccionService.create_transaccion(db, venta)
+    total = time.perf_counter() - inicio
+    cpu = time.process_time() - cpu
+    event.remove(engine, "after_cursor_execute", contar)
+
+    return {
+        "ventas": args.ventas,
+        "cpu_us_por_venta": round(cpu / args.ventas * 1e6, 1),
+        "total_us_por_venta": round(total / args.ventas * 1e6, 1),
+        "sentencias_por_venta": round(sentencias / args.ventas, 2),
+    }
+
+
+def ejecutar(raiz: Path, args: argparse.Namespace) -> dict:
+    """Mide en un proceso aparte con el `app` de la raíz indicada y una base nueva."""
+    directorio = tempfile.mkdtemp(prefix="venta_tienda_")
+    try:
+        entorno = dict(
+            os.environ,
+            PYTHONPATH=str(raiz),
+            DATABASE_URL=f"sqlite:///{os.path.join(directorio, 'venta.db')}",
+            DB_ASYNC="0",
+            COLA_ESCRITURA="0",
+        )
+        salida = subprocess.run(
+            [sys.executable, "-W", "ignore", str(Path(__file__).resolve()), "--medir",
+             "--ventas", str(args.ventas), "--libros", str(args.libros)],
+            cwd=raiz, env=entorno, check=True, capture_output=True, text=True
+        ).stdout
+        return json.loads(salida.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def extraer_revision(revision: str, destino: str) -> Path:
+    """Extrae el directorio app/ de una revisión de git en un directorio temporal."""
+    archivo = subprocess.run(
+        ["git", "archive", "--format=tar", revision, "app"], cwd=RAIZ, check=True, capture_output=True
+    ).stdout
+    with tarfile.open(fileobj=io.BytesIO(archivo)) as tar:
+        tar.extractall(destino)
+    return Path(destino)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.medir:
+        print(json.dumps(medir(args)))
+        return 0
+
+    resultados = {}
+    if args.comparar_con:
+        directorio = tempfile.mkdtemp(prefix="venta_revision_")
+        try:
+            resultados[args.comparar_con] = ejecutar(extraer_revision(args.comparar_con, directorio), args)
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+    resultados["actual"] = ejecutar(RAIZ, args)
+
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+        return 0
+    print(f"{'código':<14}{'CPU µs/venta':>14}{'total µs/venta':>16}{'sentencias/venta':>18}")
+    for nombre, resultado in resultados.items():
+        print(f"{nombre:<14}{resultado['cpu_us_por_venta']:>14.1f}{resultado['total_us_por_venta']:>16.1f}"
+              f"{resultado['sentencias_por_venta']:>18.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
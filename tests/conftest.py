@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# La aplicación abre la base al importarse: se apunta a un archivo temporal antes
+DIRECTORIO_PRUEBAS = tempfile.mkdtemp(prefix="tienda_libros_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DIRECTORIO_PRUEBAS, 'pruebas.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+@pytest.fixture
+def cliente():
+    with TestClient(app) as cliente:
+        yield cliente
@@ -0,0 +1,35 @@
+def test_resumen_con_rango_de_fechas_invertido(cliente):
+    respuesta = cliente.get("/api/caja/resumen", params={
+        "fecha_desde": "2024-03-10",
+        "fecha_hasta": "2024-03-01",
+    })
+    assert respuesta.status_code == 400
+    assert respuesta.json()["detail"] == "fecha_desde no puede ser posterior a fecha_hasta"
+
+
+def test_resumen_con_rango_de_un_dia(cliente):
+    respuesta = cliente.get("/api/caja/resumen", params={
+        "fecha_desde": "2024-03-01",
+        "fecha_hasta": "2024-03-01",
+    })
+    assert respuesta.status_code == 200
+
+
+def test_movimiento_con_tipo_no_valido(cliente):
+    # Con saldo suficiente: un tipo no válido no se trata como egreso
+    respuesta = cliente.post("/api/caja/", json={
+        "tipo_movimiento": "INGRESO",
+        "monto": 100,
+        "saldo_actual": 0,
+    })
+    assert respuesta.status_code == 201, respuesta.text
+    saldo = cliente.get("/api/caja/saldo").json()
+
+    respuesta = cliente.post("/api/caja/", json={
+        "tipo_movimiento": "RETIRO",
+        "monto": 50,
+        "saldo_actual": 0,
+    })
+    assert respuesta.status_code == 400
+    assert "Tipo de movimiento no válido" in respuesta.json()["detail"]
+    assert cliente.get("/api/caja/saldo").json() == saldo
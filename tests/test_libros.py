@@ -0,0 +1,79 @@
+ISBN_CON_GUIONES = "978-84-376-0494-7"
+ISBN = "9788437604947"
+
+
+def crear_libro(cliente, isbn, cantidad=10):
+    respuesta = cliente.post("/api/libros/", json={
+        "ISBN": isbn,
+        "titulo": "Cien años de soledad",
+        "precio_compra": 10,
+        "precio_venta": 15,
+        "cantidad_actual": cantidad,
+    })
+    assert respuesta.status_code == 201, respuesta.text
+    return respuesta.json()
+
+
+def test_isbn_con_guiones_en_todas_las_rutas(cliente):
+    assert crear_libro(cliente, ISBN_CON_GUIONES)["ISBN"] == ISBN
+
+    respuesta = cliente.get(f"/api/libros/{ISBN_CON_GUIONES}")
+    assert respuesta.status_code == 200
+    assert respuesta.json()["ISBN"] == ISBN
+
+    respuesta = cliente.put(f"/api/libros/{ISBN_CON_GUIONES}", json={
+        "titulo": "Cien años de soledad (edición conmemorativa)",
+        "precio_compra": 12,
+        "precio_venta": 18,
+    })
+    assert respuesta.status_code == 200, respuesta.text
+    assert respuesta.json()["titulo"] == "Cien años de soledad (edición conmemorativa)"
+
+    respuesta = cliente.post("/api/transacciones/", json={
+        "ISBN": ISBN_CON_GUIONES,
+        "tipo_transaccion": 1,
+        "cantidad": 3,
+    })
+    assert respuesta.status_code == 201, respuesta.text
+    assert respuesta.json()["ISBN"] == ISBN
+    assert cliente.get(f"/api/libros/{ISBN}").json()["cantidad_actual"] == 7
+
+    respuesta = cliente.get(f"/api/transacciones/libro/{ISBN_CON_GUIONES}")
+    assert [transaccion["cantidad"] for transaccion in respuesta.json()] == [3]
+
+    # Con ventas no se puede eliminar, pero la ruta con guiones encuentra el libro
+    respuesta = cliente.delete(f"/api/libros/{ISBN_CON_GUIONES}")
+    assert respuesta.status_code == 400
+    assert ISBN in respuesta.json()["detail"]
+
+
+def test_eliminar_libro_con_isbn_con_guiones(cliente):
+    crear_libro(cliente, "978-0-306-40615-7")
+
+    assert cliente.delete("/api/libros/978-0-306-40615-7").status_code == 200
+    assert cliente.get("/api/libros/9780306406157").status_code == 404
+
+
+def test_venta_en_lote_con_isbn_con_guiones(cliente):
+    crear_libro(cliente, "84-376-0495-X", cantidad=5)
+
+    respuesta = cliente.post("/api/transacciones/lote", json={
+        "lineas": [{"ISBN": "84-376-0495-x", "tipo_transaccion": 1, "cantidad": 2}],
+    })
+    assert respuesta.status_code == 201, respuesta.text
+    assert respuesta.json()["procesadas"] == 1
+    assert cliente.get("/api/libros/843760495X").json()["cantidad_actual"] == 3
+
+
+def test_modificar_libro_no_cambia_el_stock(cliente):
+    crear_libro(cliente, "9780140449136", cantidad=4)
+
+    respuesta = cliente.put("/api/libros/9780140449136", json={
+        "titulo": "Crimen y castigo",
+        "precio_compra": 10,
+        "precio_venta": 20,
+        "cantidad_actual": 0,
+    })
+    assert respuesta.status_code == 200, respuesta.text
+    assert respuesta.json()["titulo"] == "Crimen y castigo"
+    assert respuesta.json()["cantidad_actual"] == 4
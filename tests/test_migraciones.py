@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.migraciones import aplicar_migraciones, normalizar_isbns
+from app.models import models
+
+
+def test_normalizar_isbns_reescribe_libros_y_transacciones(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'anterior.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    with Session(bind=engine) as db:
+        db.add(models.TipoTransaccion(id_tipo=1, nombre="VENTA"))
+        for isbn in ("978-84-376-0494-7", "111-1", "1111"):
+            db.add(models.Libro(ISBN=isbn, titulo=isbn, precio_compra=1, precio_venta=2, cantidad_actual=5))
+        db.flush()
+        db.add(models.Transaccion(
+            ISBN="978-84-376-0494-7", tipo_transaccion=1, cantidad=1, fecha_transaccion=datetime.now()
+        ))
+        db.commit()
+
+    aplicar_migraciones(engine)
+
+    with Session(bind=engine) as db:
+        # "111-1" se conserva: su forma normalizada ya es otro libro
+        assert sorted(db.execute(select(models.Libro.ISBN)).scalars()) == ["111-1", "1111", "9788437604947"]
+        assert db.execute(select(models.Transaccion.ISBN)).scalars().all() == ["9788437604947"]
+
+    # Solo se hace una vez
+    assert normalizar_isbns(engine) == 0
+    engine.dispose()